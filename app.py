@@ -1,38 +1,17 @@
 import streamlit as st
-import sqlite3
-import pandas as pd
-import pickle
-import xgboost
-import plotly.express as px
-import matplotlib.pyplot as plt
-import seaborn as sns
 from auth0_component import login_button
-
-
-def log_transaction_to_db(user_email, row):
-    conn = sqlite3.connect("users_data.db")
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO transactions (
-            user_email, date, transaction_type, payment_gateway,
-            transaction_state, merchant_category, amount, is_fraud
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        user_email,
-        row["Date"],
-        row["Transaction_Type"],
-        row["Payment_Gateway"],
-        row["Transaction_State"],
-        row["Merchant_Category"],
-        row["amount"],
-        row["fraud"]
-    ))
-    conn.commit()
-    conn.close()
+from vocabulary import MERCHANT_CATEGORIES, PAYMENT_GATEWAYS, TRANSACTION_STATES, TRANSACTION_TYPES
+from metrics import stage, start_metrics_server
 
 # Set page config first
 st.set_page_config(page_title="PayGuard-AI", layout="wide")
 
+# Prometheus endpoint for the stage timings, when PAYGUARD_METRICS is set
+start_metrics_server()
+
+# Uploads bigger than this are streamed in chunks by default
+STREAM_THRESHOLD_BYTES = 50 * 1024 * 1024
+
 # -------------------- AUTH0 LOGIN START --------------------
 if "user_info" not in st.session_state:
     # Add a CSS style for the gradient background
@@ -107,7 +86,25 @@ if "user_info" not in st.session_state:
         st.stop()
 
 # -------------------- AUTH0 LOGIN END --------------------
+# The scoring stack (pandas, the model registry, the database layer) is only
+# imported once someone is logged in, so the login screen renders without
+# it. xgboost itself is imported when the first prediction unpickles the
+# model, and plotly when the first chart is drawn.
+import os
+import pandas as pd
+from columnar import (EXPORT_FORMATS, MIME_TYPES, UPLOAD_TYPES, ColumnarWriter, file_format, frame_to_bytes,
+                      new_export_file)
+from scoring import predict_fraud, prepare_upload, read_upload, stream_scored_upload
+from jobs import get_job_runner, submit_job
+from prediction_cache import get_prediction_cache
+from charts import amount_over_time, dataset_hash, downsample, get_chart_cache
+from database import log_transaction_to_db, log_transactions_to_db
+
 user = st.session_state.user_info
+
+# Background upload jobs run in this process too, picking up any left
+# unfinished by an earlier one
+get_job_runner()
 st.sidebar.success(f"👤 {user['name']} | {user['email']}")
 if st.sidebar.button("Logout"):
     del st.session_state.user_info
@@ -116,26 +113,41 @@ if st.sidebar.button("Logout"):
 st.success(f"Welcome {user['name']} 👋")
 st.markdown("---")
 
-# Load the trained model
-with open("UPI_Fraud_model.pkl", "rb") as file:
-    model = pickle.load(file)
-
-def predict_fraud(transaction_data):
-    transaction_data['Date'] = pd.to_datetime(transaction_data['Date']).view("int64") / 10**9
-    transaction_data = pd.get_dummies(transaction_data, columns=["Transaction_Type", "Payment_Gateway", "Transaction_State", "Merchant_Category"], drop_first=True)
-    transaction_data = transaction_data.reindex(columns=model.get_booster().feature_names, fill_value=0)
-    prediction = model.predict(transaction_data)
-    return prediction
-
-def visualize_results(df):
-    pie_chart = df['fraud'].value_counts().reset_index()
-    pie_chart.columns = ['Fraud Status', 'Count']
-    fig_pie = px.pie(pie_chart, values='Count', names='Fraud Status', title='Fraud Detection Results', color='Fraud Status', 
-                     color_discrete_sequence=['#636EFA', '#EF553B'])
+# The line is downsampled to at most CHART_POINTS points, and both figures
+# are cached per dataset, so reruns over the same upload reuse them
+def visualize_results(df, dates):
+    def build():
+        import plotly.express as px
+
+        pie_chart = df['fraud'].value_counts().reset_index()
+        pie_chart.columns = ['Fraud Status', 'Count']
+        fig_pie = px.pie(pie_chart, values='Count', names='Fraud Status', title='Fraud Detection Results', color='Fraud Status', 
+                         color_discrete_sequence=['#636EFA', '#EF553B'])
+
+        line_chart = amount_over_time(dates, df['amount'])
+        fig_line = px.line(line_chart, x='Date', y='amount', title='Total Transaction Amount Over Time')
+        return fig_pie, fig_line
+
+    fig_pie, fig_line = get_chart_cache().get("upload_results", dataset_hash(dates, df['amount'], df['fraud']), build)
     st.plotly_chart(fig_pie)
+    st.plotly_chart(fig_line)
+
+# Same charts as visualize_results, drawn from a streamed upload's running totals
+def visualize_summary(summary):
+    def build():
+        import plotly.express as px
+
+        pie_chart = pd.DataFrame(list(summary.fraud_counts.items()), columns=['Fraud Status', 'Count'])
+        fig_pie = px.pie(pie_chart, values='Count', names='Fraud Status', title='Fraud Detection Results', color='Fraud Status', 
+                         color_discrete_sequence=['#636EFA', '#EF553B'])
 
-    line_chart = df.groupby('Date')['amount'].sum().reset_index()
-    fig_line = px.line(line_chart, x='Date', y='amount', title='Total Transaction Amount Over Time')
+        line_chart = downsample(summary.daily_amounts.sort_index()).rename_axis('Date').reset_index(name='amount')
+        fig_line = px.line(line_chart, x='Date', y='amount', title='Total Transaction Amount Per Day')
+        return fig_pie, fig_line
+
+    digest = dataset_hash(summary.daily_amounts, sorted(summary.fraud_counts.items()))
+    fig_pie, fig_line = get_chart_cache().get("upload_summary", digest, build)
+    st.plotly_chart(fig_pie)
     st.plotly_chart(fig_line)
 
 st.title("PayGuardAI: UPI Transaction Fraud Detection")
@@ -145,39 +157,194 @@ st.markdown("""
 
 st.sidebar.header("Individual Transaction")
 transaction_date = st.sidebar.date_input("Select Transaction Date")
-transaction_type = st.sidebar.selectbox("Select Transaction Type", ["Refund", "Bank Transfer", "Subscription", "Purchase", "Investment", "Other"])
-payment_gateway = st.sidebar.selectbox("Select Payment Gateway", ["SamplePay", "UPI Pay", "Dummy Bank", "Alpha Bank", "Other"])
-transaction_state = st.sidebar.selectbox("Select Transaction State", ["Maharashtra", "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal", "Other"])
-merchant_category = st.sidebar.selectbox("Select Merchant Category", ["Brand Vouchers and OTT", "Home delivery", "Utilities","Investment","Travel bookings","Purchases", "Other"])
+transaction_type = st.sidebar.selectbox("Select Transaction Type", TRANSACTION_TYPES)
+payment_gateway = st.sidebar.selectbox("Select Payment Gateway", PAYMENT_GATEWAYS)
+transaction_state = st.sidebar.selectbox("Select Transaction State", TRANSACTION_STATES)
+merchant_category = st.sidebar.selectbox("Select Merchant Category", MERCHANT_CATEGORIES)
 transaction_amount = st.sidebar.number_input("Enter Transaction Amount (₹)", min_value=0.0, max_value=500000.0)
 
-uploaded_file = st.file_uploader("Upload a CSV file", type=["csv"])
+uploaded_file = st.file_uploader("Upload a CSV, Parquet or Arrow file", type=UPLOAD_TYPES)
 
-if uploaded_file is not None:
+# -------------------- UPLOADS --------------------
+# An uploaded file is scored or queued once, when one of its buttons is
+# clicked, never just because it was uploaded. What came of it is kept in
+# session_state by file_id, so the reruns Streamlit does on every widget
+# click redraw the results instead of scoring and logging the file again.
+upload_runs = st.session_state.setdefault("upload_runs", {})
+
+
+def score_in_memory(uploaded_file):
+    upload_format = file_format(uploaded_file.name)
     with st.spinner("Processing your file with AI magic..."):
-        df = pd.read_csv(uploaded_file)
-        st.success("Done!")
-        st.write("Uploaded Data:")
-        st.dataframe(df)
-
-        processed_data = pd.DataFrame({
-            "Date": pd.to_datetime(df['Date']),
-            "Transaction_Type": df['Transaction_Type'],
-            "Payment_Gateway": df['Payment_Gateway'],
-            "Transaction_State": df['Transaction_State'],
-            "Merchant_Category": df['Merchant_Category'],
-            "amount": df['amount']
-        })
+        with stage(f"upload.read_{upload_format}", bytes=uploaded_file.size) as span:
+            df = read_upload(uploaded_file, uploaded_file.name)
+            span.rows = len(df)
 
+        with stage("upload.prepare", rows=len(df)):
+            processed_data = prepare_upload(df)
+        # predict_fraud replaces Date with epoch seconds for the database
+        dates = processed_data['Date']
         processed_data['fraud'] = predict_fraud(processed_data)
 
+        logged_rows, rows_per_sec = log_transactions_to_db(user['email'], processed_data)
+        # Recorded as soon as the rows are logged, before anything else
+        # can be cut short by a rerun
+        run = upload_runs[uploaded_file.file_id] = {
+            "mode": "memory", "scored": processed_data.assign(Date=dates), "logged_rows": logged_rows,
+            "rows_per_sec": rows_per_sec}
+    return run
+
+
+# Scored chunks go to a file on disk as they are done, not to memory. The
+# file is only read back if the user asks for the download, and it is
+# removed once the session moves on to another streamed upload, or by a
+# later export once it is old enough (columnar.EXPORT_MAX_AGE_SECONDS).
+def score_in_chunks(uploaded_file):
+    for run in upload_runs.values():
+        if run.get("export_path"):
+            remove_export(run)
+
+    progress = st.progress(0.0, text="Scoring your file in chunks...")
+    summary = None
+    with new_export_file(export_format) as export_file:
+        run = {"mode": "stream", "export_path": export_file.name, "export_format": export_format}
+        # Also on the in-progress marker, so an interrupted run's file is cleaned up too
+        marker = upload_runs[uploaded_file.file_id]
+        marker["export_path"] = export_file.name
+        with ColumnarWriter(export_file, export_format) as export:
+            for summary in stream_scored_upload(uploaded_file, user['email'], name=uploaded_file.name, export=export):
+                # Each chunk is logged before it is yielded
+                marker["rows"] = summary.rows
+                if summary.expected_rows:
+                    fraction = min(summary.rows / summary.expected_rows, 1.0)
+                else:
+                    fraction = min(uploaded_file.tell() / max(uploaded_file.size, 1), 1.0)
+                progress.progress(fraction, text=f"Scored {summary.rows:,} rows ({summary.chunks} chunks)...")
+    progress.progress(1.0, text="Done!")
+    run["summary"] = summary
+    if summary is None:
+        remove_export(run)
+    return run
+
+
+def remove_export(run):
+    try:
+        os.remove(run["export_path"])
+    except FileNotFoundError:
+        pass
+    run["export_path"] = None
+
+
+def discard_run(file_id):
+    run = upload_runs.pop(file_id)
+    if run.get("export_path"):
+        remove_export(run)
+    return run
+
+
+# A run that raised (missing columns, a bad date, a broken file) can be
+# scored again, unless some of its chunks were logged before the error
+def record_failure(file_id, error):
+    run = discard_run(file_id)
+    if run["rows"]:
+        upload_runs[file_id] = {"mode": "error", "error": str(error), "rows": run["rows"]}
+    else:
+        st.error(f"Could not score this file: {error}")
+
+
+def show_run(run):
+    if run["mode"] == "job":
+        st.success(f"Queued as job #{run['job_id']}. Follow its progress on the Upload Jobs page.")
+
+    elif run["mode"] == "scoring":
+        st.warning(f"Scoring of this file was interrupted after {run['rows']:,} rows were logged; "
+                   "upload the remaining rows as a new file.")
+
+    elif run["mode"] == "error":
+        st.error(f"Could not score this file: {run['error']}. {run['rows']:,} rows were logged before "
+                 "that; upload the remaining rows as a new file.")
+
+    elif run["mode"] == "stream":
+        summary = run["summary"]
+        if summary is None:
+            st.warning("The uploaded file has no rows.")
+            return
+        st.write(f"Processed Data with Predictions (first {len(summary.preview):,} of {summary.rows:,} rows):")
+        st.dataframe(summary.preview)
+        with stage("render.visualize_summary", rows=summary.rows):
+            visualize_summary(summary)
+        if not run["export_path"] or not os.path.exists(run["export_path"]):
+            st.caption("The scored file is no longer kept; score the upload again to download it.")
+        elif run.get("download_ready"):
+            # download_button holds the whole file in memory, which is why
+            # it is only built on request
+            name = f"{os.path.splitext(uploaded_file.name)[0]}_scored.{run['export_format']}"
+            with open(run["export_path"], "rb") as export_file:
+                # on_click="ignore": a download doesn't need a rerun of the page
+                st.download_button("Download scored results", export_file, file_name=name,
+                                   mime=MIME_TYPES[run["export_format"]], on_click="ignore")
+        elif st.button(f"Prepare download ({os.path.getsize(run['export_path']) / 2**20:,.1f} MB)"):
+            run["download_ready"] = True
+            st.rerun()
+
+    else:
+        scored = run["scored"]
+        st.success("Done!")
         st.write("Processed Data with Predictions:")
-        st.dataframe(processed_data)
+        st.dataframe(scored)
+        with stage("render.visualize_results", rows=len(scored)):
+            visualize_results(scored, scored['Date'])
+        st.caption(f"Logged {run['logged_rows']} transactions ({run['rows_per_sec']:,.0f} rows/sec)")
+        # Serialized once per format, not on every rerun
+        exports = run.setdefault("exports", {})
+        if export_format not in exports:
+            exports[export_format] = frame_to_bytes(scored, export_format)
+        st.download_button("Download scored results", exports[export_format],
+                           file_name=export_name, mime=MIME_TYPES[export_format], on_click="ignore")
+
 
-        visualize_results(processed_data)
+if uploaded_file is not None:
+    file_id = uploaded_file.file_id
+    # A run cut short by a rerun before it logged anything can simply be
+    # scored again
+    interrupted = upload_runs.get(file_id)
+    if interrupted and interrupted["mode"] == "scoring" and not interrupted["rows"]:
+        discard_run(file_id)
+    # A streamed upload's export is written while it is scored, in the
+    # format chosen then
+    streamed = upload_runs.get(file_id, {}).get("mode") == "stream"
+    export_format = st.radio("Download scored results as", EXPORT_FORMATS, horizontal=True, disabled=streamed,
+                             format_func=lambda fmt: {"parquet": "Parquet", "arrow": "Arrow"}[fmt])
+    export_name = f"{os.path.splitext(uploaded_file.name)[0]}_scored.{export_format}"
 
-        for _, row in processed_data.iterrows():
-            log_transaction_to_db(user['email'], row)
+    if file_id not in upload_runs:
+        controls = st.empty()
+        with controls.container():
+            stream_upload = st.checkbox(
+                "Stream file in chunks (recommended for large files)",
+                value=uploaded_file.size > STREAM_THRESHOLD_BYTES,
+            )
+            col1, col2 = st.columns(2)
+            score_now = col1.button("Score now", type="primary")
+            queue_upload = col2.button("Queue upload", help="Process in the background; you can leave this page while it runs")
+        if score_now or queue_upload:
+            controls.empty()
+        if queue_upload:
+            upload_runs[file_id] = {"mode": "job", "job_id": submit_job(user['email'], uploaded_file, uploaded_file.name)}
+            get_job_runner().wake()
+        elif score_now:
+            # Recorded before scoring starts, with the rows logged so far: a
+            # run cut short by a rerun after logging some rows must not be
+            # offered again. Reruns stop the script with a BaseException, so
+            # they leave the marker in place.
+            upload_runs[file_id] = {"mode": "scoring", "rows": 0}
+            try:
+                upload_runs[file_id] = score_in_chunks(uploaded_file) if stream_upload else score_in_memory(uploaded_file)
+            except Exception as e:
+                record_failure(file_id, e)
+
+    if file_id in upload_runs:
+        show_run(upload_runs[file_id])
 
 if st.button("Check Individual Transaction"):
     transaction_data = pd.DataFrame({
@@ -189,7 +356,9 @@ if st.button("Check Individual Transaction"):
         "amount": [transaction_amount]
     })
 
-    prediction = predict_fraud(transaction_data)
+    # Repeated checks are answered from the process-wide cache; misses share
+    # one model.predict with other sessions' concurrent checks
+    prediction = get_prediction_cache().predict(transaction_data)
     if prediction[0] == 1:
         st.error("This transaction is likely to be fraudulent.")
     else:
@@ -212,5 +381,3 @@ st.markdown(
     """,
     unsafe_allow_html=True
 )
-
-print(xgboost.__version__)
@@ -0,0 +1,166 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from metrics import stage
+from model_registry import get_model
+from scoring import encode_transactions
+
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 5.0
+
+
+# -------------------- MICRO-BATCHING --------------------
+# Coalesces concurrent predict_fraud calls into one model.predict.
+#
+# Each request is still encoded on its own, in the caller's thread, so the
+# result is exactly what predict_fraud would return for it alone (drop_first
+# depends on the rows of the batch being encoded). Only the booster call is
+# shared: the worker stacks the encoded rows of up to max_batch_size
+# requests, or whatever arrived within max_wait_ms of the first one, and
+# splits the predictions back onto each request's future.
+class _Request:
+    __slots__ = ("loaded", "features", "future", "enqueued")
+
+    def __init__(self, loaded, features):
+        self.loaded = loaded
+        self.features = features
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+
+        self.batches = 0
+        self.requests = 0
+        self.rows = 0
+        self.max_seen_batch = 0
+        self.total_wait = 0.0
+        # batch size -> number of batches, bucketed by powers of two
+        self.batch_size_histogram = {}
+
+    def submit(self, transaction_data):
+        loaded = get_model()
+        return self.submit_encoded(loaded, encode_transactions(transaction_data, loaded))
+
+    # For callers that already hold the feature matrix `loaded` expects
+    def submit_encoded(self, loaded, features):
+        request = _Request(loaded, features)
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    def predict(self, transaction_data, timeout=None):
+        return self.submit(transaction_data).result(timeout)
+
+    async def predict_async(self, transaction_data):
+        return await asyncio.wrap_future(self.submit(transaction_data))
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "batches": self.batches,
+                "requests": self.requests,
+                "rows": self.rows,
+                "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+                "max_batch_size": self.max_seen_batch,
+                "mean_wait_ms": self.total_wait / self.requests * 1000 if self.requests else 0.0,
+                "batch_size_histogram": dict(sorted(self.batch_size_histogram.items())),
+            }
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        if self._worker is not None:
+            self._worker.join()
+
+    # -------------------- WORKER --------------------
+    def _ensure_worker(self):
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="predict-batcher", daemon=True)
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+            batch = [request]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)
+                    break
+                batch.append(request)
+            self._score(batch)
+
+    def _score(self, batch):
+        started = time.perf_counter()
+        # Requests encoded before a model reload are scored with their own model
+        groups = {}
+        for request in batch:
+            groups.setdefault(id(request.loaded), []).append(request)
+
+        for requests in groups.values():
+            try:
+                features = np.vstack([request.features for request in requests])
+                if len(features):
+                    with stage("score.predict_batched", rows=len(features)):
+                        prediction = requests[0].loaded.predict(features)
+                else:
+                    prediction = np.empty(0, dtype=np.int64)
+            except Exception as exc:
+                for request in requests:
+                    request.future.set_exception(exc)
+                continue
+            offset = 0
+            for request in requests:
+                count = len(request.features)
+                request.future.set_result(prediction[offset:offset + count])
+                offset += count
+
+        with self._lock:
+            self.batches += 1
+            self.requests += len(batch)
+            self.rows += sum(len(request.features) for request in batch)
+            self.max_seen_batch = max(self.max_seen_batch, len(batch))
+            self.total_wait += sum(started - request.enqueued for request in batch)
+            bucket = 1 << (len(batch) - 1).bit_length()
+            self.batch_size_histogram[bucket] = self.batch_size_histogram.get(bucket, 0) + 1
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+# Process-wide batcher shared by the app sessions and the scoring service
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = MicroBatcher()
+    return _batcher
@@ -0,0 +1,70 @@
+# Compares the old per-row logging path with the batched bulk insert.
+#
+#   python benchmarks/bench_bulk_insert.py --sizes 1000 100000 1000000
+#
+# The per-row path opens a connection and commits for every row, so it is
+# only run up to --max-per-row rows; larger sizes are reported as skipped.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from datagen import generate_transactions, load_profile
+from database import log_transaction_to_db, log_transactions_to_db
+from migrations import migrate
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "upidata.csv")
+
+
+# Scored rows as the app logs them: dates already converted to epoch seconds
+def make_scored_frame(n, seed=0):
+    df = generate_transactions(n, seed=seed, profile=load_profile(SAMPLE))
+    df["Date"] = df["Date"].astype("int64") / 10**9
+    return df
+
+
+def time_per_row(df, db_path):
+    start = time.perf_counter()
+    for _, row in df.iterrows():
+        log_transaction_to_db("bench@example.com", row, db_path=db_path)
+    return time.perf_counter() - start
+
+
+def time_bulk(df, db_path):
+    start = time.perf_counter()
+    log_transactions_to_db("bench@example.com", df, db_path=db_path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-row vs bulk transaction logging")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--max-per-row", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'per-row rows/s':>16} {'bulk rows/s':>14} {'speedup':>9}")
+    for n in args.sizes:
+        df = make_scored_frame(n)
+        with tempfile.TemporaryDirectory() as tmp:
+            bulk_db = os.path.join(tmp, "bulk.db")
+            migrate(bulk_db)
+            bulk = time_bulk(df, bulk_db)
+
+            per_row = None
+            if n <= args.max_per_row:
+                row_db = os.path.join(tmp, "per_row.db")
+                migrate(row_db)
+                per_row = time_per_row(df, row_db)
+
+        bulk_rate = n / bulk
+        if per_row is None:
+            print(f"{n:>10} {'skipped':>16} {bulk_rate:>14,.0f} {'-':>9}")
+        else:
+            print(f"{n:>10} {n / per_row:>16,.0f} {bulk_rate:>14,.0f} {per_row / bulk:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
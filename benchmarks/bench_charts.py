@@ -0,0 +1,107 @@
+# Chart build time and browser payload as uploads grow.
+#
+#   python benchmarks/bench_charts.py --rows 10000 100000 1000000
+#
+# For each size, synthetic scored transactions with a timestamp per row go
+# through the upload's amount-over-time line three ways: "full" as the app
+# drew it before, a point per distinct timestamp; "reduced" through
+# charts.amount_over_time (aggregated, then LTTB to CHART_POINTS points);
+# "cached" as a rerun over the same upload does it, hashing the data and
+# taking the figure from a ChartCache. Time covers building the figure and
+# serializing it the way st.plotly_chart does; payload is that JSON. The
+# dashboard's merchant category bars are measured the same way, with as
+# many distinct categories as an upload of that size could bring.
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from charts import CHART_POINTS, ChartCache, amount_over_time, dataset_hash, top_categories
+
+
+def make_upload(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Date": pd.to_datetime(1.7e9 + np.sort(rng.uniform(0, 365 * 86400, rows)), unit="s"),
+        "amount": np.round(rng.lognormal(6, 1.2, rows), 2),
+        "fraud": (rng.random(rows) < 0.05).astype(np.int64),
+        "Merchant_Category": rng.integers(0, max(rows // 100, 1), rows).astype(str),
+    })
+
+
+def timed(function, repeats):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def line_payloads(df, repeats):
+    import plotly.express as px
+    import plotly.io
+
+    def full():
+        line = df.groupby('Date')['amount'].sum().reset_index()
+        return plotly.io.to_json(px.line(line, x='Date', y='amount'), validate=False)
+
+    def reduced():
+        line = amount_over_time(df['Date'], df['amount'])
+        return plotly.io.to_json(px.line(line, x='Date', y='amount'), validate=False)
+
+    cache = ChartCache()
+
+    def cached():
+        figure = cache.get("line", dataset_hash(df['Date'], df['amount'], df['fraud']),
+                           lambda: px.line(amount_over_time(df['Date'], df['amount']), x='Date', y='amount'))
+        return plotly.io.to_json(figure, validate=False)
+
+    cached()
+    return {"full": timed(full, repeats), "reduced": timed(reduced, repeats), "cached": timed(cached, repeats)}
+
+
+def category_payloads(df, repeats):
+    import json
+
+    import altair as alt
+
+    counts = df['Merchant_Category'].value_counts().rename_axis('Merchant Category').reset_index(name='Count')
+
+    def chart(data):
+        return alt.Chart(data).mark_bar().encode(x='Merchant Category', y='Count')
+
+    def full():
+        with alt.data_transformers.disable_max_rows():
+            return json.dumps(chart(counts).to_dict())
+
+    def reduced():
+        return json.dumps(chart(top_categories(counts, 'Merchant Category', 'Count')).to_dict())
+
+    return {"full": timed(full, repeats), "reduced": timed(reduced, repeats)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chart build time and payload size vs upload size")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"line reduced to at most {CHART_POINTS} points")
+    print(f"{'rows':>10} {'chart':>9} {'mode':>8} {'ms':>9} {'payload KB':>11}")
+    for rows in args.rows:
+        df = make_upload(rows, args.seed)
+        for chart, results in (("line", line_payloads(df, args.repeats)),
+                               ("category", category_payloads(df, args.repeats))):
+            for mode, (seconds, payload) in results.items():
+                print(f"{rows:>10,} {chart:>9} {mode:>8} {seconds * 1000:>9.1f} {len(payload) / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Lookup latency on users_data.db before and after the index migration.
+#
+#   python benchmarks/bench_indexes.py --sizes 10000 1000000 10000000
+#
+# For each size a scratch database at schema version 1 (tables only) is
+# filled with that many transactions and reputation rows, the page queries
+# are timed, then the database is migrated to the latest version and the
+# same queries are timed again.
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from migrations import LATEST_VERSION, migrate
+
+USERS = 1000
+UPI_IDS = 50000
+FILL_CHUNK = 200000
+
+QUERIES = {
+    "transactions by user": "SELECT * FROM transactions WHERE user_email = ?",
+    "transactions by date": "SELECT COUNT(*) FROM transactions WHERE date >= ? AND date < ?",
+    "reputation by upi_id": "SELECT * FROM upi_reputation WHERE upi_id = ?",
+    "already rated check": "SELECT 1 FROM upi_reputation WHERE upi_id = ? AND user_email = ?",
+}
+
+
+def fill(db_path, n, rng):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        for offset in range(0, n, FILL_CHUNK):
+            size = min(FILL_CHUNK, n - offset)
+            users = rng.integers(0, USERS, size)
+            dates = rng.integers(1672531200, 1704067200, size)
+            conn.executemany(
+                "INSERT INTO transactions (user_email, date, transaction_type, payment_gateway, transaction_state, "
+                "merchant_category, amount, is_fraud) VALUES (?, ?, 'Purchase', 'UPI Pay', 'Goa', 'Utilities', ?, ?)",
+                zip((f"user{u}@example.com" for u in users.tolist()), (f"{d}.0" for d in dates.tolist()),
+                    rng.uniform(10, 500, size).tolist(), rng.integers(0, 2, size).tolist()),
+            )
+            upi_ids = rng.integers(0, UPI_IDS, size)
+            conn.executemany(
+                "INSERT INTO upi_reputation (upi_id, user_email, rating, flag_reason) VALUES (?, ?, ?, NULL)",
+                zip((f"payee{u}@upi" for u in upi_ids.tolist()), (f"user{u}@example.com" for u in users.tolist()),
+                    rng.integers(1, 6, size).tolist()),
+            )
+    conn.close()
+
+
+def params_for(name, rng):
+    user = f"user{rng.integers(0, USERS)}@example.com"
+    upi_id = f"payee{rng.integers(0, UPI_IDS)}@upi"
+    if name == "transactions by user":
+        return (user,)
+    if name == "transactions by date":
+        start = int(rng.integers(1672531200, 1704067200 - 86400))
+        return (f"{start}.0", f"{start + 86400}.0")
+    if name == "reputation by upi_id":
+        return (upi_id,)
+    return (upi_id, user)
+
+
+def time_queries(db_path, lookups, seed):
+    conn = sqlite3.connect(db_path)
+    results = {}
+    for name, sql in QUERIES.items():
+        rng = np.random.default_rng(seed)
+        timings = []
+        for _ in range(lookups):
+            params = params_for(name, rng)
+            start = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            timings.append(time.perf_counter() - start)
+        results[name] = float(np.median(timings))
+    conn.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lookup latency before/after the index migration")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--lookups", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'query':>22} {'before ms':>11} {'after ms':>10} {'speedup':>9}")
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            migrate(db_path, target=1, wal=False)
+            fill(db_path, n, np.random.default_rng(n))
+
+            before = time_queries(db_path, args.lookups, seed=1)
+            migrate(db_path, target=LATEST_VERSION)
+            after = time_queries(db_path, args.lookups, seed=1)
+
+        for name in QUERIES:
+            print(f"{n:>10} {name:>22} {before[name] * 1000:>11.3f} {after[name] * 1000:>10.3f} "
+                  f"{before[name] / after[name]:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# Upload ingest time and peak RSS for CSV, Parquet and Arrow IPC.
+#
+#   python benchmarks/bench_ingest.py --rows 1000000
+#
+# The same synthetic transactions are written in every format, then each
+# one is ingested in a fresh process the way the app ingests an upload:
+# read_upload (column projection for the columnar formats) followed by
+# prepare_upload, which parses Date. "upload" reads from an in-memory copy
+# of the file, as Streamlit hands it over; "path" reads the file from disk,
+# memory-mapped for the columnar formats. Peak RSS is the child's maximum
+# resident set, and "ingest" the part of it added by the ingest itself.
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FILES = {"csv": "transactions.csv", "parquet": "transactions.parquet", "arrow": "transactions.arrow"}
+
+
+def max_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# -------------------- CHILD --------------------
+def ingest_once(path, mode):
+    from scoring import prepare_upload, read_upload
+
+    source = path
+    if mode == "upload":
+        with open(path, "rb") as f:
+            source = io.BytesIO(f.read())
+    before = max_rss_mb()
+    start = time.perf_counter()
+    df = prepare_upload(read_upload(source, os.path.basename(path)))
+    elapsed = time.perf_counter() - start
+    peak = max_rss_mb()
+    print(json.dumps({"seconds": elapsed, "rows": len(df), "peak_mb": peak, "ingest_mb": peak - before}))
+
+
+# -------------------- PARENT --------------------
+def write_files(tmp, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    from datagen import generate_chunks, load_profile, write_csv, write_parquet
+
+    profile = load_profile(os.path.join(ROOT, "upidata.csv"))
+    paths = {fmt: os.path.join(tmp, name) for fmt, name in FILES.items()}
+    write_csv(generate_chunks(rows, profile=profile), paths["csv"])
+    write_parquet(generate_chunks(rows, profile=profile), paths["parquet"])
+    table = pq.read_table(paths["parquet"])
+    with pa.OSFile(paths["arrow"], "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return paths
+
+
+def run_child(path, mode):
+    command = [sys.executable, os.path.abspath(__file__), "--child", path, "--mode", mode]
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    finished = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if finished.returncode != 0:
+        raise SystemExit(f"ingesting {path} failed:\n{finished.stderr[-2000:]}")
+    return json.loads(finished.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV vs Parquet vs Arrow upload ingest")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeats", type=int, default=3, help="runs per format; the fastest is reported")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=["upload", "path"], default="upload", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        ingest_once(args.child, args.mode)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_files(tmp, args.rows)
+        print(f"{args.rows:,} rows")
+        print(f"{'format':>8} {'source':>7} {'file MB':>8} {'seconds':>8} {'rows/s':>11} {'peak MB':>8} {'ingest MB':>10}")
+        baseline = None
+        for fmt, path in paths.items():
+            for mode in ("upload", "path"):
+                runs = [run_child(path, mode) for _ in range(args.repeats)]
+                best = min(runs, key=lambda run: run["seconds"])
+                if best["rows"] != args.rows:
+                    raise SystemExit(f"{fmt} ingest returned {best['rows']} rows, expected {args.rows}")
+                peak = max(run["peak_mb"] for run in runs)
+                ingest = max(run["ingest_mb"] for run in runs)
+                baseline = baseline or best["seconds"]
+                size = os.path.getsize(path) / 2**20
+                print(f"{fmt:>8} {mode:>7} {size:>8.1f} {best['seconds']:>8.2f} "
+                      f"{args.rows / best['seconds']:>11,.0f} {peak:>8.0f} {ingest:>10.0f}"
+                      f"   {baseline / best['seconds']:.1f}x vs csv upload")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Concurrent single-transaction checks, scored directly with predict_fraud
+# versus through the MicroBatcher. Also checks both give the same answers.
+#
+#   python benchmarks/bench_micro_batching.py --threads 16 --requests 200 --max-batch-size 64 --max-wait-ms 5
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from batching import MicroBatcher
+from scoring import predict_fraud
+
+TRANSACTION_TYPES = ["Refund", "Bank Transfer", "Subscription", "Purchase", "Investment", "Other"]
+PAYMENT_GATEWAYS = ["SamplePay", "UPI Pay", "Dummy Bank", "Alpha Bank", "Other"]
+STATES = ["Maharashtra", "Karnataka", "Kerala", "Goa", "Bihar", "Other"]
+CATEGORIES = ["Brand Vouchers and OTT", "Home delivery", "Utilities", "Investment", "Travel bookings", "Purchases", "Other"]
+
+
+def make_checks(n, rng):
+    return [{
+        "Date": [pd.Timestamp(2023, int(rng.integers(1, 13)), int(rng.integers(1, 29)))],
+        "Transaction_Type": [rng.choice(TRANSACTION_TYPES)],
+        "Payment_Gateway": [rng.choice(PAYMENT_GATEWAYS)],
+        "Transaction_State": [rng.choice(STATES)],
+        "Merchant_Category": [rng.choice(CATEGORIES)],
+        "amount": [round(float(rng.uniform(10, 500)), 2)],
+    } for _ in range(n)]
+
+
+def run(score, per_thread):
+    latencies, results = [], {}
+
+    def worker(index, checks):
+        mine = []
+        for position, check in enumerate(checks):
+            start = time.perf_counter()
+            prediction = score(pd.DataFrame(check))
+            latencies.append(time.perf_counter() - start)
+            mine.append((position, int(prediction[0])))
+        results[index] = mine
+
+    threads = [threading.Thread(target=worker, args=(i, checks)) for i, checks in enumerate(per_thread)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return np.array(latencies), time.perf_counter() - start, results
+
+
+def report(label, latencies, elapsed):
+    print(f"{label:>10}: p50 {np.percentile(latencies, 50) * 1000:7.2f} ms  p99 {np.percentile(latencies, 99) * 1000:7.2f} ms  "
+          f"{len(latencies) / elapsed:9,.0f} checks/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Direct vs micro-batched single checks")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200, help="checks per thread")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    per_thread = [make_checks(args.requests, rng) for _ in range(args.threads)]
+    predict_fraud(pd.DataFrame(per_thread[0][0]))
+
+    latencies, elapsed, direct = run(predict_fraud, per_thread)
+    report("direct", latencies, elapsed)
+
+    batcher = MicroBatcher(args.max_batch_size, args.max_wait_ms)
+    latencies, elapsed, batched = run(batcher.predict, per_thread)
+    report("batched", latencies, elapsed)
+    batcher.close()
+
+    if direct != batched:
+        raise AssertionError("micro-batched predictions differ from predict_fraud")
+    metrics = batcher.metrics()
+    print(f"predictions identical; {metrics['batches']} batches, mean size {metrics['mean_batch_size']:.1f}, "
+          f"max {metrics['max_batch_size']}, mean wait {metrics['mean_wait_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Scoring throughput of one large batch in-process versus over a process
+# pool of 1..N workers. Also checks every run gives the same labels.
+#
+#   python benchmarks/bench_parallel_scoring.py --rows 1000000 --workers 1 2 4 8
+#
+# Times cover only the booster call: the batch is encoded once up front,
+# exactly as predict_fraud does before handing it to the pool.
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from datagen import generate_transactions, load_profile
+from model_registry import get_model
+from parallel_scoring import ParallelScorer
+from scoring import encode_transactions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def best_of(fn, repeats):
+    best, result = float("inf"), None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process vs process-pool scoring")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="pool sizes to try (default: 1, 2, 4, ... up to the core count)")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers or sorted({1 << i for i in range(cores.bit_length())} | {cores})
+
+    loaded = get_model()
+    transactions = generate_transactions(args.rows, profile=load_profile())
+    features = encode_transactions(transactions, loaded)
+    print(f"{args.rows:,} rows, {features.shape[1]} features, {cores} cores")
+
+    baseline, expected = best_of(lambda: loaded.model.predict(features), args.repeats)
+    print(f"{'mode':>14} {'rows/s':>12} {'speedup':>9}")
+    print(f"{'in-process':>14} {args.rows / baseline:>12,.0f} {1.0:>8.2f}x")
+
+    for workers in worker_counts:
+        scorer = ParallelScorer(workers)
+        try:
+            scorer.predict(features[:scorer.min_shard_rows * workers], loaded)  # start the workers
+            seconds, labels = best_of(lambda: scorer.predict(features, loaded), args.repeats)
+        finally:
+            scorer.close()
+        if not np.array_equal(labels, expected):
+            raise SystemExit(f"{workers} workers gave different labels than in-process scoring")
+        print(f"{f'{workers} workers':>14} {args.rows / seconds:>12,.0f} {baseline / seconds:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# Bulk vs one-at-a-time UPI reputation lookups and submissions.
+#
+#   python benchmarks/bench_reputation.py --ids 10000 --rated 200000
+#
+# A scratch database is seeded with --rated submissions spread over a pool
+# of UPI IDs. A list of --ids IDs, half of them already rated, is then
+# screened with get_reputation per ID and with one get_reputations call,
+# and submitted by one user with submit_rating per ID and with one
+# submit_ratings call; the user has already rated a tenth of the list, so
+# both paths have duplicates to skip. Both lookups must return the same
+# reputations and both submissions must record the same rows. Times are
+# reported per 10k IDs.
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from database import connect
+from reputation import get_reputation, get_reputations, submit_rating, submit_ratings
+
+USER = "ops@example.com"
+
+
+def seed(db_path, rated, pool, seed_value):
+    rng = np.random.default_rng(seed_value)
+    ids = rng.integers(0, pool, rated)
+    ratings = rng.integers(1, 6, rated)
+    flagged = rng.random(rated) < 0.2
+    now = datetime.now()
+    rows = [(f"payee{upi:07d}@upi", f"user{i % 5000}@example.com", int(rating), "suspicious" if flag else None, now)
+            for i, (upi, rating, flag) in enumerate(zip(ids.tolist(), ratings.tolist(), flagged.tolist()))]
+    conn = connect(db_path)
+    with conn:
+        conn.executemany("""
+            INSERT INTO upi_reputation (upi_id, user_email, rating, flag_reason, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+    conn.close()
+
+
+def make_list(n_ids, pool, seed_value):
+    rng = np.random.default_rng(seed_value + 1)
+    known = rng.choice(pool, n_ids // 2, replace=False)
+    unknown = pool + np.arange(n_ids - len(known))
+    codes = rng.permutation(np.concatenate([known, unknown]))
+    return [f"payee{code:07d}@upi" for code in codes.tolist()]
+
+
+def per_10k(seconds, n_ids):
+    return seconds / n_ids * 10000
+
+
+def submitted_rows(db_path):
+    conn = connect(db_path)
+    rows = conn.execute("SELECT upi_id, rating, flag_reason FROM upi_reputation WHERE user_email = ? ORDER BY upi_id",
+                        (USER,)).fetchall()
+    conn.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk vs single UPI reputation lookups and submissions")
+    parser.add_argument("--ids", type=int, default=10000)
+    parser.add_argument("--rated", type=int, default=200000, help="submissions already in the database")
+    parser.add_argument("--pool", type=int, default=100000, help="distinct UPI IDs they are spread over")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    upi_ids = make_list(args.ids, args.pool, args.seed)
+    already = pd.DataFrame({"upi_id": upi_ids[::10], "rating": 5})
+    batch = pd.DataFrame({"upi_id": upi_ids, "rating": [i % 5 + 1 for i in range(len(upi_ids))],
+                          "flag_reason": [None if i % 3 else "settlement mismatch" for i in range(len(upi_ids))]})
+    print(f"{args.ids:,} IDs screened against {args.rated:,} submissions over {args.pool:,} UPI IDs")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {mode: os.path.join(tmp, f"{mode}.db") for mode in ("single", "bulk")}
+        for path in paths.values():
+            seed(path, args.rated, args.pool, args.seed)
+            submit_ratings(already, USER, path)
+
+        # -------------------- LOOKUPS --------------------
+        db_path = paths["single"]
+        get_reputations(upi_ids[:100], db_path)
+        start = time.perf_counter()
+        singles = [get_reputation(upi_id, db_path) for upi_id in upi_ids]
+        single_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        bulk = get_reputations(upi_ids, db_path)
+        bulk_seconds = time.perf_counter() - start
+
+        expected = [(r["flag_count"], r["rating_count"], r["trust_level"]) if r else (0, 0, "⚪️ Unknown")
+                    for r in singles]
+        if expected != list(zip(bulk["flag_count"], bulk["rating_count"], bulk["trust_level"])):
+            raise AssertionError("bulk lookup disagrees with get_reputation")
+        averages = [r["avg_rating"] if r else None for r in singles]
+        if not all((a is None and pd.isna(b)) or a == b for a, b in zip(averages, bulk["avg_rating"])):
+            raise AssertionError("bulk lookup averages disagree with get_reputation")
+
+        print(f"{'':>8} {'single ms/10k':>14} {'bulk ms/10k':>12} {'speedup':>8}")
+        print(f"{'lookup':>8} {per_10k(single_seconds, args.ids) * 1000:>14.0f} "
+              f"{per_10k(bulk_seconds, args.ids) * 1000:>12.0f} {single_seconds / bulk_seconds:>7.1f}x")
+
+        # -------------------- SUBMISSIONS --------------------
+        start = time.perf_counter()
+        recorded_single = sum(submit_rating(upi_id, USER, rating, reason, paths["single"])
+                              for upi_id, rating, reason in zip(batch["upi_id"], batch["rating"], batch["flag_reason"]))
+        single_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        recorded_bulk, skipped = submit_ratings(batch, USER, paths["bulk"])
+        bulk_seconds = time.perf_counter() - start
+
+        if recorded_single != recorded_bulk or submitted_rows(paths["single"]) != submitted_rows(paths["bulk"]):
+            raise AssertionError("bulk submission recorded different rows than submit_rating")
+        print(f"{'submit':>8} {per_10k(single_seconds, args.ids) * 1000:>14.0f} "
+              f"{per_10k(bulk_seconds, args.ids) * 1000:>12.0f} {single_seconds / bulk_seconds:>7.1f}x"
+              f"   ({recorded_bulk:,} recorded, {skipped:,} already rated)")
+
+
+if __name__ == "__main__":
+    main()
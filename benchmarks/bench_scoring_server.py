@@ -0,0 +1,101 @@
+# Load test for scoring_server.py. Starts the server in-process on a free
+# port and drives it from keep-alive client threads.
+#
+#   python benchmarks/bench_scoring_server.py --clients 8 --requests 500 --batch-sizes 1 100 1000
+#
+# Batch size 1 goes to /predict, larger sizes to /predict/batch. Reports
+# p50/p99 request latency, requests/sec and transactions/sec.
+import argparse
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from scoring_server import make_server
+
+TRANSACTION_TYPES = ["Refund", "Bank Transfer", "Subscription", "Purchase", "Investment", "Other"]
+PAYMENT_GATEWAYS = ["SamplePay", "UPI Pay", "Dummy Bank", "Alpha Bank", "Other"]
+STATES = ["Maharashtra", "Karnataka", "Kerala", "Goa", "Bihar", "Other"]
+CATEGORIES = ["Brand Vouchers and OTT", "Home delivery", "Utilities", "Investment", "Travel bookings", "Purchases", "Other"]
+
+
+def make_records(n, rng):
+    return [{
+        "Date": f"2023-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}",
+        "Transaction_Type": str(rng.choice(TRANSACTION_TYPES)),
+        "Payment_Gateway": str(rng.choice(PAYMENT_GATEWAYS)),
+        "Transaction_State": str(rng.choice(STATES)),
+        "Merchant_Category": str(rng.choice(CATEGORIES)),
+        "amount": round(float(rng.uniform(10, 500)), 2),
+    } for _ in range(n)]
+
+
+def run_client(port, path, bodies, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    for body in bodies:
+        start = time.perf_counter()
+        conn.request("POST", path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if response.status != 200:
+            errors.append(response.status)
+    conn.close()
+
+
+def run_load(port, batch_size, clients, requests_per_client, rng):
+    path = "/predict" if batch_size == 1 else "/predict/batch"
+    per_client = []
+    for _ in range(clients):
+        bodies = []
+        for _ in range(requests_per_client):
+            records = make_records(batch_size, rng)
+            payload = records[0] if batch_size == 1 else {"transactions": records}
+            bodies.append(json.dumps(payload).encode())
+        per_client.append(bodies)
+
+    latencies, errors = [], []
+    threads = [threading.Thread(target=run_client, args=(port, path, bodies, latencies, errors)) for bodies in per_client]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return np.array(latencies), elapsed, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scoring service load test")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200, help="requests per client")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000])
+    args = parser.parse_args()
+
+    server = make_server(port=0, quiet=True)
+    port = server.server_port
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    rng = np.random.default_rng(0)
+
+    # Warm up the model load outside the measurement
+    run_load(port, 1, 1, 5, rng)
+
+    print(f"{'batch':>6} {'p50 ms':>9} {'p99 ms':>9} {'req/s':>9} {'txn/s':>11} {'errors':>7}")
+    for batch_size in args.batch_sizes:
+        latencies, elapsed, errors = run_load(port, batch_size, args.clients, args.requests, rng)
+        requests = len(latencies)
+        print(f"{batch_size:>6} {np.percentile(latencies, 50) * 1000:>9.2f} {np.percentile(latencies, 99) * 1000:>9.2f} "
+              f"{requests / elapsed:>9.0f} {requests * batch_size / elapsed:>11,.0f} {len(errors):>7}")
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
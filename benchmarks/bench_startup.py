@@ -0,0 +1,137 @@
+# Cold-start cost of the app and its pages, checked against a budget.
+#
+#   python benchmarks/bench_startup.py
+#   python benchmarks/bench_startup.py --budget-scale 2     on a slower machine
+#
+# Every script is rendered once in a fresh interpreter, in a scratch
+# directory with an empty database. Streamlit and its test harness are
+# imported before the clock starts, so the time to first render covers what
+# the script itself imports and does on its first run, i.e. what a user
+# waits for on a new container. The run is then repeated under
+# `python -X importtime` to list the modules that render pulled in.
+#
+# Exits 1 when a render or its imports go over budget.
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+USER = {"name": "Bench", "email": "bench@example.com"}
+MARKER = "--- first render ---"
+
+# name -> (script, logged in, render budget ms, import budget ms). About
+# twice what each takes on a development laptop; the login screen used to
+# take ~2.7 s when app.py imported xgboost, matplotlib and seaborn up front.
+SCRIPTS = {
+    "login screen": ("app.py", False, 600, 400),
+    "app": ("app.py", True, 1200, 900),
+    "dashboard": ("pages/1_dashboard.py", True, 1500, 1000),
+    "reputation tracker": ("pages/2_Upi_Reputation_Tracker.py", True, 1000, 800),
+    "transaction history": ("pages/3_Transaction_history.py", True, 1000, 800),
+    "admin metrics": ("pages/4_Admin_Metrics.py", True, 1000, 800),
+    "upload jobs": ("pages/5_Upload_Jobs.py", True, 1000, 800),
+}
+TOP_IMPORTS = 5
+
+
+# -------------------- CHILD --------------------
+def render_once(script, logged_in, out):
+    from streamlit.testing.v1 import AppTest
+
+    print(MARKER, file=sys.stderr, flush=True)
+    start = time.perf_counter()
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=120)
+    at.secrets["auth0"] = {"client_id": "bench", "domain": "bench.invalid"}
+    if logged_in:
+        at.session_state.user_info = USER
+    at.run()
+    elapsed = time.perf_counter() - start
+    error = at.exception[0].message if at.exception else None
+    with open(out, "w") as f:
+        json.dump({"ms": elapsed * 1000, "error": error}, f)
+
+
+# -------------------- PARENT --------------------
+def run_child(tmp, script, logged_in, importtime=False):
+    out = os.path.join(tmp, "render.json")
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    command += [os.path.abspath(__file__), "--child", script, "--out", out]
+    if logged_in:
+        command.append("--logged-in")
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONWARNINGS="ignore")
+    finished = subprocess.run(command, cwd=tmp, env=env, capture_output=True, text=True)
+    if finished.returncode != 0:
+        raise SystemExit(f"{script} failed to render:\n{finished.stderr[-2000:]}")
+    with open(out) as f:
+        result = json.load(f)
+    if result["error"]:
+        raise SystemExit(f"{script} raised: {result['error']}")
+    return result["ms"], finished.stderr
+
+
+# Top-level imports after the marker as [(cumulative ms, module)]
+def parse_importtime(stderr):
+    imports = []
+    seen_marker = False
+    for line in stderr.splitlines():
+        if line == MARKER:
+            seen_marker = True
+            continue
+        if not seen_marker or not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # nested import, already counted in its parent, or the header
+        imports.append((int(cumulative) / 1000, name.strip()))
+    return sorted(imports, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first render and import time against a budget")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="multiply every budget by this")
+    parser.add_argument("--only", nargs="+", choices=list(SCRIPTS), help="measure only these")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--logged-in", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        render_once(args.child, args.logged_in, args.out)
+        return
+
+    over_budget = []
+    print(f"{'script':>20} {'render ms':>10} {'budget':>7} {'imports ms':>11} {'budget':>7}  slowest imports")
+    for name in args.only or SCRIPTS:
+        script, logged_in, render_budget, import_budget = SCRIPTS[name]
+        render_budget *= args.budget_scale
+        import_budget *= args.budget_scale
+        with tempfile.TemporaryDirectory() as tmp:
+            for asset in ("UPI_Fraud_model.pkl", "upi_secure.png"):
+                os.symlink(os.path.join(ROOT, asset), os.path.join(tmp, asset))
+            render_ms, _ = run_child(tmp, script, logged_in)
+            _, stderr = run_child(tmp, script, logged_in, importtime=True)
+
+        imports = parse_importtime(stderr)
+        import_ms = sum(ms for ms, _ in imports)
+        slowest = ", ".join(f"{module} {ms:.0f}" for ms, module in imports[:TOP_IMPORTS])
+        print(f"{name:>20} {render_ms:>10.0f} {render_budget:>7.0f} {import_ms:>11.0f} {import_budget:>7.0f}  {slowest}")
+        if render_ms > render_budget:
+            over_budget.append(f"{name}: first render took {render_ms:.0f} ms, budget {render_budget:.0f} ms")
+        if import_ms > import_budget:
+            over_budget.append(f"{name}: imports took {import_ms:.0f} ms, budget {import_budget:.0f} ms")
+
+    for message in over_budget:
+        print(f"OVER BUDGET {message}")
+    if over_budget:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+# End-to-end benchmark suite: scoring, DB writes, page data loads and
+# reputation lookups, with JSON results and a regression check.
+#
+#   python benchmarks/bench_suite.py --sizes 10000 100000 --out results.json
+#   python benchmarks/bench_suite.py --out new.json --baseline results.json
+#   python benchmarks/bench_suite.py --results new.json --baseline results.json
+#
+# Every database size runs in its own child process, in a scratch directory
+# holding a users_data.db filled by datagen.py and a link to the model, so
+# the app's relative paths and its per-process connection pools point at
+# that database. The pages and the app run through Streamlit's AppTest with
+# a logged-in user put straight into session_state, so no browser or Auth0
+# is involved.
+#
+# With --baseline, metrics that got worse by more than --tolerance are
+# listed and the exit status is 1.
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+
+PREDICT_BATCH_SIZES = [1, 100, 10000, 100000]
+SINGLE_INSERTS = 200
+BULK_INSERT_ROWS = 20000
+USERS = 100
+BENCH_USER = {"name": "Bench", "email": "user0@example.com"}
+REPEATS = 5
+PAGE_REPEATS = 3
+TOLERANCE = 0.15
+# Sub-millisecond lookups jitter by more than TOLERANCE from run to run
+NOISE_FLOOR_MS = 0.1
+
+
+def median_seconds(fn, repeats=REPEATS):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def metric(value, unit, higher_is_better):
+    return {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+
+
+def environment():
+    import pandas as pd
+    import xgboost
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "xgboost": xgboost.__version__,
+        "sqlite": sqlite3.sqlite_version,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+# -------------------- SCORING --------------------
+def bench_scoring():
+    from datagen import generate_transactions, load_profile
+    from scoring import predict_fraud
+
+    frame = generate_transactions(max(PREDICT_BATCH_SIZES), profile=load_profile(os.path.join(ROOT, "upidata.csv")))
+    results = {}
+    for batch_size in PREDICT_BATCH_SIZES:
+        batch = frame.head(batch_size)
+        # predict_fraud rewrites Date, so every run gets a fresh copy
+        repeats = REPEATS if batch_size < 10000 else 3
+        seconds = median_seconds(lambda: predict_fraud(batch.copy()), repeats)
+        results[f"predict_fraud batch={batch_size}"] = metric(batch_size / seconds, "rows/s", True)
+    return results
+
+
+# -------------------- ONE DATABASE SIZE --------------------
+def fill_reputation(db_path, rows, rng):
+    upi_ids = rng.integers(0, max(rows // 10, 1), rows)
+    users = rng.integers(0, USERS, rows)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.executemany(
+            "INSERT INTO upi_reputation (upi_id, user_email, rating, flag_reason) VALUES (?, ?, ?, ?)",
+            zip((f"payee{u}@upi" for u in upi_ids.tolist()), (f"user{u}@example.com" for u in users.tolist()),
+                rng.integers(1, 6, rows).tolist(), np.where(rng.random(rows) < 0.1, "suspicious", None).tolist()),
+        )
+    conn.close()
+
+
+def time_page(page, setup=None):
+    from streamlit.testing.v1 import AppTest
+
+    def run():
+        at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+        at.session_state.user_info = BENCH_USER
+        at.run()
+        if setup is not None:
+            setup(at)
+        if at.exception:
+            raise RuntimeError(f"{page} raised: {at.exception[0].message}")
+
+    run()  # imports, model load and first connections are not what is measured
+    return median_seconds(run, PAGE_REPEATS)
+
+
+def click(at, label):
+    next(button for button in at.button if button.label == label).click().run()
+
+
+def click_single_check(at):
+    click(at, "Check Individual Transaction")
+
+
+def click_lookup(at):
+    at.text_input(key="lookup").set_value("payee1@upi")
+    click(at, "Check Reputation")
+
+
+def bench_database(rows):
+    from database import DB_PATH, log_transaction_to_db, log_transactions_to_db
+    from datagen import generate_chunks, generate_transactions, load_into_db, load_profile
+    from migrations import migrate
+    from queries import fetch_dashboard_rollups, fetch_latest_transactions, fetch_transaction_page
+    from reputation import fetch_submissions_page, get_reputation
+
+    profile = load_profile(os.path.join(ROOT, "upidata.csv"))
+    migrate(DB_PATH)
+    load_into_db(generate_chunks(rows, profile=profile), DB_PATH, USERS)
+    fill_reputation(DB_PATH, rows, np.random.default_rng(rows))
+
+    results = {}
+
+    def record(name, seconds):
+        results[f"db={rows} {name}"] = metric(seconds * 1000, "ms", False)
+
+    user = BENCH_USER["email"]
+    record("fetch_dashboard_rollups", median_seconds(lambda: fetch_dashboard_rollups(user)))
+    record("fetch_latest_transactions", median_seconds(lambda: fetch_latest_transactions(user)))
+    record("fetch_transaction_page", median_seconds(lambda: fetch_transaction_page(user)))
+    record("fetch_transaction_page filtered",
+           median_seconds(lambda: fetch_transaction_page(user, {"transaction_state": "Goa"})))
+    record("get_reputation", median_seconds(lambda: get_reputation("payee1@upi")))
+    record("fetch_submissions_page", median_seconds(lambda: fetch_submissions_page("payee1@upi")))
+
+    record("page dashboard", time_page("pages/1_dashboard.py"))
+    record("page transaction history", time_page("pages/3_Transaction_history.py"))
+    record("page reputation lookup", time_page("pages/2_Upi_Reputation_Tracker.py", click_lookup))
+    record("app single check", time_page("app.py", click_single_check))
+
+    scored = generate_transactions(SINGLE_INSERTS + BULK_INSERT_ROWS, seed=1, profile=profile)
+    scored["Date"] = scored["Date"].astype("int64") / 10**9
+    single = scored.head(SINGLE_INSERTS)
+    start = time.perf_counter()
+    for _, row in single.iterrows():
+        log_transaction_to_db("bench@example.com", row)
+    seconds = time.perf_counter() - start
+    results[f"db={rows} log_transaction_to_db"] = metric(SINGLE_INSERTS / seconds, "rows/s", True)
+
+    _, rows_per_sec = log_transactions_to_db("bench@example.com", scored.tail(BULK_INSERT_ROWS))
+    results[f"db={rows} log_transactions_to_db"] = metric(rows_per_sec, "rows/s", True)
+    return results
+
+
+# Runs bench_database in a child process inside a fresh scratch directory
+def run_size(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.symlink(os.path.join(ROOT, "UPI_Fraud_model.pkl"), os.path.join(tmp, "UPI_Fraud_model.pkl"))
+        out = os.path.join(tmp, "results.json")
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--child", str(rows), "--out", out],
+                       cwd=tmp, check=True)
+        with open(out) as f:
+            return json.load(f)
+
+
+# -------------------- COMPARISON --------------------
+# (name, baseline, current, relative change) for metrics that got worse by
+# more than tolerance; change is positive when worse
+def find_regressions(baseline, current, tolerance=TOLERANCE):
+    regressions = []
+    for name, now in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None or before["value"] == 0:
+            continue
+        if now["unit"] == "ms" and abs(now["value"] - before["value"]) < NOISE_FLOOR_MS:
+            continue
+        change = (now["value"] - before["value"]) / before["value"]
+        if now["higher_is_better"]:
+            change = -change
+        if change > tolerance:
+            regressions.append((name, before, now, change))
+    return regressions
+
+
+def print_results(current, baseline=None):
+    print(f"{'metric':>52} {'value':>14} {'unit':>7} {'baseline':>14} {'change':>8}")
+    for name, now in current["results"].items():
+        line = f"{name:>52} {now['value']:>14,.2f} {now['unit']:>7}"
+        before = (baseline or {"results": {}})["results"].get(name)
+        if before is not None:
+            change = (now["value"] - before["value"]) / before["value"] if before["value"] else 0.0
+            line += f" {before['value']:>14,.2f} {change:>+7.1%}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmarks with regression checks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--out", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--results", help="compare these JSON results instead of running the suite")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="relative slowdown that counts as a regression")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        with open(args.out, "w") as f:
+            json.dump(bench_database(args.child), f)
+        return
+
+    if args.results:
+        with open(args.results) as f:
+            current = json.load(f)
+    else:
+        os.chdir(ROOT)  # the model is loaded from a path relative to the repo
+        results = bench_scoring()
+        for rows in args.sizes:
+            results.update(run_size(rows))
+        current = {"environment": environment(), "results": results}
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(current, f, indent=2)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(current, baseline)
+
+    if baseline is not None:
+        regressions = find_regressions(baseline, current, args.tolerance)
+        for name, before, now, change in regressions:
+            print(f"REGRESSION {name}: {before['value']:,.2f} -> {now['value']:,.2f} {now['unit']} ({change:.1%} worse)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
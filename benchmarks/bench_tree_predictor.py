@@ -0,0 +1,65 @@
+# Latency of the compiled NumPy trees versus XGBClassifier.predict for
+# small batches, after checking both give identical labels on upidata.csv
+# and on synthetic rows.
+#
+#   python benchmarks/bench_tree_predictor.py --sizes 1 10 100 1000
+#
+# Both sides get the same already-encoded float32 matrix, so the numbers are
+# the predictor alone. The last column is predict_fraud end to end (encoding
+# included), which picks the faster engine by batch size.
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from datagen import generate_transactions, load_profile
+from model_registry import get_model
+from scoring import UPLOAD_COLUMNS, encode_transactions, predict_fraud, prepare_upload
+from tree_predictor import CompiledTrees
+
+
+def check_parity(loaded, compiled, features, label):
+    expected = loaded.model.predict(features)
+    got = compiled.predict(features)
+    if not np.array_equal(got, expected):
+        raise SystemExit(f"{label}: {np.count_nonzero(got != expected)} of {len(features)} labels differ")
+    print(f"{label}: all {len(features):,} labels match")
+
+
+def per_call_ms(fn, rows):
+    number = max(20, 5000 // rows)
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compiled trees vs XGBClassifier.predict latency")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    loaded = get_model()
+    compiled = CompiledTrees.from_booster(loaded.booster)
+
+    sample = prepare_upload(pd.read_csv("upidata.csv", usecols=UPLOAD_COLUMNS))
+    check_parity(loaded, compiled, encode_transactions(sample, loaded), "upidata.csv")
+    transactions = generate_transactions(max(max(args.sizes), 100000), profile=load_profile())
+    check_parity(loaded, compiled, encode_transactions(transactions.copy(), loaded), "synthetic")
+
+    print(f"{'rows':>6} {'xgboost ms':>11} {'compiled ms':>12} {'speedup':>8} {'predict_fraud ms':>17}")
+    for rows in args.sizes:
+        batch = transactions.head(rows)
+        features = encode_transactions(batch.copy(), loaded)
+        booster = per_call_ms(lambda: loaded.model.predict(features), rows)
+        trees = per_call_ms(lambda: compiled.predict(features), rows)
+        end_to_end = per_call_ms(lambda: predict_fraud(batch.copy()), rows)
+        print(f"{rows:>6} {booster:>11.3f} {trees:>12.3f} {booster / trees:>7.2f}x {end_to_end:>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Throughput of the velocity feature store: updates, lookups and snapshots.
+#
+#   python benchmarks/bench_velocity.py --events 5000000 --customers 500000
+#
+# Events are synthetic transactions in time order over --days days, spread
+# over --customers customers with a Zipf-like skew (a few customers transact
+# a lot, most rarely), fed to one VelocityStore in batches of each
+# --batch-size. Before timing anything, the window counts and amounts of a
+# sample of customers are checked against a brute-force count over the raw
+# events.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from velocity import VelocityStore
+
+
+def make_events(n_events, n_customers, days, seed):
+    rng = np.random.default_rng(seed)
+    codes = (rng.pareto(1.2, n_events) * n_customers / 20).astype(np.int64) % n_customers
+    timestamps = 1.7e9 + np.sort(rng.uniform(0, days * 86400, n_events))
+    amounts = np.round(rng.lognormal(6, 1.2, n_events), 2)
+    keys = np.array([f"cust-{code:08d}" for code in range(n_customers)], dtype=object)[codes]
+    return codes, keys, timestamps, amounts
+
+
+def feed(store, keys, timestamps, amounts, batch_size):
+    start = time.perf_counter()
+    for offset in range(0, len(keys), batch_size):
+        end = offset + batch_size
+        store.update(keys[offset:end], timestamps[offset:end], amounts[offset:end])
+    return time.perf_counter() - start
+
+
+def check(store, codes, keys, timestamps, amounts, samples, seed):
+    rng = np.random.default_rng(seed)
+    now = timestamps[-1]
+    sample = rng.choice(np.unique(codes), size=min(samples, len(np.unique(codes))), replace=False)
+    sample_keys = [keys[np.argmax(codes == code)] for code in sample]
+    features = store.query(sample_keys, now)
+    for i, code in enumerate(sample):
+        mine = codes == code
+        for name, seconds in store.windows:
+            width = seconds / store.buckets
+            bucket = np.floor(timestamps[mine] / width)
+            current = np.floor(now / width)
+            live = (bucket > current - store.buckets) & (bucket <= current)
+            if features[f"count_{name}"][i] != live.sum():
+                raise AssertionError(f"{sample_keys[i]} count_{name}: {features[f'count_{name}'][i]} != {live.sum()}")
+            if not np.isclose(features[f"amount_{name}"][i], amounts[mine][live].sum(), rtol=1e-4):
+                raise AssertionError(f"{sample_keys[i]} amount_{name} differs")
+        if features["count_total"][i] != mine.sum():
+            raise AssertionError(f"{sample_keys[i]} count_total differs")
+        if features["seconds_since_last"][i] != now - timestamps[mine].max():
+            raise AssertionError(f"{sample_keys[i]} seconds_since_last differs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Velocity feature store throughput")
+    parser.add_argument("--events", type=int, default=5000000)
+    parser.add_argument("--customers", type=int, default=500000)
+    parser.add_argument("--days", type=float, default=14)
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=100000)
+    parser.add_argument("--check-samples", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    codes, keys, timestamps, amounts = make_events(args.events, args.customers, args.days, args.seed)
+    print(f"{args.events:,} events, {len(np.unique(codes)):,} active customers over {args.days:g} days")
+
+    # Checked on a prefix small enough for the brute force
+    prefix = min(args.events, 500000)
+    store = VelocityStore()
+    feed(store, keys[:prefix], timestamps[:prefix], amounts[:prefix], 10000)
+    check(store, codes[:prefix], keys[:prefix], timestamps[:prefix], amounts[:prefix], args.check_samples, args.seed)
+    print(f"features match a brute-force count for {args.check_samples} customers")
+
+    print(f"{'batch':>8} {'events/min':>14} {'keys':>10} {'state MB':>9}")
+    for batch_size in args.batch_size:
+        store = VelocityStore()
+        seconds = feed(store, keys, timestamps, amounts, batch_size)
+        print(f"{batch_size:>8,} {args.events / seconds * 60:>14,.0f} {len(store):>10,} {store.nbytes / 2**20:>9.1f}")
+
+    rng = np.random.default_rng(args.seed + 1)
+    lookup_keys = keys[rng.integers(0, len(keys), args.lookups)]
+    now = timestamps[-1]
+    start = time.perf_counter()
+    store.query(lookup_keys, now)
+    batched = time.perf_counter() - start
+    single_keys = lookup_keys[:10000].tolist()
+    start = time.perf_counter()
+    for key in single_keys:
+        store.lookup(key, now)
+    single = (time.perf_counter() - start) / len(single_keys)
+    print(f"lookups: {args.lookups / batched:,.0f} keys/s batched, {single * 1e6:.1f} us for a single key")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "velocity.npz")
+        start = time.perf_counter()
+        store.save(path)
+        saved = time.perf_counter() - start
+        start = time.perf_counter()
+        restored = VelocityStore.load(path)
+        loaded = time.perf_counter() - start
+        size = os.path.getsize(path) / 2**20
+    sample = lookup_keys[:1000]
+    if any(not np.array_equal(values, restored.query(sample, now)[name], equal_nan=True)
+           for name, values in store.query(sample, now).items()):
+        raise AssertionError("restored snapshot answers differently")
+    print(f"snapshot: {size:.1f} MB, saved in {saved:.2f}s, restored in {loaded:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Times TransactionEncoder against the old get_dummies + reindex encoding.
+#
+#   python benchmarks/check_encoder_parity.py [--csv upidata.csv] [--repeat 20]
+#
+# That both produce the same matrix and predictions is checked by
+# tests/test_encoder.py.
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pandas as pd
+
+from encoder import CATEGORICAL_COLUMNS
+from model_registry import ModelRegistry
+
+
+def legacy_encode(transaction_data, feature_names):
+    transaction_data = pd.get_dummies(transaction_data, columns=CATEGORICAL_COLUMNS, drop_first=True)
+    return transaction_data.reindex(columns=feature_names, fill_value=0)
+
+
+def load_batch(csv_path):
+    df = pd.read_csv(csv_path)
+    return pd.DataFrame({
+        "Date": pd.to_datetime(df['Date'], format="%d/%m/%y").astype("int64") / 10**9,
+        "Transaction_Type": df['Transaction_Type'],
+        "Payment_Gateway": df['Payment_Gateway'],
+        "Transaction_State": df['Transaction_State'],
+        "Merchant_Category": df['Merchant_Category'],
+        "amount": df['amount']
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TransactionEncoder timing")
+    parser.add_argument("--csv", default=os.path.join(ROOT, "upidata.csv"))
+    parser.add_argument("--model", default=os.path.join(ROOT, "UPI_Fraud_model.pkl"))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    loaded = ModelRegistry(args.model).get()
+    batch = load_batch(args.csv)
+    print(f"{len(batch)} rows of {os.path.basename(args.csv)}")
+
+    for label, encode in (
+        ("get_dummies + reindex", lambda: legacy_encode(batch, loaded.feature_names)),
+        ("TransactionEncoder", lambda: loaded.encoder.transform(batch)),
+    ):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            encode()
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{label:>22}: {elapsed * 1000:8.3f} ms per batch")
+
+
+if __name__ == "__main__":
+    main()
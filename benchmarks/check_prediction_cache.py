@@ -0,0 +1,70 @@
+# Times an individual check through uncached predict_fraud, a
+# PredictionCache miss (built from the encoded-row templates) and a hit.
+#
+#   python benchmarks/check_prediction_cache.py [--repeat 2000]
+#
+# Checks are built from the app's selectbox vocabularies. That the cache
+# answers exactly like predict_fraud is checked by
+# tests/test_prediction_cache.py.
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+from prediction_cache import PredictionCache
+from scoring import predict_fraud
+from vocabulary import MERCHANT_CATEGORIES, PAYMENT_GATEWAYS, TRANSACTION_STATES, TRANSACTION_TYPES
+
+
+def random_check(rng):
+    return pd.DataFrame({
+        # A datetime.date, as st.date_input returns
+        "Date": [(pd.Timestamp("2024-01-01") + pd.Timedelta(days=int(rng.integers(0, 730)))).date()],
+        "Transaction_Type": [TRANSACTION_TYPES[rng.integers(len(TRANSACTION_TYPES))]],
+        "Payment_Gateway": [PAYMENT_GATEWAYS[rng.integers(len(PAYMENT_GATEWAYS))]],
+        "Transaction_State": [TRANSACTION_STATES[rng.integers(len(TRANSACTION_STATES))]],
+        "Merchant_Category": [MERCHANT_CATEGORIES[rng.integers(len(MERCHANT_CATEGORIES))]],
+        # Round and edge amounts as well as odd ones
+        "amount": [float(rng.choice([0.0, 0.01, 500000.0, rng.integers(1, 200) * 100.0,
+                                     round(rng.uniform(0, 20000), 2)]))],
+    })
+
+
+def time_per_call(fn, make_frame, repeat):
+    frames = [make_frame() for _ in range(repeat)]
+    start = time.perf_counter()
+    for frame in frames:
+        fn(frame)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PredictionCache timing")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    rng = np.random.default_rng(0)
+
+    # Misses mostly reuse a template here; hits repeat one check
+    missing = PredictionCache(max_entries=1)
+    warm = PredictionCache()
+    fixed = random_check(rng)
+    warm.predict(fixed.copy())
+    for label, fn, make_frame in (
+        ("predict_fraud", predict_fraud, lambda: random_check(rng)),
+        ("cache miss", missing.predict, lambda: random_check(rng)),
+        ("cache hit", warm.predict, fixed.copy),
+    ):
+        elapsed = time_per_call(fn, make_frame, args.repeat)
+        print(f"{label:>14}: {elapsed * 1e6:8.1f} us per check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+# Chart data for uploads and the dashboard.
+#
+# Charts used to get every row they were built from: the amount-over-time
+# line of an upload had a point per distinct timestamp, and the browser got
+# all of them as JSON on every rerun. Here a chart's data is aggregated
+# first and then cut down to what a chart a few hundred pixels wide can
+# show, so its payload doesn't grow with the upload:
+#
+#   - a time series is summed per timestamp, then reduced to CHART_POINTS
+#     points with Largest-Triangle-Three-Buckets, which keeps the spikes
+#     and dips that give the line its shape;
+#   - a bar chart of categories keeps the MAX_CATEGORIES largest and sums
+#     the rest into "Other".
+#
+# Built charts (plotly figures, Vega-Lite specs) are cached per dataset
+# hash in a process-wide ChartCache, so a rerun of the same page over the
+# same data, which Streamlit does on every widget interaction, skips the
+# aggregation and the chart building.
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CHART_POINTS = int(os.environ.get("PAYGUARD_CHART_POINTS", "1000"))
+MAX_CATEGORIES = 20
+CHART_CACHE_SIZE = int(os.environ.get("PAYGUARD_CHART_CACHE_SIZE", "128"))
+
+
+# -------------------- DOWNSAMPLING --------------------
+# Indices of `points` points of the series (x, y), x sorted, chosen with
+# Largest-Triangle-Three-Buckets: the first and last points are kept, the
+# rest are split into points - 2 buckets, and from each bucket the point
+# forming the largest triangle with the point kept from the previous bucket
+# and the mean of the next bucket is kept.
+def lttb(x, y, points):
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, points - 1).astype(np.intp)
+    edges[-1] = n - 1
+
+    selected = np.empty(points, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    kept = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x = x[end:edges[i + 2]].mean()
+            next_y = y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[kept] - next_x) * (y[start:end] - y[kept])
+                      - (x[kept] - x[start:end]) * (next_y - y[kept]))
+        kept = start + int(np.argmax(area))
+        selected[i + 1] = kept
+    return selected
+
+
+# Series (index x, values y) cut down to at most `points` points. An index
+# that isn't numbers or dates is spaced evenly.
+def downsample(series, points=CHART_POINTS):
+    if len(series) <= points:
+        return series
+    x = series.index
+    if isinstance(x, pd.DatetimeIndex):
+        x = x.asi8
+    elif not pd.api.types.is_numeric_dtype(x):
+        x = np.arange(len(x))
+    return series.iloc[lttb(np.asarray(x), series.to_numpy(), points)]
+
+
+# Total amount per distinct date, downsampled, as a frame with Date and
+# amount columns
+def amount_over_time(dates, amounts, points=CHART_POINTS):
+    totals = pd.Series(np.asarray(amounts, dtype=np.float64)).groupby(np.asarray(dates), sort=True).sum()
+    return downsample(totals, points).rename_axis('Date').reset_index(name='amount')
+
+
+# The `limit` rows with the largest `value`, and the rest summed into one
+# "Other" row
+def top_categories(frame, label, value, limit=MAX_CATEGORIES, other="Other"):
+    frame = frame.groupby(label, as_index=False, sort=False)[value].sum().sort_values(value, ascending=False)
+    if len(frame) <= limit:
+        return frame.reset_index(drop=True)
+    top = frame[frame[label] != other].iloc[:limit - 1]
+    rest = frame[value].sum() - top[value].sum()
+    return pd.concat([top, pd.DataFrame({label: [other], value: [rest]})], ignore_index=True)
+
+
+# -------------------- SPEC CACHE --------------------
+# Digest of the data a chart is built from: any mix of Series, DataFrames,
+# arrays and plain values. A default RangeIndex is hashed by its bounds
+# rather than row by row, which would triple the cost on a large upload.
+def dataset_hash(*parts):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = pd.Series(part)
+        if isinstance(part, (pd.Series, pd.DataFrame)):
+            range_index = isinstance(part.index, pd.RangeIndex)
+            digest.update(pd.util.hash_pandas_object(part, index=not range_index).to_numpy().tobytes())
+            if range_index:
+                digest.update(repr(part.index).encode())
+            if isinstance(part, pd.DataFrame):
+                digest.update(repr(list(part.columns)).encode())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Built charts keyed on (chart name, dataset hash), least recently used
+# dropped first. Entries are shared by every session of the app process
+# and must not be changed after they are built.
+class ChartCache:
+    def __init__(self, max_entries=CHART_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # The chart stored under (name, digest), built with build() the first time
+    def get(self, name, digest, build):
+        key = (name, digest)
+        with self._lock:
+            chart = self._entries.get(key)
+            if chart is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return chart
+            self.misses += 1
+
+        chart = build()
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = chart
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return chart
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_chart_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ChartCache()
+    return _cache
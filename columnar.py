@@ -0,0 +1,231 @@
+# Parquet and Arrow IPC uploads and exports, next to the CSV path.
+#
+#   python columnar.py export-transactions --out transactions.parquet [--user EMAIL]
+#   python columnar.py export-transactions --out transactions.arrow
+#
+# Uploads are read with column projection, so only the columns scoring
+# needs are decoded, and a Date column stored as a timestamp arrives as
+# datetime64 without any text parsing. Files on disk are memory-mapped;
+# uploads, which Streamlit keeps in memory, are wrapped without a copy.
+#
+# pyarrow is imported on first use; it ships with Streamlit, but the CSV
+# path and the scoring service run without it.
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from database import DB_PATH
+from queries import iter_transactions
+
+# File extension -> format
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow",
+           ".arrows": "arrow"}
+UPLOAD_TYPES = [extension[1:] for extension in FORMATS]
+EXPORT_FORMATS = ("parquet", "arrow")
+MIME_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet",
+              "arrow": "application/vnd.apache.arrow.file"}
+
+# Scored copies of streamed uploads, kept for download. A session removes
+# its own when it moves on; the ones left by sessions that ended are
+# removed once they are older than EXPORT_MAX_AGE_SECONDS.
+EXPORTS_DIR = os.environ.get("PAYGUARD_EXPORTS_DIR", "upload_exports")
+EXPORT_MAX_AGE_SECONDS = float(os.environ.get("PAYGUARD_EXPORT_MAX_AGE_HOURS", "6")) * 3600
+EXPORT_PREFIX = "payguard-export-"
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Parquet and Arrow files need pyarrow (pip install pyarrow)")
+    return pa, pq
+
+
+# Format of a file from its name; anything unknown is read as CSV
+def file_format(name):
+    return FORMATS.get(os.path.splitext(name or "")[1].lower(), "csv")
+
+
+# -------------------- READING --------------------
+# A path is memory-mapped; an in-memory upload (BytesIO, Streamlit's
+# UploadedFile) is wrapped in place through its buffer
+def _input(pa, source):
+    if isinstance(source, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(source))
+    if hasattr(source, "getbuffer"):
+        return pa.BufferReader(pa.py_buffer(source.getbuffer()))
+    return pa.BufferReader(pa.py_buffer(source.read()))
+
+
+def _check_columns(names, columns):
+    missing = [column for column in columns if column not in names]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(missing)}")
+
+
+# Arrow IPC comes as a file (random access, .arrow/.feather) or a stream
+def _ipc_table(pa, source):
+    try:
+        return pa.ipc.open_file(_input(pa, source)).read_all()
+    except pa.ArrowInvalid:
+        return pa.ipc.open_stream(_input(pa, source)).read_all()
+
+
+# Each column is released as soon as it is converted, so an upload is not
+# held twice over at its peak
+def _to_pandas(table):
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+# Only `columns` of a Parquet or Arrow upload, as a DataFrame
+def read_columnar(source, fmt, columns):
+    pa, pq = _pyarrow()
+    if fmt == "parquet":
+        parquet = pq.ParquetFile(_input(pa, source))
+        _check_columns(parquet.schema_arrow.names, columns)
+        table = parquet.read(columns=columns)
+    else:
+        table = _ipc_table(pa, source)
+        _check_columns(table.column_names, columns)
+        table = table.select(columns)
+    return _to_pandas(table)
+
+
+# The same, as DataFrames of at most chunk_size rows, plus the total row
+# count (known up front from the file's metadata)
+def iter_columnar(source, fmt, columns, chunk_size):
+    pa, pq = _pyarrow()
+    if fmt == "parquet":
+        parquet = pq.ParquetFile(_input(pa, source))
+        _check_columns(parquet.schema_arrow.names, columns)
+        batches = parquet.iter_batches(batch_size=chunk_size, columns=columns)
+        total = parquet.metadata.num_rows
+    else:
+        # Mapped or wrapped in place, so reading it all holds no extra copy
+        table = _ipc_table(pa, source)
+        _check_columns(table.column_names, columns)
+        batches = table.select(columns).to_batches(max_chunksize=chunk_size)
+        total = table.num_rows
+    return total, (batch.to_pandas() for batch in batches)
+
+
+# -------------------- WRITING --------------------
+# Writes DataFrames one after the other into a Parquet or Arrow IPC file.
+# The schema is fixed by the first frame unless given.
+class ColumnarWriter:
+    def __init__(self, sink, fmt, schema=None):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"cannot export to {fmt!r}, only to {', '.join(EXPORT_FORMATS)}")
+        self.pa, self.pq = _pyarrow()
+        self.sink = sink
+        self.fmt = fmt
+        self.schema = schema
+        self.rows = 0
+        self._writer = None
+
+    def write(self, df):
+        table = self.pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        if self._writer is None:
+            self.schema = table.schema
+            if self.fmt == "parquet":
+                self._writer = self.pq.ParquetWriter(self.sink, self.schema)
+            else:
+                self._writer = self.pa.ipc.new_file(self.sink, self.schema)
+        self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is None and self.schema is not None:
+            self.write(self.schema.empty_table().to_pandas())
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# A scored DataFrame as the bytes of a Parquet or Arrow file, for downloads
+def frame_to_bytes(df, fmt):
+    sink = io.BytesIO()
+    with ColumnarWriter(sink, fmt) as writer:
+        writer.write(df)
+    return sink.getvalue()
+
+
+# A new, empty export file in exports_dir, open for writing. Stale exports
+# are cleared out first, so the directory only ever holds recent ones.
+def new_export_file(fmt, exports_dir=EXPORTS_DIR):
+    os.makedirs(exports_dir, exist_ok=True)
+    remove_stale_exports(exports_dir)
+    return tempfile.NamedTemporaryFile(dir=exports_dir, prefix=EXPORT_PREFIX, suffix=f".{fmt}", delete=False)
+
+
+# Removes exports last written more than max_age seconds ago and returns
+# how many were removed
+def remove_stale_exports(exports_dir=EXPORTS_DIR, max_age=EXPORT_MAX_AGE_SECONDS):
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(exports_dir))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if not entry.name.startswith(EXPORT_PREFIX):
+            continue
+        # Another session may be removing the same file
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+# -------------------- TRANSACTIONS TABLE --------------------
+def transaction_schema():
+    pa, _ = _pyarrow()
+    return pa.schema([
+        ("id", pa.int64()), ("user_email", pa.string()), ("date", pa.string()),
+        ("transaction_type", pa.string()), ("payment_gateway", pa.string()),
+        ("transaction_state", pa.string()), ("merchant_category", pa.string()),
+        ("amount", pa.float64()), ("is_fraud", pa.int64()),
+    ])
+
+
+# Streams the transactions table (or one user's rows) into sink in id
+# order, a chunk at a time, so memory does not grow with the table.
+# Returns the number of rows written.
+def export_transactions(sink, fmt, user_email=None, db_path=DB_PATH):
+    with ColumnarWriter(sink, fmt, transaction_schema()) as writer:
+        for chunk in iter_transactions(user_email, db_path=db_path):
+            writer.write(chunk)
+    return writer.rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the transactions table to Parquet or Arrow")
+    parser.add_argument("command", choices=["export-transactions"])
+    parser.add_argument("--out", required=True, help="a .parquet or .arrow file")
+    parser.add_argument("--user", help="only this user's transactions")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    fmt = file_format(args.out)
+    if fmt not in EXPORT_FORMATS:
+        parser.error("--out must end in .parquet or .arrow")
+    start = time.perf_counter()
+    rows = export_transactions(args.out, fmt, args.user, args.db)
+    elapsed = time.perf_counter() - start
+    print(f"wrote {rows:,} transactions to {args.out} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
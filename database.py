@@ -0,0 +1,282 @@
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import pandas as pd
+
+from metrics import stage
+from migrations import TRANSACTION_ROLLUP_BACKFILL, TRANSACTION_ROLLUP_UPSERTS, apply_pragmas, ensure_migrated
+
+DB_PATH = "users_data.db"
+BULK_CHUNK_SIZE = 10000
+POOL_SIZE = 8
+POOL_TIMEOUT = 30.0
+# Per-connection cache of prepared statements, keyed by SQL text
+STATEMENT_CACHE_SIZE = 256
+
+TRANSACTION_COLUMNS = ["Date", "Transaction_Type", "Payment_Gateway", "Transaction_State", "Merchant_Category", "amount", "fraud"]
+
+INSERT_TRANSACTION = """
+    INSERT INTO transactions (
+        user_email, date, transaction_type, payment_gateway,
+        transaction_state, merchant_category, amount, is_fraud
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+# A single connection outside the pool, for scripts and one-off maintenance.
+# The schema is migrated once per process and the pragmas are applied.
+def connect(db_path=DB_PATH):
+    ensure_migrated(db_path)
+    conn = sqlite3.connect(db_path)
+    apply_pragmas(conn)
+    return conn
+
+
+# -------------------- DATA-ACCESS LAYER --------------------
+# One Database per file per process, shared by the app and every page:
+#   * reads borrow a connection from a bounded pool,
+#   * writes are queued to a single writer thread with its own connection,
+#     so sessions never race each other for the write lock,
+#   * every query is timed under a name, see query_stats().
+# Statements are reused through sqlite3's per-connection statement cache,
+# which is why the SQL strings are module constants.
+class Database:
+    def __init__(self, db_path=DB_PATH, pool_size=POOL_SIZE):
+        ensure_migrated(db_path)
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._writes = queue.Queue()
+        self._writer = None
+        self._stats = {}
+
+    def _open(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE)
+        apply_pragmas(conn)
+        return conn
+
+    # -------------------- READS --------------------
+    @contextmanager
+    def connection(self, timeout=POOL_TIMEOUT):
+        conn = self._acquire(timeout)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_open = self._opened < self.pool_size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            return self._open()
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no database connection free after {timeout}s ({self.pool_size} in use)")
+
+    def fetch_all(self, sql, params=(), name=None):
+        with self.connection() as conn, self.timed(name or sql):
+            return conn.execute(sql, params).fetchall()
+
+    def fetch_one(self, sql, params=(), name=None):
+        with self.connection() as conn, self.timed(name or sql):
+            return conn.execute(sql, params).fetchone()
+
+    def read_frame(self, sql, params=(), name=None):
+        with self.connection() as conn, self.timed(name or sql):
+            return pd.read_sql_query(sql, conn, params=params)
+
+    # -------------------- WRITES --------------------
+    # work(conn) runs on the writer thread inside a transaction that is
+    # committed when it returns and rolled back if it raises.
+    def submit_write(self, work, name=None):
+        future = Future()
+        self._ensure_writer()
+        self._writes.put((work, name or getattr(work, "__name__", "write"), future))
+        return future
+
+    def write(self, work, name=None):
+        return self.submit_write(work, name).result()
+
+    def execute(self, sql, params=(), name=None):
+        return self.write(lambda conn: conn.execute(sql, params).rowcount, name or sql)
+
+    def _ensure_writer(self):
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._run_writer, name="db-writer", daemon=True)
+                    self._writer.start()
+
+    def _run_writer(self):
+        conn = self._open()
+        while True:
+            work, name, future = self._writes.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with self.timed(name), conn:
+                    result = work(conn)
+            except Exception as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+    # -------------------- INSTRUMENTATION --------------------
+    @contextmanager
+    def timed(self, name):
+        name = _query_name(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                count, total, worst = self._stats.get(name, (0, 0.0, 0.0))
+                self._stats[name] = (count + 1, total + elapsed, max(worst, elapsed))
+
+    def query_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        return {
+            name: {"count": count, "total_ms": total * 1000, "mean_ms": total / count * 1000, "max_ms": worst * 1000}
+            for name, (count, total, worst) in sorted(stats.items())
+        }
+
+
+def _query_name(name):
+    return re.sub(r"\s+", " ", name).strip()[:80]
+
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path=DB_PATH):
+    database = _databases.get(db_path)
+    if database is None:
+        with _databases_lock:
+            database = _databases.get(db_path)
+            if database is None:
+                database = _databases[db_path] = Database(db_path)
+    return database
+
+
+def fetch_all(sql, params=(), name=None, db_path=DB_PATH):
+    return get_database(db_path).fetch_all(sql, params, name)
+
+
+def fetch_one(sql, params=(), name=None, db_path=DB_PATH):
+    return get_database(db_path).fetch_one(sql, params, name)
+
+
+def read_frame(sql, params=(), name=None, db_path=DB_PATH):
+    return get_database(db_path).read_frame(sql, params, name)
+
+
+def write(work, name=None, db_path=DB_PATH):
+    return get_database(db_path).write(work, name)
+
+
+def query_stats(db_path=DB_PATH):
+    return get_database(db_path).query_stats()
+
+
+# query_stats() of every database opened in this process, by path
+def all_query_stats():
+    with _databases_lock:
+        databases = dict(_databases)
+    return {db_path: database.query_stats() for db_path, database in databases.items()}
+
+
+# -------------------- DASHBOARD ROLLUPS --------------------
+# Folds freshly inserted transactions (ids first_id..last_id) into
+# transaction_rollups. Must run in the same transaction as the insert.
+def update_rollups(conn, first_id, last_id):
+    for statement in TRANSACTION_ROLLUP_UPSERTS:
+        conn.execute(statement, (first_id, last_id))
+
+
+# Recomputes every rollup from the transactions table, e.g. after rows were
+# inserted without going through this module
+def rebuild_rollups(db_path=DB_PATH):
+    def rebuild(conn):
+        conn.execute("DELETE FROM transaction_rollups")
+        conn.execute(TRANSACTION_ROLLUP_BACKFILL)
+
+    get_database(db_path).write(rebuild, name="rebuild_rollups")
+
+
+# -------------------- SINGLE TRANSACTION --------------------
+def log_transaction_to_db(user_email, row, db_path=DB_PATH):
+    values = (
+        user_email,
+        row["Date"],
+        row["Transaction_Type"],
+        row["Payment_Gateway"],
+        row["Transaction_State"],
+        row["Merchant_Category"],
+        row["amount"],
+        row["fraud"]
+    )
+    # numpy scalars (e.g. the prediction) would otherwise be stored as blobs
+    values = tuple(value.item() if hasattr(value, "item") else value for value in values)
+
+    def insert(conn):
+        row_id = conn.execute(INSERT_TRANSACTION, values).lastrowid
+        update_rollups(conn, row_id, row_id)
+
+    with stage("db.log_transaction", rows=1):
+        get_database(db_path).write(insert, name="log_transaction")
+
+
+# -------------------- BULK UPLOADS --------------------
+# Inserts a scored DataFrame and folds it into the rollups, on a connection
+# already inside a write transaction. user_email is one address for every
+# row, or a sequence with one address per row. Columns are converted with
+# tolist() so sqlite gets plain Python values (numpy ints would otherwise
+# be stored as blobs).
+def insert_transactions(conn, user_email, df, chunk_size=BULK_CHUNK_SIZE):
+    for offset in range(0, len(df), chunk_size):
+        chunk = df.iloc[offset:offset + chunk_size]
+        columns = [chunk[column].tolist() for column in TRANSACTION_COLUMNS]
+        if isinstance(user_email, str):
+            emails = [user_email] * len(chunk)
+        else:
+            emails = list(user_email[offset:offset + len(chunk)])
+        conn.executemany(INSERT_TRANSACTION, zip(emails, *columns))
+        # The chunk's ids are contiguous: the writer holds the write lock for the whole statement
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        update_rollups(conn, last_id - len(chunk) + 1, last_id)
+
+
+# Logs a whole scored DataFrame in one transaction on the writer connection.
+# Returns (rows, rows/sec).
+def log_transactions_to_db(user_email, df, db_path=DB_PATH, chunk_size=BULK_CHUNK_SIZE):
+    start = time.perf_counter()
+    total = len(df)
+    if total == 0:
+        return 0, 0.0
+
+    def insert_chunks(conn):
+        insert_transactions(conn, user_email, df, chunk_size)
+
+    with stage("db.log_transactions", rows=total):
+        get_database(db_path).write(insert_chunks, name="log_transactions")
+    elapsed = time.perf_counter() - start
+    return total, total / elapsed if elapsed > 0 else float("inf")
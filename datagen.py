@@ -0,0 +1,160 @@
+# Synthetic transactions for load tests and benchmarks.
+#
+#   python datagen.py --rows 10000000 --out big.csv
+#   python datagen.py --rows 10000000 --out big.parquet
+#   python datagen.py --rows 1000000 --db scratch.db --users 1000
+#
+# Categories come from the app's vocabularies, weighted by how often they
+# appear in upidata.csv (values the app does not offer count as "Other").
+# Amounts are drawn from upidata.csv's empirical distribution, dates
+# uniformly from its date range and fraud labels at its fraud rate. Rows are
+# generated a chunk at a time with NumPy, so memory stays flat however many
+# rows are asked for, and the same --seed always gives the same rows.
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from database import get_database, insert_transactions
+from vocabulary import VOCABULARIES
+
+SAMPLE_PATH = "upidata.csv"
+GENERATE_CHUNK_SIZE = 200000
+# Vocabulary values missing from the sample still turn up now and then
+UNSEEN_WEIGHT = 1.0
+SECONDS_PER_DAY = 86400
+
+
+class TransactionProfile:
+    def __init__(self, sample):
+        self.weights = {}
+        for column, vocabulary in VOCABULARIES.items():
+            values = sample[column].where(sample[column].isin(vocabulary), "Other")
+            counts = values.value_counts().reindex(vocabulary, fill_value=0).to_numpy(dtype="float64")
+            counts = np.maximum(counts, UNSEEN_WEIGHT)
+            self.weights[column] = counts / counts.sum()
+        self.vocabularies = {column: np.array(vocabulary, dtype=object) for column, vocabulary in VOCABULARIES.items()}
+
+        self.amounts = np.sort(sample["amount"].to_numpy(dtype="float64"))
+        dates = pd.to_datetime(sample["Date"], format="%d/%m/%y")
+        self.first_day = int(dates.min().timestamp()) // SECONDS_PER_DAY
+        self.days = int(dates.max().timestamp()) // SECONDS_PER_DAY - self.first_day + 1
+        self.fraud_rate = float(sample["fraud"].mean())
+
+    # n amounts by inverse-CDF sampling of the sample's sorted amounts
+    def sample_amounts(self, rng, n):
+        positions = rng.random(n) * (len(self.amounts) - 1)
+        return np.interp(positions, np.arange(len(self.amounts)), self.amounts).round(2)
+
+
+def load_profile(path=SAMPLE_PATH):
+    return TransactionProfile(pd.read_csv(path, usecols=list(VOCABULARIES) + ["Date", "amount", "fraud"]))
+
+
+# One chunk of n transactions in the upload layout plus the fraud label.
+# Date is datetime64 at day resolution, like a parsed upload.
+def generate_frame(n, rng, profile):
+    frame = {
+        "Date": pd.to_datetime((profile.first_day + rng.integers(0, profile.days, n)) * SECONDS_PER_DAY, unit="s"),
+    }
+    for column, vocabulary in profile.vocabularies.items():
+        frame[column] = vocabulary[rng.choice(len(vocabulary), n, p=profile.weights[column])]
+    frame["amount"] = profile.sample_amounts(rng, n)
+    frame["fraud"] = (rng.random(n) < profile.fraud_rate).astype("int64")
+    return pd.DataFrame(frame)
+
+
+# Yields frames of up to chunk_size rows until rows have been generated
+def generate_chunks(rows, chunk_size=GENERATE_CHUNK_SIZE, seed=0, profile=None):
+    profile = profile or load_profile()
+    rng = np.random.default_rng(seed)
+    for offset in range(0, rows, chunk_size):
+        yield generate_frame(min(chunk_size, rows - offset), rng, profile)
+
+
+def generate_transactions(rows, seed=0, profile=None):
+    return pd.concat(generate_chunks(rows, seed=seed, profile=profile), ignore_index=True)
+
+
+# -------------------- SINKS --------------------
+def write_csv(chunks, path):
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(path, mode="w" if i == 0 else "a", header=i == 0, index=False, date_format="%Y-%m-%d")
+        rows += len(chunk)
+    return rows
+
+
+def write_parquet(chunks, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("writing Parquet needs pyarrow (pip install pyarrow)")
+
+    rows = 0
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+# Inserts straight into the transactions table, spread over `users` users,
+# with dates stored as epoch seconds the way the app logs them. Each chunk
+# is one writer job through database.insert_transactions, which also folds
+# the chunk into the dashboard rollups.
+def load_into_db(chunks, db_path, users=1, seed=0):
+    database = get_database(db_path)
+    emails = np.array([f"user{i}@example.com" for i in range(users)], dtype=object)
+    rng = np.random.default_rng(seed + 1)
+    rows = 0
+    for chunk in chunks:
+        chunk["Date"] = chunk["Date"].astype("int64") // 10**9 * 1.0
+        chunk_emails = emails[rng.integers(0, users, len(chunk))].tolist()
+        database.write(lambda conn, chunk=chunk, chunk_emails=chunk_emails:
+                       insert_transactions(conn, chunk_emails, chunk), name="datagen.load")
+        rows += len(chunk)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic UPI transactions")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--chunk-size", type=int, default=GENERATE_CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sample", default=SAMPLE_PATH, help="CSV the distributions are taken from")
+    sink = parser.add_mutually_exclusive_group(required=True)
+    sink.add_argument("--out", help="write a .csv or .parquet file")
+    sink.add_argument("--db", help="insert into this database's transactions table")
+    parser.add_argument("--users", type=int, default=100, help="users the rows are spread over with --db")
+    args = parser.parse_args()
+
+    chunks = generate_chunks(args.rows, args.chunk_size, args.seed, load_profile(args.sample))
+    start = time.perf_counter()
+    if args.db:
+        rows = load_into_db(chunks, args.db, args.users, args.seed)
+        target = f"{args.db} ({args.users} users)"
+    elif os.path.splitext(args.out)[1].lower() == ".parquet":
+        rows = write_parquet(chunks, args.out)
+        target = args.out
+    elif os.path.splitext(args.out)[1].lower() == ".csv":
+        rows = write_csv(chunks, args.out)
+        target = args.out
+    else:
+        parser.error("--out must end in .csv or .parquet")
+    elapsed = time.perf_counter() - start
+    print(f"wrote {rows:,} rows to {target} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/sec)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ["Transaction_Type", "Payment_Gateway", "Transaction_State", "Merchant_Category"]
+
+
+# -------------------- TRANSACTION ENCODER --------------------
+# Writes the booster's feature matrix straight into a preallocated float32
+# array. It reproduces what predict_fraud used to get from
+# pd.get_dummies(..., drop_first=True) followed by reindex(feature_names):
+#   * amount is copied through,
+#   * every other non one-hot feature (Year, Month) is left at 0,
+#   * per column, the smallest category present in the batch is dropped,
+#     exactly like drop_first, and the remaining ones set their column to 1
+#     when the booster knows them.
+class TransactionEncoder:
+    def __init__(self, feature_names):
+        self.feature_names = list(feature_names)
+        feature_index = {name: i for i, name in enumerate(self.feature_names)}
+        self.amount_index = feature_index.get("amount")
+
+        # column -> {category value: feature index}
+        self.layout = {column: {} for column in CATEGORICAL_COLUMNS}
+        for name, index in feature_index.items():
+            for column in CATEGORICAL_COLUMNS:
+                prefix = column + "_"
+                if name.startswith(prefix):
+                    self.layout[column][name[len(prefix):]] = index
+                    break
+
+    def transform(self, transaction_data):
+        n_rows = len(transaction_data)
+        matrix = np.zeros((n_rows, len(self.feature_names)), dtype=np.float32)
+        if n_rows == 0:
+            return matrix
+
+        if self.amount_index is not None and "amount" in transaction_data:
+            matrix[:, self.amount_index] = transaction_data["amount"].to_numpy(dtype=np.float64)
+
+        rows = np.arange(n_rows)
+        for column, layout in self.layout.items():
+            if column not in transaction_data:
+                continue
+            codes, categories = pd.factorize(transaction_data[column], sort=True)
+            if len(categories) == 0:
+                continue
+
+            # Feature index per category code; code 0 is the dropped category
+            targets = np.fromiter(
+                (layout.get(str(category), -1) for category in categories),
+                dtype=np.intp, count=len(categories),
+            )
+            targets[0] = -1
+
+            # Missing values get code -1 and no dummy, as in get_dummies
+            columns = np.where(codes >= 0, targets[codes], -1)
+            hit = columns >= 0
+            matrix[rows[hit], columns[hit]] = 1
+        return matrix
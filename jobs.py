@@ -0,0 +1,302 @@
+# Background processing of bulk uploads.
+#
+#   python jobs.py work                 process queued jobs without the app
+#   python jobs.py list [--user EMAIL]  show jobs and their progress
+#
+# An upload submitted as a job is copied into JOBS_DIR and recorded in the
+# upload_jobs table (migration 5); the script run that submitted it returns
+# at once. A JobRunner's worker threads claim queued jobs, read them in
+# chunks of chunk_size rows, score each chunk and log it to the
+# transactions table. The chunk's rows and the job's progress counters are
+# written in one transaction, so progress can be polled from any session or
+# process, and a job whose process died mid-way (its heartbeat goes stale)
+# is picked up by the next runner at the first chunk that was not
+# committed. A user has at most USER_JOB_LIMIT jobs running at a time;
+# the rest wait in the queue.
+import argparse
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from columnar import file_format
+from database import DB_PATH, fetch_all, fetch_one, get_database, insert_transactions
+from metrics import stage
+from scoring import STREAM_CHUNK_SIZE, predict_fraud, prepare_upload, read_upload_chunks
+
+JOBS_DIR = os.environ.get("PAYGUARD_JOBS_DIR", "upload_jobs")
+JOB_WORKERS = int(os.environ.get("PAYGUARD_JOB_WORKERS", "2"))
+USER_JOB_LIMIT = int(os.environ.get("PAYGUARD_USER_JOB_LIMIT", "1"))
+# A running job whose heartbeat is older than this is taken to be orphaned.
+# Every committed chunk is a heartbeat, so this must exceed the time one
+# chunk takes.
+STALE_AFTER_SECONDS = 300.0
+POLL_SECONDS = 2.0
+
+JOB_COLUMNS = ["id", "user_email", "file_name", "source_path", "chunk_size", "status", "total_rows",
+               "rows_done", "chunks_done", "fraud_rows", "attempts", "worker", "error",
+               "created_at", "started_at", "heartbeat_at", "finished_at"]
+FINISHED = ("done", "failed", "cancelled")
+
+# Oldest queued or orphaned job whose user is below the limit, claimed in
+# one statement so two runners can't both take it
+CLAIM_JOB = """
+    UPDATE upload_jobs
+    SET status = 'running', worker = ?, heartbeat_at = ?, started_at = COALESCE(started_at, ?),
+        attempts = attempts + 1
+    WHERE id = (
+        SELECT j.id FROM upload_jobs j
+        WHERE (j.status = 'queued' OR (j.status = 'running' AND j.heartbeat_at < ?))
+          AND (SELECT COUNT(*) FROM upload_jobs r
+               WHERE r.user_email = j.user_email AND r.status = 'running' AND r.heartbeat_at >= ?) < ?
+        ORDER BY j.id
+        LIMIT 1
+    )
+"""
+
+# First statement of every chunk's transaction: it fails to match, and the
+# chunk is dropped, once the job is cancelled or claimed by someone else
+RECORD_CHUNK = """
+    UPDATE upload_jobs
+    SET rows_done = rows_done + ?, chunks_done = chunks_done + 1, fraud_rows = fraud_rows + ?, heartbeat_at = ?
+    WHERE id = ? AND worker = ? AND status = 'running'
+"""
+
+# Hands a job back to the queue when its runner is stopped between chunks
+RELEASE_JOB = """
+    UPDATE upload_jobs SET status = 'queued', worker = NULL
+    WHERE id = ? AND worker = ? AND status = 'running'
+"""
+
+FINISH_JOB = """
+    UPDATE upload_jobs SET status = ?, error = ?, finished_at = ?, worker = NULL
+    WHERE id = ? AND worker = ? AND status = 'running'
+"""
+
+
+def _job(row):
+    return dict(zip(JOB_COLUMNS, row)) if row else None
+
+
+# -------------------- SUBMITTING AND POLLING --------------------
+# Copies an upload (a path or a file-like object) into JOBS_DIR and queues
+# it. Returns the job id.
+def submit_job(user_email, source, name, chunk_size=STREAM_CHUNK_SIZE, db_path=DB_PATH, jobs_dir=JOBS_DIR):
+    os.makedirs(jobs_dir, exist_ok=True)
+    source_path = os.path.join(jobs_dir, f"{uuid.uuid4().hex}{os.path.splitext(name)[1].lower()}")
+    if isinstance(source, (str, os.PathLike)):
+        shutil.copyfile(source, source_path)
+    else:
+        source.seek(0)
+        with open(source_path, "wb") as file:
+            shutil.copyfileobj(source, file)
+
+    total_rows = _count_rows(source_path, name)
+    try:
+        return get_database(db_path).write(lambda conn: conn.execute("""
+            INSERT INTO upload_jobs (user_email, file_name, source_path, chunk_size, total_rows, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (user_email, name, source_path, chunk_size, total_rows, time.time())).lastrowid, name="jobs.submit")
+    except Exception:
+        os.remove(source_path)
+        raise
+
+
+# Row count for the progress bar: from the metadata of a columnar file,
+# from the line count of a CSV (exact unless fields hold line breaks)
+def _count_rows(path, name):
+    if file_format(name) != "csv":
+        total, _ = read_upload_chunks(path, name)
+        return total
+    lines = 0
+    last = b"\n"
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            lines += block.count(b"\n")
+            last = block[-1:]
+    return max(lines + (last != b"\n") - 1, 0)
+
+
+def get_job(job_id, db_path=DB_PATH):
+    return _job(fetch_one(f"SELECT {', '.join(JOB_COLUMNS)} FROM upload_jobs WHERE id = ?", (job_id,),
+                          name="jobs.get", db_path=db_path))
+
+
+# A user's most recent jobs, newest first
+def list_jobs(user_email=None, limit=20, db_path=DB_PATH):
+    where = "WHERE user_email = ?" if user_email is not None else ""
+    params = (user_email, limit) if user_email is not None else (limit,)
+    rows = fetch_all(f"SELECT {', '.join(JOB_COLUMNS)} FROM upload_jobs {where} ORDER BY id DESC LIMIT ?",
+                     params, name="jobs.list", db_path=db_path)
+    return [_job(row) for row in rows]
+
+
+# Cancels a queued or running job of this user. A running job stops before
+# its next chunk; chunks already logged stay logged.
+def cancel_job(job_id, user_email, db_path=DB_PATH):
+    cancelled = get_database(db_path).write(lambda conn: conn.execute("""
+        UPDATE upload_jobs SET status = 'cancelled', finished_at = ?, worker = NULL
+        WHERE id = ? AND user_email = ? AND status IN ('queued', 'running')
+    """, (time.time(), job_id, user_email)).rowcount, name="jobs.cancel")
+    if cancelled:
+        job = get_job(job_id, db_path)
+        _remove_source(job["source_path"])
+    return bool(cancelled)
+
+
+def _remove_source(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# -------------------- RUNNER --------------------
+class JobRunner:
+    def __init__(self, workers=JOB_WORKERS, user_limit=USER_JOB_LIMIT, db_path=DB_PATH,
+                 poll_seconds=POLL_SECONDS, stale_after=STALE_AFTER_SECONDS):
+        self.workers = workers
+        self.user_limit = user_limit
+        self.db_path = db_path
+        self.poll_seconds = poll_seconds
+        self.stale_after = stale_after
+        self._database = get_database(db_path)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+
+        self.jobs_finished = 0
+        self.chunks = 0
+
+    def start(self):
+        with self._lock:
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f"upload-job-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        return self
+
+    # Lets idle workers look for a job now rather than at their next poll
+    def wake(self):
+        self._wake.set()
+
+    # Running jobs go back to the queue after their current chunk
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self.claim()
+            if job is None:
+                self._wake.wait(self.poll_seconds)
+                self._wake.clear()
+                continue
+            self.process(job)
+
+    def claim(self):
+        token = uuid.uuid4().hex
+        now = time.time()
+        stale = now - self.stale_after
+        claimed = self._database.write(
+            lambda conn: conn.execute(CLAIM_JOB, (token, now, now, stale, stale, self.user_limit)).rowcount,
+            name="jobs.claim")
+        if not claimed:
+            return None
+        return _job(self._database.fetch_one(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM upload_jobs WHERE worker = ?", (token,), name="jobs.claimed"))
+
+    # Scores and logs the rest of a claimed job. Returns its final status.
+    def process(self, job):
+        job_id, token = job["id"], job["worker"]
+        try:
+            _, chunks = read_upload_chunks(job["source_path"], job["file_name"], job["chunk_size"],
+                                           skip_chunks=job["chunks_done"])
+            for chunk in chunks:
+                if self._stop.is_set():
+                    self._database.write(lambda conn: conn.execute(RELEASE_JOB, (job_id, token)),
+                                         name="jobs.release")
+                    return "queued"
+                with stage("jobs.chunk", rows=len(chunk)):
+                    processed = prepare_upload(chunk)
+                    processed['fraud'] = predict_fraud(processed)
+                    fraud_rows = int(processed['fraud'].sum())
+
+                    def commit(conn, processed=processed, fraud_rows=fraud_rows):
+                        if not conn.execute(RECORD_CHUNK, (len(processed), fraud_rows, time.time(),
+                                                           job_id, token)).rowcount:
+                            return False
+                        insert_transactions(conn, job["user_email"], processed)
+                        return True
+
+                    if not self._database.write(commit, name="jobs.chunk"):
+                        # Cancelled, or taken over after this worker was presumed dead
+                        return get_job(job_id, self.db_path)["status"]
+                with self._lock:
+                    self.chunks += 1
+            status, error = "done", None
+        except Exception as exc:
+            status, error = "failed", f"{type(exc).__name__}: {exc}"[:500]
+
+        finished = self._database.write(
+            lambda conn: conn.execute(FINISH_JOB, (status, error, time.time(), job_id, token)).rowcount,
+            name="jobs.finish")
+        if finished:
+            _remove_source(job["source_path"])
+            with self._lock:
+                self.jobs_finished += 1
+        return status
+
+    def metrics(self):
+        with self._lock:
+            return {"workers": len(self._threads), "jobs_finished": self.jobs_finished, "chunks": self.chunks}
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+# Process-wide runner, started on first use. Any app process that has one
+# also resumes jobs orphaned by a process that died.
+def get_job_runner():
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = JobRunner().start()
+    return _runner
+
+
+# -------------------- COMMAND LINE --------------------
+def main():
+    parser = argparse.ArgumentParser(description="Process or list background upload jobs")
+    parser.add_argument("command", choices=["work", "list"])
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    parser.add_argument("--user", help="only this user's jobs")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for job in list_jobs(args.user, args.limit, args.db):
+            total = f"{job['total_rows']:,}" if job['total_rows'] is not None else "?"
+            print(f"#{job['id']:<5} {job['status']:<9} {job['rows_done']:>12,} / {total:<12} "
+                  f"{job['fraud_rows']:>10,} fraud  {job['user_email']}  {job['file_name']}")
+        return
+
+    runner = JobRunner(args.workers, db_path=args.db).start()
+    print(f"processing upload jobs from {args.db} with {args.workers} workers, Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        runner.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# Stage timings for the fraud pipeline, exported in Prometheus text format.
+#
+#   PAYGUARD_METRICS=1 streamlit run app.py      collect, and serve on 127.0.0.1:9464
+#   PAYGUARD_METRICS_PORT=9500                   serve on another port
+#
+# Code marks a stage with
+#
+#   with stage("score.predict", rows=len(df)) as span:
+#       ...
+#       span.bytes = size          # rows/bytes can also be filled in inside
+#
+# or decorates a function with @instrumented("history.page"). Each stage
+# feeds three histograms: latency in seconds, rows and bytes (the last two
+# only when given). With metrics off, stage() hands back one shared no-op
+# object and instrumented functions cost a flag check, so the hooks can stay
+# in the hot paths.
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_HOST = "127.0.0.1"
+METRICS_PORT = int(os.environ.get("PAYGUARD_METRICS_PORT", "9464"))
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROWS_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000, 10000000)
+BYTES_BUCKETS = (1024, 16384, 262144, 4194304, 67108864, 268435456, 1073741824)
+
+# (metric name, help text, buckets)
+FAMILIES = {
+    "seconds": ("payguard_stage_seconds", "Time spent in a pipeline stage", LATENCY_BUCKETS),
+    "rows": ("payguard_stage_rows", "Rows handled per call of a pipeline stage", ROWS_BUCKETS),
+    "bytes": ("payguard_stage_bytes", "Bytes handled per call of a pipeline stage", BYTES_BUCKETS),
+}
+
+_enabled = os.environ.get("PAYGUARD_METRICS", "").lower() in ("1", "true", "yes", "on")
+
+
+def metrics_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    global _enabled
+    _enabled = bool(enabled)
+
+
+# -------------------- HISTOGRAMS --------------------
+# Cumulative-on-export histogram: observe() only bumps one bucket
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "total")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    # Upper bound of the bucket holding the q-th quantile
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def observe(family, stage_name, value):
+    key = (family, stage_name)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram(FAMILIES[family][2])
+        histogram.observe(value)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+# -------------------- STAGES --------------------
+class _Span:
+    __slots__ = ("name", "rows", "bytes", "start")
+
+    def __init__(self, name, rows, bytes):
+        self.name = name
+        self.rows = rows
+        self.bytes = bytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe("seconds", self.name, time.perf_counter() - self.start)
+        if self.rows is not None:
+            observe("rows", self.name, self.rows)
+        if self.bytes is not None:
+            observe("bytes", self.name, self.bytes)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+    rows = None
+    bytes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def stage(name, rows=None, bytes=None):
+    if not _enabled:
+        return _NOOP
+    return _Span(name, rows, bytes)
+
+
+# Times every call of the decorated function as stage `name`. rows, if
+# given, maps the return value to the number of rows it holds.
+def instrumented(name, rows=None):
+    def decorate(fn):
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _Span(name, None, None) as span:
+                result = fn(*args, **kwargs)
+                if rows is not None:
+                    span.rows = rows(result)
+                return result
+
+        wrapper.__name__ = fn.__name__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorate
+
+
+# -------------------- EXPORT --------------------
+# {stage: {"count", "mean_ms", "p50_ms", "p95_ms", "rows", "bytes"}}
+def snapshot():
+    with _lock:
+        items = [(key, histogram.count, histogram.total, histogram.quantile(0.5), histogram.quantile(0.95))
+                 for key, histogram in _histograms.items()]
+    stages = {}
+    for (family, name), count, total, p50, p95 in items:
+        entry = stages.setdefault(name, {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "rows": 0, "bytes": 0})
+        if family == "seconds":
+            entry.update(count=count, mean_ms=total / count * 1000, p50_ms=p50 * 1000, p95_ms=p95 * 1000)
+        else:
+            entry[family] = int(total)
+    return dict(sorted(stages.items()))
+
+
+def _format_bound(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def render_prometheus():
+    with _lock:
+        histograms = {key: (list(h.counts), h.count, h.total, h.buckets) for key, h in _histograms.items()}
+
+    lines = []
+    for family, (metric, help_text, _) in FAMILIES.items():
+        series = sorted((name, values) for (fam, name), values in histograms.items() if fam == family)
+        if not series:
+            continue
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} histogram")
+        for name, (counts, count, total, buckets) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + [float("inf")], counts):
+                cumulative += bucket_count
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{_format_bound(bound)}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {total!r}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {count}')
+
+    # Per-query timings the data-access layer keeps anyway
+    from database import all_query_stats
+
+    query_lines = []
+    for db_path, stats in all_query_stats().items():
+        for query, entry in stats.items():
+            labels = f'db="{_escape(db_path)}",query="{_escape(query)}"'
+            query_lines.append(f"payguard_db_queries_total{{{labels}}} {entry['count']}")
+            query_lines.append(f"payguard_db_query_seconds_total{{{labels}}} {entry['total_ms'] / 1000!r}")
+    if query_lines:
+        lines.append("# HELP payguard_db_queries_total Queries run through the data-access layer")
+        lines.append("# TYPE payguard_db_queries_total counter")
+        lines.extend(line for line in query_lines if line.startswith("payguard_db_queries_total"))
+        lines.append("# HELP payguard_db_query_seconds_total Time spent in queries run through the data-access layer")
+        lines.append("# TYPE payguard_db_query_seconds_total counter")
+        lines.extend(line for line in query_lines if line.startswith("payguard_db_query_seconds_total"))
+    return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# -------------------- HTTP ENDPOINT --------------------
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+# Serves /metrics from a daemon thread, once per process. Does nothing when
+# metrics are off; returns None if the port is taken (e.g. by another app
+# process), in which case that process's endpoint is the one scraped.
+def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    global _server
+    if not _enabled:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            except OSError:
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _server
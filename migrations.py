@@ -0,0 +1,320 @@
+# Versioned schema migrations for users_data.db.
+#
+#   python migrations.py                 migrate users_data.db to the latest version
+#   python migrations.py --status        show the current and latest version
+#   python migrations.py --db other.db --target 1
+#
+# The applied version is kept in PRAGMA user_version. Every migration runs in
+# its own BEGIN IMMEDIATE transaction and re-checks the version after taking
+# the lock, so concurrent app processes can all call migrate() at startup.
+import argparse
+import sqlite3
+import threading
+
+DB_PATH = "users_data.db"
+
+REPUTATION_SUMMARY_BACKFILL = """
+    INSERT INTO upi_reputation_summary (upi_id, rating_count, rated_count, rating_sum, flag_count, last_updated)
+    SELECT upi_id, COUNT(*), COUNT(rating), COALESCE(SUM(rating), 0), COUNT(flag_reason), MAX(timestamp)
+    FROM upi_reputation
+    GROUP BY upi_id
+"""
+
+# Dashboard rollups: one row per (user, dimension, bucket) for the fraud
+# status, state, merchant category and month of each transaction. Older
+# rows may hold is_fraud as a little-endian blob and dates as epoch seconds,
+# so both are normalised here.
+#
+# Unlike the reputation summary these are maintained by the write path in
+# database.py rather than by triggers: folding a whole bulk-insert chunk in
+# with one grouped upsert per dimension is far cheaper than four upserts
+# per inserted row.
+def _fraud_bucket(ref):
+    return (f"COALESCE(CAST(CAST(CASE WHEN typeof({ref}.is_fraud) = 'blob' "
+            f"THEN {ref}.is_fraud <> zeroblob(length({ref}.is_fraud)) ELSE {ref}.is_fraud END AS INTEGER) AS TEXT), 'unknown')")
+
+
+def _month_bucket(ref):
+    return (f"COALESCE(strftime('%Y-%m', {ref}.date), "
+            f"strftime('%Y-%m', CAST({ref}.date AS REAL), 'unixepoch'), 'unknown')")
+
+
+ROLLUP_DIMENSIONS = {
+    "fraud": _fraud_bucket,
+    "state": lambda ref: f"COALESCE({ref}.transaction_state, 'Other')",
+    "category": lambda ref: f"COALESCE({ref}.merchant_category, 'Other')",
+    "month": _month_bucket,
+}
+
+
+def _rollup_backfill():
+    selects = [
+        f"SELECT user_email, '{dimension}', {bucket('t')}, COUNT(*), COALESCE(SUM(t.amount), 0) "
+        f"FROM transactions t GROUP BY user_email, 3"
+        for dimension, bucket in ROLLUP_DIMENSIONS.items()
+    ]
+    return ("INSERT INTO transaction_rollups (user_email, dimension, bucket, txn_count, amount_sum)\n"
+            + "\nUNION ALL\n".join(selects))
+
+
+# Folds the transactions with ids in [?, ?] into the rollups, one statement
+# per dimension. Run by the write path right after inserting those rows.
+def _rollup_range_upserts():
+    return [f"""
+        INSERT INTO transaction_rollups (user_email, dimension, bucket, txn_count, amount_sum)
+        SELECT user_email, '{dimension}', {bucket('t')}, COUNT(*), COALESCE(SUM(t.amount), 0)
+        FROM transactions t
+        WHERE t.id BETWEEN ? AND ?
+        GROUP BY user_email, 3
+        ON CONFLICT (user_email, dimension, bucket) DO UPDATE SET
+            txn_count = txn_count + excluded.txn_count,
+            amount_sum = amount_sum + excluded.amount_sum
+    """ for dimension, bucket in ROLLUP_DIMENSIONS.items()]
+
+
+TRANSACTION_ROLLUP_BACKFILL = _rollup_backfill()
+TRANSACTION_ROLLUP_UPSERTS = _rollup_range_upserts()
+
+# (version, description, statements)
+MIGRATIONS = [
+    (1, "base schema", [
+        """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            date TEXT NOT NULL,
+            transaction_type TEXT,
+            payment_gateway TEXT,
+            transaction_state TEXT,
+            merchant_category TEXT,
+            amount REAL,
+            is_fraud INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS upi_reputation (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            upi_id TEXT NOT NULL,
+            user_email TEXT,
+            rating INTEGER CHECK(rating BETWEEN 1 AND 5),
+            flag_reason TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "lookup indexes", [
+        # Dashboard: WHERE user_email = ?
+        "CREATE INDEX IF NOT EXISTS idx_transactions_user_email ON transactions (user_email)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)",
+        # Reputation tracker: WHERE upi_id = ? and WHERE upi_id = ? AND user_email = ?
+        # (the composite index serves both)
+        "CREATE INDEX IF NOT EXISTS idx_upi_reputation_upi_id_user_email ON upi_reputation (upi_id, user_email)",
+    ]),
+    (3, "reputation summary", [
+        # Per-UPI aggregates kept current by the triggers below, so a lookup
+        # reads one row however many submissions an ID has. rated_count only
+        # counts non-NULL ratings, which is what the average is taken over.
+        """
+        CREATE TABLE IF NOT EXISTS upi_reputation_summary (
+            upi_id TEXT PRIMARY KEY,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            rated_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            flag_count INTEGER NOT NULL DEFAULT 0,
+            last_updated DATETIME
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_upi_reputation_summary_insert
+        AFTER INSERT ON upi_reputation
+        BEGIN
+            INSERT INTO upi_reputation_summary (upi_id, rating_count, rated_count, rating_sum, flag_count, last_updated)
+            VALUES (NEW.upi_id, 1, NEW.rating IS NOT NULL, COALESCE(NEW.rating, 0), NEW.flag_reason IS NOT NULL, NEW.timestamp)
+            ON CONFLICT (upi_id) DO UPDATE SET
+                rating_count = rating_count + 1,
+                rated_count = rated_count + excluded.rated_count,
+                rating_sum = rating_sum + excluded.rating_sum,
+                flag_count = flag_count + excluded.flag_count,
+                last_updated = COALESCE(MAX(last_updated, excluded.last_updated), excluded.last_updated, last_updated);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_upi_reputation_summary_delete
+        AFTER DELETE ON upi_reputation
+        BEGIN
+            UPDATE upi_reputation_summary SET
+                rating_count = rating_count - 1,
+                rated_count = rated_count - (OLD.rating IS NOT NULL),
+                rating_sum = rating_sum - COALESCE(OLD.rating, 0),
+                flag_count = flag_count - (OLD.flag_reason IS NOT NULL)
+            WHERE upi_id = OLD.upi_id;
+            DELETE FROM upi_reputation_summary WHERE upi_id = OLD.upi_id AND rating_count <= 0;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_upi_reputation_summary_update
+        AFTER UPDATE OF upi_id, rating, flag_reason ON upi_reputation
+        BEGIN
+            UPDATE upi_reputation_summary SET
+                rating_count = rating_count - 1,
+                rated_count = rated_count - (OLD.rating IS NOT NULL),
+                rating_sum = rating_sum - COALESCE(OLD.rating, 0),
+                flag_count = flag_count - (OLD.flag_reason IS NOT NULL)
+            WHERE upi_id = OLD.upi_id;
+            DELETE FROM upi_reputation_summary WHERE upi_id = OLD.upi_id AND rating_count <= 0;
+            INSERT INTO upi_reputation_summary (upi_id, rating_count, rated_count, rating_sum, flag_count, last_updated)
+            VALUES (NEW.upi_id, 1, NEW.rating IS NOT NULL, COALESCE(NEW.rating, 0), NEW.flag_reason IS NOT NULL, NEW.timestamp)
+            ON CONFLICT (upi_id) DO UPDATE SET
+                rating_count = rating_count + 1,
+                rated_count = rated_count + excluded.rated_count,
+                rating_sum = rating_sum + excluded.rating_sum,
+                flag_count = flag_count + excluded.flag_count,
+                last_updated = COALESCE(MAX(last_updated, excluded.last_updated), excluded.last_updated, last_updated);
+        END
+        """,
+        # Submissions are listed page by page in id order
+        "CREATE INDEX IF NOT EXISTS idx_upi_reputation_upi_id_id ON upi_reputation (upi_id, id)",
+        # Backfill from the rows that predate the triggers
+        "DELETE FROM upi_reputation_summary",
+        REPUTATION_SUMMARY_BACKFILL,
+    ]),
+    (4, "dashboard rollups", [
+        """
+        CREATE TABLE IF NOT EXISTS transaction_rollups (
+            user_email TEXT NOT NULL,
+            dimension TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            txn_count INTEGER NOT NULL DEFAULT 0,
+            amount_sum REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_email, dimension, bucket)
+        ) WITHOUT ROWID
+        """,
+        "DELETE FROM transaction_rollups",
+        TRANSACTION_ROLLUP_BACKFILL,
+    ]),
+    (5, "upload jobs", [
+        # Background uploads, see jobs.py. A job's progress is updated in
+        # the same transaction as the transactions of the chunk it counts,
+        # so chunks_done always says where to resume. worker is the token of
+        # the claim currently processing the job; heartbeat_at (epoch
+        # seconds) goes stale when that process dies.
+        """
+        CREATE TABLE IF NOT EXISTS upload_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            file_name TEXT NOT NULL,
+            source_path TEXT NOT NULL,
+            chunk_size INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued'
+                CHECK(status IN ('queued', 'running', 'done', 'failed', 'cancelled')),
+            total_rows INTEGER,
+            rows_done INTEGER NOT NULL DEFAULT 0,
+            chunks_done INTEGER NOT NULL DEFAULT 0,
+            fraud_rows INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker TEXT,
+            error TEXT,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            heartbeat_at REAL,
+            finished_at REAL
+        )
+        """,
+        # Claiming walks queued and running jobs in id order
+        "CREATE INDEX IF NOT EXISTS idx_upload_jobs_status_id ON upload_jobs (status, id)",
+        "CREATE INDEX IF NOT EXISTS idx_upload_jobs_user_email_id ON upload_jobs (user_email, id)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Applied to every connection the app opens
+CONNECTION_PRAGMAS = [
+    "PRAGMA busy_timeout = 5000",
+    # Durable across application crashes in WAL mode, without an fsync per commit
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -16000",
+]
+
+
+def apply_pragmas(conn):
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+# Applies pending migrations up to target and switches the file to WAL.
+# Returns the list of versions applied by this call.
+def migrate(db_path=DB_PATH, target=LATEST_VERSION, wal=True):
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    applied = []
+    try:
+        conn.execute("PRAGMA busy_timeout = 5000")
+        for version, _, statements in MIGRATIONS:
+            if version > target or current_version(conn) >= version:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if current_version(conn) >= version:
+                    conn.execute("ROLLBACK")
+                    continue
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version}")
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            applied.append(version)
+
+        # journal_mode is stored in the file, so this sticks for every later connection
+        if wal:
+            conn.execute("PRAGMA journal_mode = WAL")
+    finally:
+        conn.close()
+    return applied
+
+
+_migrated = set()
+_migrated_lock = threading.Lock()
+
+
+# Runs migrate() once per database path per process
+def ensure_migrated(db_path=DB_PATH):
+    if db_path in _migrated:
+        return
+    with _migrated_lock:
+        if db_path not in _migrated:
+            migrate(db_path)
+            _migrated.add(db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate users_data.db")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--target", type=int, default=LATEST_VERSION)
+    parser.add_argument("--status", action="store_true", help="only print the schema version")
+    args = parser.parse_args()
+
+    if args.status:
+        conn = sqlite3.connect(args.db)
+        version = current_version(conn)
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+        print(f"{args.db}: version {version} of {LATEST_VERSION}, journal_mode={mode}")
+        return
+
+    applied = migrate(args.db, args.target)
+    for version, description, _ in MIGRATIONS:
+        if version in applied:
+            print(f"applied {version}: {description}")
+    if not applied:
+        print(f"{args.db} is already at version {min(args.target, LATEST_VERSION)} or later")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import pickle
+import threading
+
+from encoder import TransactionEncoder
+from tree_predictor import CompiledTrees
+
+MODEL_PATH = "UPI_Fraud_model.pkl"
+# Batches up to this size are scored by the compiled trees, larger ones by
+# the booster (see benchmarks/bench_tree_predictor.py for the crossover)
+COMPILED_MAX_ROWS = 16
+
+
+# -------------------- LOADED MODEL --------------------
+# Everything derived from the booster that predict_fraud needs on each call,
+# computed once when the pickle is loaded.
+class LoadedModel:
+    def __init__(self, model, path, mtime, size, digest):
+        self.model = model
+        self.booster = model.get_booster()
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.digest = digest
+
+        self.feature_names = list(self.booster.feature_names)
+        self.feature_index = {name: i for i, name in enumerate(self.feature_names)}
+
+        # One-hot column layout, baked into the encoder predict_fraud uses
+        self.encoder = TransactionEncoder(self.feature_names)
+        self.onehot_layout = self.encoder.layout
+
+        # Pure-NumPy copy of the trees for small batches, see tree_predictor.py
+        try:
+            self.compiled = CompiledTrees.from_booster(self.booster)
+        except ValueError:
+            self.compiled = None
+
+    # Labels for an encoded feature matrix, same as model.predict
+    def predict(self, features):
+        if self.compiled is not None and len(features) <= COMPILED_MAX_ROWS:
+            return self.compiled.predict(features)
+        return self.model.predict(features)
+
+
+# -------------------- REGISTRY --------------------
+# One registry per process: Streamlit keeps imported modules alive across
+# reruns and sessions, so every session shares the same booster.
+class ModelRegistry:
+    def __init__(self, path=MODEL_PATH):
+        self.path = path
+        self._loaded = None
+        self._lock = threading.Lock()
+        self.load_count = 0
+
+    def get(self):
+        stat = os.stat(self.path)
+        loaded = self._loaded
+        if loaded is not None and loaded.mtime == stat.st_mtime_ns and loaded.size == stat.st_size:
+            return loaded
+
+        with self._lock:
+            loaded = self._loaded
+            stat = os.stat(self.path)
+            if loaded is not None and loaded.mtime == stat.st_mtime_ns and loaded.size == stat.st_size:
+                return loaded
+
+            with open(self.path, "rb") as file:
+                payload = file.read()
+            digest = hashlib.sha256(payload).hexdigest()
+
+            # A touched file with the same bytes keeps the current model
+            if loaded is not None and loaded.digest == digest:
+                loaded.mtime = stat.st_mtime_ns
+                loaded.size = stat.st_size
+                return loaded
+
+            self._loaded = LoadedModel(pickle.loads(payload), self.path, stat.st_mtime_ns, stat.st_size, digest)
+            self.load_count += 1
+            return self._loaded
+
+
+_registry = ModelRegistry()
+
+
+def get_model():
+    return _registry.get()
@@ -1,8 +1,7 @@
+import time
 import streamlit as st
-import sqlite3
-import pandas as pd
-from datetime import datetime
-from streamlit_extras.let_it_rain import rain
+from reputation import (SUBMISSIONS_PAGE_SIZE, TRUST_COLORS, fetch_submissions_page, get_reputation, get_reputations,
+                        read_upi_ids, submit_rating, submit_ratings)
 
 st.set_page_config(page_title="🔍 UPI Reputation Tracker", layout="wide")
 
@@ -11,10 +10,6 @@ st.markdown("""
 Help the community by flagging suspicious UPI IDs or rating trustworthy ones. Check any UPI’s reputation below.
 """)
 
-# -------------------- DATABASE SETUP --------------------
-def get_connection():
-    return sqlite3.connect("users_data.db")
-
 # -------------------- RATING / FLAGGING SECTION --------------------
 st.markdown("### ✍️ Rate or Flag a UPI ID")
 input_upi = st.text_input("Enter UPI ID (e.g. example@upi)")
@@ -25,72 +20,123 @@ if st.button("🚩 Submit Rating / Flag"):
     if not input_upi:
         st.error("Please enter a UPI ID.")
     else:
-        conn = get_connection()
-        cursor = conn.cursor()
-
-        # Check if user already rated this UPI
-        cursor.execute("SELECT 1 FROM upi_reputation WHERE upi_id = ? AND user_email = ?", (input_upi, st.session_state.user_info['email']))
-        already_rated = cursor.fetchone()
+        recorded = submit_rating(input_upi, st.session_state.user_info['email'], rating, flag_reason)
 
-        if already_rated:
+        if not recorded:
             st.warning("⚠️ You've already rated or flagged this UPI ID.")
         else:
-            cursor.execute('''
-                INSERT INTO upi_reputation (upi_id, user_email, rating, flag_reason, timestamp)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (input_upi, st.session_state.user_info['email'], rating, flag_reason or None, datetime.now()))
-            conn.commit()
             st.success("✅ Your contribution has been recorded!")
             # rain(emoji="💡", font_size=30, falling_speed=5, animation_length="infinite")
             # st.rerun()
 
-        conn.close()
-
 # -------------------- LOOKUP SECTION --------------------
 st.markdown("---")
 st.markdown("### 🔎 Check UPI Reputation")
 lookup_upi = st.text_input("🔍 Enter UPI ID to lookup", key="lookup")
 
+# The looked-up ID is kept in session_state so paging through its
+# submissions (which reruns the page) keeps the result on screen.
 if st.button("Check Reputation") and lookup_upi:
-    conn = get_connection()
-    df = pd.read_sql_query("SELECT * FROM upi_reputation WHERE upi_id = ?", conn, params=(lookup_upi,))
-    conn.close()
+    st.session_state.reputation_lookup = lookup_upi
+    st.session_state.submission_cursors = [0]
 
-    if df.empty:
+if lookup_upi and st.session_state.get("reputation_lookup") == lookup_upi:
+    reputation = get_reputation(lookup_upi)
+
+    if reputation is None:
         st.info("No data available for this UPI ID yet. Be the first to contribute!")
     else:
-        avg_rating = round(df['rating'].mean(), 2)
-        num_flags = df['flag_reason'].notnull().sum()
-        rating_count = len(df)
-
-        st.metric("⭐ Average Rating", avg_rating)
-        st.metric("🚩 Times Flagged", num_flags)
-
-        # Determine Trust Level
-        if rating_count <= 2:
-            trust_level = "⚪️ Unknown"
-        elif rating_count <= 5:
-            trust_level = "🟡 Low Trust"
-        elif rating_count <= 10:
-            trust_level = "🟠 Medium Trust"
-        else:
-            trust_level = "🟢 High Trust"
+        rating_count = reputation['rating_count']
+        trust_level = reputation['trust_level']
 
-        color_map = {
-            "⚪️ Unknown": "#cccccc",
-            "🟡 Low Trust": "#f1c40f",
-            "🟠 Medium Trust": "#e67e22",
-            "🟢 High Trust": "#2ecc71"
-        }
+        st.metric("⭐ Average Rating", reputation['avg_rating'])
+        st.metric("🚩 Times Flagged", reputation['flag_count'])
 
         st.markdown(f"""
-            <div style='background-color:{color_map[trust_level]};padding:0.8em;border-radius:10px;font-weight:bold;text-align:center;'>
+            <div style='background-color:{TRUST_COLORS[trust_level]};padding:0.8em;border-radius:10px;font-weight:bold;text-align:center;'>
                 {trust_level} (based on {rating_count} ratings)
             </div>
         """, unsafe_allow_html=True)
 
         with st.expander("📋 See All Submissions"):
-            st.dataframe(df[['user_email', 'rating', 'flag_reason', 'timestamp']])
+            cursors = st.session_state.setdefault("submission_cursors", [0])
+            submissions = fetch_submissions_page(lookup_upi, after_id=cursors[-1], page_size=SUBMISSIONS_PAGE_SIZE + 1)
+            has_next = len(submissions) > SUBMISSIONS_PAGE_SIZE
+            submissions = submissions.head(SUBMISSIONS_PAGE_SIZE)
+            st.dataframe(submissions[['user_email', 'rating', 'flag_reason', 'timestamp']])
+
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("⬅️ Previous", disabled=len(cursors) == 1):
+                    cursors.pop()
+                    st.rerun()
+            with col2:
+                if st.button("Next ➡️", disabled=not has_next):
+                    cursors.append(int(submissions['id'].iloc[-1]))
+                    st.rerun()
+
+# -------------------- BATCH SECTION --------------------
+st.markdown("---")
+st.markdown("### 📑 Screen a List of UPI IDs")
+st.markdown("""
+Upload a CSV or text file of payee IDs, one per line or in a `upi_id` column, to check all of them at once.
+Optional `rating` and `flag_reason` columns are used when you submit the list; otherwise the rating and reason
+entered above apply to every ID.
+""")
+id_file = st.file_uploader("Upload a list of UPI IDs", type=["csv", "txt"], key="upi_id_list")
+
+# A list is read and screened once per uploaded file, not on every rerun.
+# The entry is dropped after a bulk submit so the results are screened
+# again with the new ratings.
+screenings = st.session_state.setdefault("upi_screenings", {})
+
+# The outcome of a bulk submit, shown after the rerun that follows it
+submitted = st.session_state.pop("upi_batch_submitted", None)
+if submitted:
+    recorded, skipped, elapsed, listed = submitted
+    st.success(f"✅ Recorded {recorded:,} contributions in {elapsed * 1000:.0f} ms "
+               f"({elapsed / listed * 10000 * 1000:.0f} ms per 10k IDs).")
+    if skipped:
+        st.warning(f"⚠️ Skipped {skipped:,} IDs you had already rated or flagged, or listed twice.")
+
+if id_file is not None:
+    screening = screenings.get(id_file.file_id)
+    if screening is None:
+        id_list = read_upi_ids(id_file)
+        start = time.perf_counter()
+        results = get_reputations(id_list['upi_id']) if not id_list.empty else None
+        screening = screenings[id_file.file_id] = {"id_list": id_list, "results": results,
+                                                    "elapsed": time.perf_counter() - start}
+    id_list, results, elapsed = screening["id_list"], screening["results"], screening["elapsed"]
+
+    if id_list.empty:
+        st.warning("No UPI IDs found in this file.")
+    else:
+        col1, col2, col3 = st.columns(3)
+        col1.metric("UPI IDs", f"{len(results):,}")
+        col2.metric("🚩 Flagged at least once", f"{int((results['flag_count'] > 0).sum()):,}")
+        col3.metric("⚪️ No reputation yet", f"{int((results['rating_count'] == 0).sum()):,}")
+        st.caption(f"Screened in {elapsed * 1000:.0f} ms ({elapsed / len(results) * 10000 * 1000:.0f} ms per 10k IDs)")
+        st.dataframe(results, hide_index=True, use_container_width=True)
+        st.download_button("Download screening results", results.to_csv(index=False),
+                           file_name="upi_screening.csv", mime="text/csv")
+
+        if st.button(f"🚩 Submit Rating / Flag for all {len(id_list):,} IDs"):
+            submissions = id_list.copy()
+            if 'rating' not in submissions:
+                submissions['rating'] = rating
+            if 'flag_reason' not in submissions:
+                submissions['flag_reason'] = flag_reason
+            try:
+                start = time.perf_counter()
+                recorded, skipped = submit_ratings(submissions, st.session_state.user_info['email'])
+                elapsed = time.perf_counter() - start
+            except ValueError as exc:
+                st.error(str(exc))
+            else:
+                del screenings[id_file.file_id]
+                st.session_state.upi_batch_submitted = (recorded, skipped, elapsed, len(submissions))
+                st.rerun()
 
 # -------------------- FOOTER --------------------
 st.markdown("""
@@ -1,31 +1,18 @@
+import io
 import streamlit as st
-import sqlite3
-import pandas as pd
+from vocabulary import MERCHANT_CATEGORIES, PAYMENT_GATEWAYS, TRANSACTION_STATES, TRANSACTION_TYPES
+from queries import HISTORY_PAGE_SIZE, fetch_transaction_page
+from columnar import EXPORT_FORMATS, MIME_TYPES, export_transactions
 
 # -------------------- CONFIG --------------------
 st.set_page_config(page_title="Transaction History", layout="wide")
 
-# -------------------- FETCH DATA FROM DB --------------------
-def get_all_transactions():
-    conn = sqlite3.connect("users_data.db")
-    cursor = conn.cursor()
+# -------------------- AUTH0 LOGIN VERIFICATION --------------------
+if "user_info" not in st.session_state:
+    st.error("You need to be logged in to view your transaction history.")
+    st.stop()
 
-    # Fetch all transactions from the database
-    cursor.execute("""
-        SELECT id, user_email, date, transaction_type, payment_gateway, 
-               transaction_state, merchant_category, amount, is_fraud 
-        FROM transactions
-    """)
-    transactions = cursor.fetchall()
-    conn.close()
-
-    # If transactions are found, return them as a dataframe
-    columns = ['id', 'user_email', 'date', 'transaction_type', 'payment_gateway', 
-               'transaction_state', 'merchant_category', 'amount', 'is_fraud']
-    return pd.DataFrame(transactions, columns=columns)
-
-# Fetch data from DB
-all_transactions = get_all_transactions()
+user = st.session_state.user_info
 
 # -------------------- PAGE UI --------------------
 st.title("🔍 Transaction History")
@@ -41,63 +28,88 @@ st.sidebar.title("Search Transaction")
 transaction_id = st.sidebar.text_input("Enter Transaction ID", "")
 
 # Filter options in the sidebar
-transaction_type = st.sidebar.selectbox("Select Transaction Type", ["All", "Refund", "Bank Transfer", "Subscription", "Purchase", "Investment", "Other"])
-payment_gateway = st.sidebar.selectbox("Select Payment Gateway", ["All", "SamplePay", "UPI Pay", "Dummy Bank", "Alpha Bank", "Other"])
-transaction_state = st.sidebar.selectbox("Select Transaction State", ["All", "Maharashtra", "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal", "Other"])
-merchant_category = st.sidebar.selectbox("Select Merchant Category", ["All", "Brand Vouchers and OTT", "Home delivery", "Utilities", "Investment", "Travel bookings", "Purchases", "Other"])
+transaction_type = st.sidebar.selectbox("Select Transaction Type", ["All"] + TRANSACTION_TYPES)
+payment_gateway = st.sidebar.selectbox("Select Payment Gateway", ["All"] + PAYMENT_GATEWAYS)
+transaction_state = st.sidebar.selectbox("Select Transaction State", ["All"] + TRANSACTION_STATES)
+merchant_category = st.sidebar.selectbox("Select Merchant Category", ["All"] + MERCHANT_CATEGORIES)
 
 # Search button
 search_button = st.sidebar.button("Search")
 
-# Filter the data based on search criteria
-filtered_transactions = all_transactions
-
-# Apply filters only if search is clicked
+# -------------------- EXPORT --------------------
+# All of the user's transactions, regardless of the filters, as one file
+st.sidebar.markdown("---")
+export_format = st.sidebar.selectbox("Export all my transactions as", EXPORT_FORMATS,
+                                     format_func=lambda fmt: {"parquet": "Parquet", "arrow": "Arrow"}[fmt])
+if st.sidebar.button("Prepare export"):
+    sink = io.BytesIO()
+    exported_rows = export_transactions(sink, export_format, user['email'])
+    st.session_state.history_export = (export_format, exported_rows, sink.getvalue())
+
+if "history_export" in st.session_state:
+    fmt, exported_rows, data = st.session_state.history_export
+    st.sidebar.download_button(f"Download {exported_rows:,} transactions", data,
+                               file_name=f"transactions.{fmt}", mime=MIME_TYPES[fmt], on_click="ignore")
+
+# -------------------- FILTERS AND PAGING STATE --------------------
+# Filters are applied when Search is clicked and kept until the next search.
+# history_cursors holds the last id before each page visited so far, which
+# is all keyset pagination needs to go back and forth.
 if search_button:
-    # Filter by Transaction ID if provided
+    filters = {}
     if transaction_id:
-        filtered_transactions = filtered_transactions[filtered_transactions['id'] == int(transaction_id)]
-    
-    # Filter by Transaction Type
+        if transaction_id.strip().isdigit():
+            filters['id'] = int(transaction_id)
+        else:
+            st.sidebar.error("Transaction ID must be a number.")
     if transaction_type != "All":
-        filtered_transactions = filtered_transactions[filtered_transactions['transaction_type'] == transaction_type]
-    
-    # Filter by Payment Gateway
+        filters['transaction_type'] = transaction_type
     if payment_gateway != "All":
-        filtered_transactions = filtered_transactions[filtered_transactions['payment_gateway'] == payment_gateway]
-    
-    # Filter by Transaction State
+        filters['payment_gateway'] = payment_gateway
     if transaction_state != "All":
-        filtered_transactions = filtered_transactions[filtered_transactions['transaction_state'] == transaction_state]
-    
-    # Filter by Merchant Category
+        filters['transaction_state'] = transaction_state
     if merchant_category != "All":
-        filtered_transactions = filtered_transactions[filtered_transactions['merchant_category'] == merchant_category]
+        filters['merchant_category'] = merchant_category
+    st.session_state.history_filters = filters
+    st.session_state.history_cursors = [0]
 
-# -------------------- DISPLAYING TRANSACTIONS --------------------
-if not filtered_transactions.empty:
-    # Display filtered transactions in a card-like format
-    for _, row in filtered_transactions.iterrows():
-        with st.container():
-            # Two columns for transaction info
-            col1, col2 = st.columns(2)
+filters = st.session_state.get("history_filters", {})
+cursors = st.session_state.setdefault("history_cursors", [0])
 
-            # Column 1: Transaction ID, Date, and Transaction Type
-            with col1:
-                st.markdown(f"**Transaction ID:** {row['id']}")
-                # Display date as it was in the DB (no formatting)
-                st.markdown(f"**Date:** {row['date']}")
-                st.markdown(f"**Transaction Type:** {row['transaction_type']}")
+# Fetch one row more than a page to know whether there is a next page
+page = fetch_transaction_page(user['email'], filters, after_id=cursors[-1], page_size=HISTORY_PAGE_SIZE + 1)
+has_next = len(page) > HISTORY_PAGE_SIZE
+page = page.head(HISTORY_PAGE_SIZE)
 
-            # Column 2: Payment Gateway, State, and Merchant Category
-            with col2:
-                st.markdown(f"**Payment Gateway:** {row['payment_gateway']}")
-                st.markdown(f"**State:** {row['transaction_state']}")
-                st.markdown(f"**Merchant Category:** {row['merchant_category']}")
-
-            # Display amount in the bottom right with lighter green, larger and bolder
-            st.markdown(f"**<span style='color:#66FF66; font-size: 22px; font-weight: bold;'>{row['amount']} ₹</span>**", unsafe_allow_html=True)
-
-            st.markdown("---")
+# -------------------- DISPLAYING TRANSACTIONS --------------------
+if not page.empty:
+    st.dataframe(
+        page.drop(columns=['user_email']),
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "id": st.column_config.NumberColumn("Transaction ID", format="%d"),
+            # Display date as it was in the DB (no formatting)
+            "date": st.column_config.TextColumn("Date"),
+            "transaction_type": "Transaction Type",
+            "payment_gateway": "Payment Gateway",
+            "transaction_state": "State",
+            "merchant_category": "Merchant Category",
+            "amount": st.column_config.NumberColumn("Amount", format="%.2f ₹"),
+            "is_fraud": "Fraud",
+        },
+    )
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Previous", disabled=len(cursors) == 1):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        st.markdown(f"<p style='text-align: center;'>Page {len(cursors)}</p>", unsafe_allow_html=True)
+    with col3:
+        if st.button("Next ➡️", disabled=not has_next):
+            cursors.append(int(page['id'].iloc[-1]))
+            st.rerun()
 else:
-    st.error("No transactions found with the given filters.")
+    st.error("No transactions found with the given filters.")
\ No newline at end of file
@@ -0,0 +1,90 @@
+import pandas as pd
+import streamlit as st
+from database import all_query_stats
+from metrics import METRICS_HOST, METRICS_PORT, metrics_enabled, render_prometheus, reset, snapshot
+from prediction_cache import get_prediction_cache
+from charts import get_chart_cache
+
+# -------------------- CONFIG --------------------
+st.set_page_config(page_title="Pipeline Metrics", layout="wide")
+
+# -------------------- AUTH0 LOGIN VERIFICATION --------------------
+if "user_info" not in st.session_state:
+    st.error("You need to be logged in to view pipeline metrics.")
+    st.stop()
+
+# Restricted to the [admin] emails in secrets.toml; without that section
+# nobody is an admin, since the page can reset the process-wide timings
+admins = st.secrets["admin"]["emails"] if "admin" in st.secrets else []
+if st.session_state.user_info['email'] not in admins:
+    st.error("Pipeline metrics are only available to admins listed under [admin] emails in secrets.toml.")
+    st.stop()
+
+# -------------------- PAGE UI --------------------
+st.title("⏱️ Pipeline Metrics")
+st.markdown("Where time goes in this app process: upload parsing, encoding, scoring, database writes, page data loads and chart rendering.")
+
+if not metrics_enabled():
+    st.info("Stage timings are off. Start the app with PAYGUARD_METRICS=1 to collect them.")
+else:
+    st.caption(f"Prometheus endpoint: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+# -------------------- STAGES --------------------
+st.markdown("### 🧭 Pipeline stages")
+stages = snapshot()
+if stages:
+    stage_table = pd.DataFrame.from_dict(stages, orient="index").rename_axis("Stage").reset_index()
+    st.dataframe(
+        stage_table,
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "count": st.column_config.NumberColumn("Calls", format="%d"),
+            "mean_ms": st.column_config.NumberColumn("Mean (ms)", format="%.2f"),
+            "p50_ms": st.column_config.NumberColumn("p50 ≤ (ms)", format="%.1f"),
+            "p95_ms": st.column_config.NumberColumn("p95 ≤ (ms)", format="%.1f"),
+            "rows": st.column_config.NumberColumn("Rows", format="%d"),
+            "bytes": st.column_config.NumberColumn("Bytes", format="%d"),
+        },
+    )
+else:
+    st.write("No stages recorded yet.")
+
+# -------------------- QUERIES --------------------
+st.markdown("### 🗄️ Database queries")
+query_rows = [
+    {"Database": db_path, "Query": query, **stats}
+    for db_path, queries in all_query_stats().items()
+    for query, stats in queries.items()
+]
+if query_rows:
+    st.dataframe(pd.DataFrame(query_rows), hide_index=True, use_container_width=True)
+else:
+    st.write("No queries run yet.")
+
+# -------------------- PREDICTION CACHE --------------------
+st.markdown("### 🎯 Individual check cache")
+cache_stats = get_prediction_cache().metrics()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Hit rate", f"{cache_stats['hit_rate']:.1%}")
+col2.metric("Hits / misses", f"{cache_stats['hits']:,} / {cache_stats['misses']:,}")
+col3.metric("Entries", f"{cache_stats['entries']:,} of {cache_stats['max_entries']:,}")
+col4.metric("Evicted / expired", f"{cache_stats['evictions']:,} / {cache_stats['expirations']:,}")
+st.caption(f"Emptied {cache_stats['invalidations']} times by a model change; "
+           f"{cache_stats['templates']:,} encoded category combinations kept.")
+
+# -------------------- CHART CACHE --------------------
+st.markdown("### 📈 Chart cache")
+chart_stats = get_chart_cache().metrics()
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Hit rate", f"{chart_stats['hit_rate']:.1%}")
+col2.metric("Hits / misses", f"{chart_stats['hits']:,} / {chart_stats['misses']:,}")
+col3.metric("Charts", f"{chart_stats['entries']:,} of {chart_stats['max_entries']:,}")
+col4.metric("Evicted", f"{chart_stats['evictions']:,}")
+
+with st.expander("Prometheus text"):
+    st.code(render_prometheus(), language="text")
+
+if st.button("Reset stage timings"):
+    reset()
+    st.rerun()
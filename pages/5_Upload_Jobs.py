@@ -0,0 +1,82 @@
+import time
+import streamlit as st
+from jobs import FINISHED, cancel_job, get_job_runner, list_jobs
+
+# -------------------- CONFIG --------------------
+st.set_page_config(page_title="Upload Jobs", layout="wide")
+
+REFRESH_SECONDS = 2
+
+# -------------------- AUTH0 LOGIN VERIFICATION --------------------
+if "user_info" not in st.session_state:
+    st.error("You need to be logged in to view your upload jobs.")
+    st.stop()
+
+user = st.session_state.user_info
+
+# Also resumes jobs left unfinished by an earlier app process
+get_job_runner()
+
+# -------------------- PAGE UI --------------------
+st.title("📦 Upload Jobs")
+st.markdown("""
+    Files queued with "Queue upload" on the main page are scored and logged here in chunks.
+    You can close the page while they run; progress is kept and picked up again after a restart.
+""")
+
+STATUS_ICONS = {"queued": "⏳", "running": "⚙️", "done": "✅", "failed": "❌", "cancelled": "🚫"}
+
+
+def format_elapsed(job):
+    if job['started_at'] is None:
+        return ""
+    end = job['finished_at'] or time.time()
+    return f"{end - job['started_at']:.0f}s"
+
+
+def is_active(jobs):
+    return any(job['status'] not in FINISHED for job in jobs)
+
+
+def show_jobs(jobs):
+    if not jobs:
+        st.write("No upload jobs yet.")
+        return
+
+    for job in jobs:
+        with st.container(border=True):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(f"**{STATUS_ICONS[job['status']]} #{job['id']} · {job['file_name']}** · {job['status']}")
+                total = job['total_rows']
+                if total:
+                    fraction = min(job['rows_done'] / total, 1.0)
+                    text = f"{job['rows_done']:,} of {total:,} rows"
+                else:
+                    fraction = 1.0 if job['status'] == "done" else 0.0
+                    text = f"{job['rows_done']:,} rows"
+                st.progress(fraction, text=f"{text} · {job['fraud_rows']:,} flagged as fraud · {format_elapsed(job)}")
+                if job['error']:
+                    st.error(job['error'])
+            with col2:
+                if job['status'] not in FINISHED and st.button("Cancel", key=f"cancel_{job['id']}"):
+                    cancel_job(job['id'], user['email'])
+                    st.rerun()
+
+
+# Re-runs on its own every REFRESH_SECONDS. It is only drawn while a job is
+# queued or running; once none is, a full rerun swaps it for the static list
+# so an idle page stops polling the database.
+@st.fragment(run_every=REFRESH_SECONDS)
+def poll_jobs():
+    jobs = list_jobs(user['email'])
+    show_jobs(jobs)
+    if not is_active(jobs):
+        st.rerun()
+
+
+jobs = list_jobs(user['email'])
+if is_active(jobs):
+    poll_jobs()
+else:
+    show_jobs(jobs)
@@ -0,0 +1,140 @@
+# Multi-core scoring for large batches.
+#
+#   PAYGUARD_SCORING_WORKERS=4 streamlit run app.py
+#
+# With PAYGUARD_SCORING_WORKERS set above 1, predict_fraud hands batches of
+# PARALLEL_MIN_ROWS rows or more to a pool of that many processes.
+#
+# The batch is still encoded once, in the calling process: drop_first depends
+# on every row of the batch, so encoding can't be split. The encoded matrix
+# is copied into a shared-memory block and each worker predicts a contiguous
+# range of rows straight out of it, writing its labels into a shared output
+# block. Only block names and row bounds cross the process boundary, so
+# nothing is pickled per row and the labels come back in order.
+#
+# Workers load the pickle once at start-up through their own ModelRegistry
+# (reloading, like the app, if the file changes) and run the booster with
+# one thread each, so N workers keep N cores busy without oversubscribing.
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from model_registry import MODEL_PATH, ModelRegistry, get_model
+
+SCORING_WORKERS = int(os.environ.get("PAYGUARD_SCORING_WORKERS", "0"))
+PARALLEL_MIN_ROWS = 50000
+# Shards smaller than this cost more in scheduling than they save
+MIN_SHARD_ROWS = 10000
+LABEL_DTYPE = np.int64
+
+
+class StaleWorkerModel(RuntimeError):
+    pass
+
+
+# -------------------- WORKER SIDE --------------------
+_worker_registry = None
+
+
+def _init_worker(model_path):
+    global _worker_registry
+    _worker_registry = ModelRegistry(model_path)
+    _worker_model()
+
+
+def _worker_model():
+    loaded = _worker_registry.get()
+    loaded.model.set_params(n_jobs=1)
+    return loaded
+
+
+def _score_shard(digest, features_name, shape, labels_name, start, stop):
+    loaded = _worker_model()
+    if loaded.digest != digest:
+        raise StaleWorkerModel(f"worker has model {loaded.digest[:12]}, batch was encoded for {digest[:12]}")
+
+    features_block = shared_memory.SharedMemory(name=features_name)
+    labels_block = shared_memory.SharedMemory(name=labels_name)
+    try:
+        features = np.ndarray(shape, dtype=np.float32, buffer=features_block.buf)
+        labels = np.ndarray(shape[0], dtype=LABEL_DTYPE, buffer=labels_block.buf)
+        labels[start:stop] = loaded.model.predict(features[start:stop])
+        del features, labels
+    finally:
+        features_block.close()
+        labels_block.close()
+    return stop - start
+
+
+# -------------------- PARENT SIDE --------------------
+class ParallelScorer:
+    def __init__(self, workers=None, model_path=MODEL_PATH, min_shard_rows=MIN_SHARD_ROWS):
+        self.workers = workers or SCORING_WORKERS or os.cpu_count() or 1
+        self.min_shard_rows = min_shard_rows
+        # spawn rather than fork: the app process runs Streamlit's and the
+        # booster's threads, which a forked child would inherit mid-flight
+        self._pool = ProcessPoolExecutor(
+            self.workers, mp_context=get_context("spawn"),
+            initializer=_init_worker, initargs=(model_path,),
+        )
+
+    # Labels for an encoded feature matrix, in row order. Batches too small
+    # to shard are predicted in this process.
+    def predict(self, features, loaded=None):
+        loaded = loaded or get_model()
+        n_rows = len(features)
+        shards = min(self.workers, n_rows // self.min_shard_rows)
+        if shards < 1:
+            return loaded.predict(features)
+
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        features_block = shared_memory.SharedMemory(create=True, size=features.nbytes)
+        labels_block = shared_memory.SharedMemory(create=True, size=n_rows * np.dtype(LABEL_DTYPE).itemsize)
+        try:
+            shared = np.ndarray(features.shape, dtype=np.float32, buffer=features_block.buf)
+            shared[:] = features
+            del shared
+
+            bounds = np.linspace(0, n_rows, shards + 1).astype(int)
+            futures = [
+                self._pool.submit(_score_shard, loaded.digest, features_block.name, features.shape,
+                                  labels_block.name, int(start), int(stop))
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ]
+            # Every shard is done with the blocks before they are unlinked
+            wait(futures)
+            try:
+                for future in futures:
+                    future.result()
+            except StaleWorkerModel:
+                # The file changed between encoding and scoring; the batch
+                # was encoded for `loaded`, so score it with that
+                return loaded.predict(features)
+
+            labels = np.ndarray(n_rows, dtype=LABEL_DTYPE, buffer=labels_block.buf).copy()
+            return labels
+        finally:
+            features_block.close()
+            features_block.unlink()
+            labels_block.close()
+            labels_block.unlink()
+
+    def close(self):
+        self._pool.shutdown()
+
+
+_scorer = None
+_scorer_lock = threading.Lock()
+
+
+# Process-wide pool with SCORING_WORKERS workers, started on first use
+def get_parallel_scorer():
+    global _scorer
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                _scorer = ParallelScorer(SCORING_WORKERS)
+    return _scorer
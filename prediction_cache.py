@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from batching import get_batcher
+from encoder import CATEGORICAL_COLUMNS
+from model_registry import get_model
+from scoring import predict_fraud
+
+CACHE_SIZE = int(os.environ.get("PAYGUARD_PREDICTION_CACHE_SIZE", "4096"))
+CACHE_TTL_SECONDS = float(os.environ.get("PAYGUARD_PREDICTION_CACHE_TTL", "3600"))
+# Encoded rows kept, one per category combination; the app's vocabularies
+# have 6,090 combinations, so all of them fit
+TEMPLATE_SIZE = 8192
+
+
+# -------------------- PREDICTION CACHE --------------------
+# Remembers the label of every individual check, keyed on the normalized
+# inputs (date, the four selectbox values, amount) and shared by every
+# session of the app process. Agents re-check the same merchant, gateway
+# and state combinations all day, so most checks never reach the booster.
+#
+# Entries are dropped least recently used first once max_entries are held,
+# and expire ttl_seconds after they were scored. The first lookup after the
+# model file changes (a new digest from the registry) empties the cache.
+#
+# Misses don't encode a one-row frame from scratch either: the encoded row
+# of each category combination is kept, and only amount is written into a
+# copy of it per call. The encoder leaves Year and Month at 0, so nothing
+# else depends on the call; with one row drop_first drops every category,
+# so the template is the same matrix predict_fraud would build. Only
+# single-row frames are cached, bigger ones go to predict_fraud.
+class PredictionCache:
+    def __init__(self, max_entries=CACHE_SIZE, ttl_seconds=CACHE_TTL_SECONDS, batcher=None):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.batcher = batcher
+        self._entries = OrderedDict()  # key -> (label, expires at)
+        self._templates = OrderedDict()  # category combination -> encoded row
+        self._digest = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def predict(self, transaction_data):
+        if len(transaction_data) != 1 or self.max_entries <= 0:
+            return self._uncached(transaction_data)
+
+        loaded = get_model()
+        # One row as plain values; per-column pandas access costs more than
+        # the whole cache hit
+        row = dict(zip(transaction_data.columns, transaction_data.to_numpy()[0]))
+        # Same value as epoch_seconds, without converting a Series. Logged
+        # by the caller afterwards, like predict_fraud leaves it.
+        date = pd.Timestamp(row['Date']).value / 10**9
+        transaction_data['Date'] = [date]
+        combo = tuple(str(row[column]) for column in CATEGORICAL_COLUMNS)
+        amount = float(row['amount'])
+        key = (date,) + combo + (amount,)
+
+        now = time.monotonic()
+        with self._lock:
+            if self._digest != loaded.digest:
+                if self._digest is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._templates.clear()
+                self._digest = loaded.digest
+
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] <= now:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return np.array([entry[0]], dtype=np.int64)
+            self.misses += 1
+            template = self._templates.get(combo)
+            if template is not None:
+                self._templates.move_to_end(combo)
+
+        if template is None:
+            template = loaded.encoder.transform(pd.DataFrame(
+                {column: [value] for column, value in zip(CATEGORICAL_COLUMNS, combo)}))
+        features = template.copy()
+        if loaded.encoder.amount_index is not None:
+            features[0, loaded.encoder.amount_index] = amount
+        if self.batcher is not None:
+            prediction = self.batcher.submit_encoded(loaded, features).result()
+        else:
+            prediction = loaded.predict(features)
+        label = int(prediction[0])
+
+        with self._lock:
+            # Don't store a result scored with a model that has since been replaced
+            if self._digest == loaded.digest:
+                self._entries[key] = (label, now + self.ttl)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+                self._templates[combo] = template
+                while len(self._templates) > TEMPLATE_SIZE:
+                    self._templates.popitem(last=False)
+        return np.array([label], dtype=np.int64)
+
+    def _uncached(self, transaction_data):
+        if self.batcher is not None:
+            return self.batcher.predict(transaction_data)
+        return predict_fraud(transaction_data)
+
+    def metrics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "templates": len(self._templates),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._templates.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Process-wide cache for the app's individual checks; misses are scored
+# through the shared micro-batcher
+def get_prediction_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PredictionCache(batcher=get_batcher())
+    return _cache
@@ -0,0 +1,100 @@
+import pandas as pd
+
+from database import DB_PATH, fetch_all
+from metrics import instrumented
+
+# Rows logged before the write path cast predictions to int hold is_fraud as
+# a little-endian numpy blob
+def _decode_fraud_flags(df):
+    df['is_fraud'] = df['is_fraud'].map(lambda x: int.from_bytes(x, "little") if isinstance(x, bytes) else x)
+    return df
+
+
+# -------------------- TRANSACTION HISTORY --------------------
+HISTORY_PAGE_SIZE = 50
+HISTORY_COLUMNS = ['id', 'user_email', 'date', 'transaction_type', 'payment_gateway',
+                   'transaction_state', 'merchant_category', 'amount', 'is_fraud']
+# Columns the history filters may compare against
+HISTORY_FILTER_COLUMNS = ['id', 'transaction_type', 'payment_gateway', 'transaction_state', 'merchant_category']
+
+
+# One page of a user's transactions, oldest first, starting after after_id.
+# Filters are {column: value} equality tests done in SQL; the query walks
+# the (user_email) index in id order, so its cost depends on the user's own
+# rows and the page size, not on the size of the table.
+@instrumented("history.load_page", rows=len)
+def fetch_transaction_page(user_email, filters=None, after_id=0, page_size=HISTORY_PAGE_SIZE):
+    clauses = ["user_email = ?", "id > ?"]
+    params = [user_email, after_id]
+    for column, value in sorted((filters or {}).items()):
+        if column not in HISTORY_FILTER_COLUMNS:
+            raise ValueError(f"cannot filter transactions on {column!r}")
+        clauses.append(f"{column} = ?")
+        params.append(value)
+    params.append(page_size)
+
+    rows = fetch_all(f"""
+        SELECT {', '.join(HISTORY_COLUMNS)}
+        FROM transactions
+        WHERE {' AND '.join(clauses)}
+        ORDER BY id
+        LIMIT ?
+    """, params, name="history.page")
+    return _decode_fraud_flags(pd.DataFrame(rows, columns=HISTORY_COLUMNS))
+
+
+# The whole table, or one user's rows, in id order as DataFrames of up to
+# chunk_size rows, for exports
+EXPORT_CHUNK_SIZE = 50000
+
+
+def iter_transactions(user_email=None, chunk_size=EXPORT_CHUNK_SIZE, db_path=DB_PATH):
+    clauses = ["id > ?"]
+    if user_email is not None:
+        clauses.append("user_email = ?")
+    after_id = 0
+    while True:
+        params = [after_id] + ([user_email] if user_email is not None else []) + [chunk_size]
+        rows = fetch_all(f"""
+            SELECT {', '.join(HISTORY_COLUMNS)}
+            FROM transactions
+            WHERE {' AND '.join(clauses)}
+            ORDER BY id
+            LIMIT ?
+        """, params, name="transactions.export", db_path=db_path)
+        if not rows:
+            return
+        yield _decode_fraud_flags(pd.DataFrame(rows, columns=HISTORY_COLUMNS))
+        after_id = rows[-1][0]
+
+
+# -------------------- DASHBOARD --------------------
+DASHBOARD_COLUMNS = ["id", "user_email", "date", "transaction_type", "payment_gateway", "transaction_state", "merchant_category", "amount", "is_fraud"]
+
+
+# The user's rows of transaction_rollups (kept current by the write path, see
+# migration 4) as {dimension: DataFrame[bucket, count, amount]}
+@instrumented("dashboard.load_rollups")
+def fetch_dashboard_rollups(user_email):
+    rows = fetch_all("""
+        SELECT dimension, bucket, txn_count, amount_sum
+        FROM transaction_rollups
+        WHERE user_email = ?
+    """, (user_email,), name="dashboard.rollups")
+    rollups = pd.DataFrame(rows, columns=["dimension", "bucket", "count", "amount"])
+    return {
+        dimension: rollups.loc[rollups["dimension"] == dimension, ["bucket", "count", "amount"]].reset_index(drop=True)
+        for dimension in ("fraud", "state", "category", "month")
+    }
+
+
+# The user's most recent transactions, oldest first
+@instrumented("dashboard.load_latest", rows=len)
+def fetch_latest_transactions(user_email, limit=5):
+    rows = fetch_all("""
+        SELECT * FROM transactions
+        WHERE user_email = ?
+        ORDER BY id DESC
+        LIMIT ?
+    """, (user_email, limit), name="dashboard.latest")
+    return _decode_fraud_flags(pd.DataFrame(rows[::-1], columns=DASHBOARD_COLUMNS))
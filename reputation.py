@@ -0,0 +1,301 @@
+# UPI reputation reads and summary maintenance.
+#
+#   python reputation.py check       compare upi_reputation_summary with the raw rows
+#   python reputation.py backfill    rebuild upi_reputation_summary from the raw rows
+#   python reputation.py screen FILE [--out results.csv]
+#                                    reputation of every UPI ID in a list
+#
+# The summary table and the triggers that keep it current are created by
+# migration 3 (see migrations.py).
+import argparse
+import sys
+import time
+from datetime import datetime
+
+import pandas as pd
+
+from database import DB_PATH, fetch_all, fetch_one, get_database
+from metrics import instrumented
+from migrations import REPUTATION_SUMMARY_BACKFILL
+
+SUBMISSIONS_PAGE_SIZE = 25
+SUBMISSION_COLUMNS = ['id', 'user_email', 'rating', 'flag_reason', 'timestamp']
+REPUTATION_COLUMNS = ['upi_id', 'avg_rating', 'flag_count', 'rating_count', 'trust_level', 'last_updated']
+
+# Scratch tables for the bulk paths. TEMP tables are private to the
+# connection that creates them, so each pooled reader and the writer has
+# its own.
+CREATE_LOOKUP_IDS = "CREATE TEMP TABLE IF NOT EXISTS bulk_lookup_ids (position INTEGER PRIMARY KEY, upi_id TEXT NOT NULL UNIQUE)"
+CREATE_SUBMIT_ROWS = """
+    CREATE TEMP TABLE IF NOT EXISTS bulk_submit_rows (
+        position INTEGER PRIMARY KEY, upi_id TEXT NOT NULL UNIQUE, rating INTEGER, flag_reason TEXT
+    )
+"""
+
+# Every listed ID in list order, left-joined to its summary row by primary key
+BULK_LOOKUP = """
+    SELECT i.upi_id, s.rating_count, s.rated_count, s.rating_sum, s.flag_count, s.last_updated
+    FROM bulk_lookup_ids i
+    LEFT JOIN upi_reputation_summary s ON s.upi_id = i.upi_id
+    ORDER BY i.position
+"""
+
+# The batch's rows this user hasn't submitted before, found through the
+# (upi_id, user_email) index
+BULK_SUBMIT = """
+    INSERT INTO upi_reputation (upi_id, user_email, rating, flag_reason, timestamp)
+    SELECT b.upi_id, ?, b.rating, b.flag_reason, ?
+    FROM bulk_submit_rows b
+    WHERE NOT EXISTS (SELECT 1 FROM upi_reputation r WHERE r.upi_id = b.upi_id AND r.user_email = ?)
+    ORDER BY b.position
+"""
+
+TRUST_COLORS = {
+    "⚪️ Unknown": "#cccccc",
+    "🟡 Low Trust": "#f1c40f",
+    "🟠 Medium Trust": "#e67e22",
+    "🟢 High Trust": "#2ecc71"
+}
+
+
+def trust_level(rating_count):
+    if rating_count <= 2:
+        return "⚪️ Unknown"
+    elif rating_count <= 5:
+        return "🟡 Low Trust"
+    elif rating_count <= 10:
+        return "🟠 Medium Trust"
+    return "🟢 High Trust"
+
+
+# -------------------- LOOKUPS --------------------
+# One primary-key read. Returns None for an ID nobody has rated yet.
+@instrumented("reputation.lookup")
+def get_reputation(upi_id, db_path=DB_PATH):
+    row = fetch_one("""
+        SELECT rating_count, rated_count, rating_sum, flag_count, last_updated
+        FROM upi_reputation_summary
+        WHERE upi_id = ?
+    """, (upi_id,), name="reputation.summary", db_path=db_path)
+    if row is None:
+        return None
+
+    rating_count, rated_count, rating_sum, flag_count, last_updated = row
+    return {
+        "upi_id": upi_id,
+        "avg_rating": round(rating_sum / rated_count, 2) if rated_count else None,
+        "flag_count": flag_count,
+        "rating_count": rating_count,
+        "trust_level": trust_level(rating_count),
+        "last_updated": last_updated,
+    }
+
+
+# Reputation of every ID in upi_ids from one query: the IDs are loaded into
+# a temp table on a pooled connection and joined to the summary. Returns a
+# frame with REPUTATION_COLUMNS, one row per distinct ID in first-seen
+# order; IDs nobody has rated have a rating_count of 0.
+@instrumented("reputation.bulk_lookup", rows=len)
+def get_reputations(upi_ids, db_path=DB_PATH):
+    upi_ids = list(dict.fromkeys(upi_ids))
+    database = get_database(db_path)
+    with database.connection() as conn, database.timed("reputation.bulk_lookup"):
+        conn.execute(CREATE_LOOKUP_IDS)
+        # Filled inside a transaction that is rolled back when the
+        # connection goes back to the pool, which empties the table again
+        conn.executemany("INSERT INTO bulk_lookup_ids (upi_id) VALUES (?)", ((upi_id,) for upi_id in upi_ids))
+        rows = conn.execute(BULK_LOOKUP).fetchall()
+
+    summary = pd.DataFrame(rows, columns=['upi_id', 'rating_count', 'rated_count', 'rating_sum', 'flag_count',
+                                          'last_updated'])
+    for column in ('rating_count', 'rated_count', 'rating_sum', 'flag_count'):
+        summary[column] = summary[column].fillna(0).astype('int64')
+    rated = summary['rated_count'] > 0
+    summary['avg_rating'] = (summary['rating_sum'] / summary['rated_count'].where(rated)).round(2)
+    levels = {count: trust_level(count) for count in summary['rating_count'].unique().tolist()}
+    summary['trust_level'] = summary['rating_count'].map(levels)
+    return summary[REPUTATION_COLUMNS]
+
+
+# One page of an ID's submissions in id order, starting after after_id
+@instrumented("reputation.load_submissions", rows=len)
+def fetch_submissions_page(upi_id, after_id=0, page_size=SUBMISSIONS_PAGE_SIZE, db_path=DB_PATH):
+    rows = fetch_all("""
+        SELECT id, user_email, rating, flag_reason, timestamp
+        FROM upi_reputation
+        WHERE upi_id = ? AND id > ?
+        ORDER BY id
+        LIMIT ?
+    """, (upi_id, after_id, page_size), name="reputation.submissions", db_path=db_path)
+    return pd.DataFrame(rows, columns=SUBMISSION_COLUMNS)
+
+
+# -------------------- SUBMISSIONS --------------------
+# The check and the insert run as one transaction on the shared writer, so two
+# sessions can't both record a rating for the same (UPI ID, user).
+def submit_rating(upi_id, user_email, rating, flag_reason, db_path=DB_PATH):
+    def check_and_insert(conn):
+        cursor = conn.cursor()
+
+        # Check if user already rated this UPI
+        cursor.execute("SELECT 1 FROM upi_reputation WHERE upi_id = ? AND user_email = ?", (upi_id, user_email))
+        if cursor.fetchone():
+            return False
+
+        cursor.execute('''
+            INSERT INTO upi_reputation (upi_id, user_email, rating, flag_reason, timestamp)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (upi_id, user_email, rating, flag_reason or None, datetime.now()))
+        return True
+
+    return get_database(db_path).write(check_and_insert, name="reputation.submit")
+
+
+# Records many ratings or flags by one user in a single transaction.
+# `submissions` is a frame with upi_id and optionally rating and
+# flag_reason columns; an ID listed twice keeps its first row, and IDs the
+# user has already rated are skipped like submit_rating skips them. Every
+# rating must be blank or a whole number from 1 to 5; otherwise nothing is
+# written and ValueError names the first bad row. Returns (recorded, skipped).
+def submit_ratings(submissions, user_email, db_path=DB_PATH):
+    ratings = submissions['rating'].tolist() if 'rating' in submissions else [None] * len(submissions)
+    reasons = submissions['flag_reason'].tolist() if 'flag_reason' in submissions else [None] * len(submissions)
+    rows = []
+    seen = set()
+    for row, (upi_id, rating, reason) in enumerate(zip(submissions['upi_id'].tolist(), ratings, reasons), start=1):
+        rating = _parse_rating(rating, row, upi_id)
+        if upi_id not in seen:
+            seen.add(upi_id)
+            rows.append((upi_id, rating, None if pd.isna(reason) or not reason else str(reason)))
+    now = datetime.now()
+
+    def insert_new(conn):
+        conn.execute(CREATE_SUBMIT_ROWS)
+        try:
+            conn.executemany("INSERT INTO bulk_submit_rows (upi_id, rating, flag_reason) VALUES (?, ?, ?)", rows)
+            return conn.execute(BULK_SUBMIT, (user_email, now, user_email)).rowcount
+        finally:
+            conn.execute("DELETE FROM bulk_submit_rows")
+
+    recorded = get_database(db_path).write(insert_new, name="reputation.bulk_submit")
+    return recorded, len(submissions) - recorded
+
+
+# A rating from a list as an int, or None when it is blank. Numbers that
+# aren't whole and text that isn't a number are rejected, not rounded or
+# dropped.
+def _parse_rating(value, row, upi_id):
+    if value is None or (isinstance(value, str) and not value.strip()) or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    try:
+        number = float(value.strip() if isinstance(value, str) else value)
+    except (TypeError, ValueError):
+        number = None
+    if isinstance(value, bool) or number is None or not number.is_integer():
+        raise ValueError(f"row {row} ({upi_id}): rating must be a whole number from 1 to 5, got {value!r}")
+    if not 1 <= number <= 5:
+        raise ValueError(f"row {row} ({upi_id}): rating must be between 1 and 5, got {value!r}")
+    return int(number)
+
+
+# -------------------- ID LISTS --------------------
+# UPI IDs from an uploaded list: a CSV with a upi_id column, or one ID per
+# line with or without a upi_id header. Any other first line is an ID like
+# the rest. Blank entries are dropped and whitespace is trimmed; duplicates
+# are kept.
+def read_upi_ids(source):
+    try:
+        frame = pd.read_csv(source, header=None, dtype=str, skipinitialspace=True, skip_blank_lines=True)
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame({'upi_id': pd.Series(dtype=str)})
+    header = [str(value).strip().lower() for value in frame.iloc[0]] if len(frame) else []
+    if 'upi_id' in header:
+        frame = frame.iloc[1:].set_axis(header, axis=1)
+    else:
+        frame = frame.iloc[:, :1].set_axis(['upi_id'], axis=1)
+    frame['upi_id'] = frame['upi_id'].str.strip()
+    frame = frame[frame['upi_id'].notna() & (frame['upi_id'] != '')]
+    # Ratings stay as text; submit_ratings rejects ones that aren't whole numbers
+    return frame.reset_index(drop=True)
+
+
+# -------------------- MAINTENANCE --------------------
+def backfill_summary(db_path=DB_PATH):
+    def rebuild(conn):
+        conn.execute("DELETE FROM upi_reputation_summary")
+        conn.execute(REPUTATION_SUMMARY_BACKFILL)
+        return conn.execute("SELECT COUNT(*) FROM upi_reputation_summary").fetchone()[0]
+
+    return get_database(db_path).write(rebuild, name="reputation.backfill")
+
+
+# Rows where the summary disagrees with an aggregate over upi_reputation,
+# as (upi_id, column, summary value, raw value)
+def check_summary_consistency(db_path=DB_PATH):
+    rows = fetch_all("""
+        WITH raw AS (
+            SELECT upi_id, COUNT(*) AS rating_count, COUNT(rating) AS rated_count,
+                   COALESCE(SUM(rating), 0) AS rating_sum, COUNT(flag_reason) AS flag_count
+            FROM upi_reputation
+            GROUP BY upi_id
+        ),
+        summary AS (
+            SELECT upi_id, rating_count, rated_count, rating_sum, flag_count
+            FROM upi_reputation_summary
+        )
+        SELECT r.upi_id, r.rating_count, r.rated_count, r.rating_sum, r.flag_count,
+               s.rating_count, s.rated_count, s.rating_sum, s.flag_count
+        FROM raw r LEFT JOIN summary s ON s.upi_id = r.upi_id
+        UNION ALL
+        SELECT s.upi_id, NULL, NULL, NULL, NULL, s.rating_count, s.rated_count, s.rating_sum, s.flag_count
+        FROM summary s
+        WHERE s.upi_id NOT IN (SELECT upi_id FROM raw)
+    """, name="reputation.consistency", db_path=db_path)
+
+    columns = ["rating_count", "rated_count", "rating_sum", "flag_count"]
+    mismatches = []
+    for row in rows:
+        upi_id, raw, summary = row[0], row[1:5], row[5:9]
+        for column, raw_value, summary_value in zip(columns, raw, summary):
+            if raw_value != summary_value:
+                mismatches.append((upi_id, column, summary_value, raw_value))
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UPI reputation summary maintenance and bulk screening")
+    parser.add_argument("command", choices=["check", "backfill", "screen"])
+    parser.add_argument("file", nargs="?", help="list of UPI IDs to screen")
+    parser.add_argument("--out", help="write the screening results to this CSV instead of printing them")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    if args.command == "screen":
+        if not args.file:
+            parser.error("screen needs a file of UPI IDs")
+        upi_ids = read_upi_ids(args.file)['upi_id']
+        start = time.perf_counter()
+        results = get_reputations(upi_ids, args.db)
+        elapsed = time.perf_counter() - start
+        if args.out:
+            results.to_csv(args.out, index=False)
+        else:
+            print(results.to_string(index=False))
+        print(f"screened {len(results):,} UPI IDs in {elapsed:.3f}s "
+              f"({elapsed / max(len(results), 1) * 10000:.3f}s per 10k IDs)", file=sys.stderr)
+        return
+
+    if args.command == "backfill":
+        print(f"rebuilt summary for {backfill_summary(args.db)} UPI IDs")
+        return
+
+    mismatches = check_summary_consistency(args.db)
+    for upi_id, column, summary_value, raw_value in mismatches:
+        print(f"{upi_id}: {column} is {summary_value} in the summary, {raw_value} in upi_reputation")
+    if mismatches:
+        sys.exit(1)
+    print("upi_reputation_summary matches upi_reputation")
+
+
+if __name__ == "__main__":
+    main()
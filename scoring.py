@@ -0,0 +1,131 @@
+import itertools
+
+import pandas as pd
+
+from columnar import file_format, iter_columnar, read_columnar
+from database import log_transactions_to_db
+from metrics import stage
+from model_registry import get_model
+from parallel_scoring import PARALLEL_MIN_ROWS, SCORING_WORKERS, get_parallel_scorer
+
+UPLOAD_COLUMNS = ["Date", "Transaction_Type", "Payment_Gateway", "Transaction_State", "Merchant_Category", "amount"]
+STREAM_CHUNK_SIZE = 50000
+PREVIEW_ROWS = 1000
+
+
+# -------------------- SCORING --------------------
+def epoch_seconds(dates):
+    return pd.to_datetime(dates).view("int64") / 10**9
+
+
+# Note: the Date column of the caller's frame is converted to epoch seconds
+# in place; the app logs that value to the transactions table.
+def encode_transactions(transaction_data, loaded=None):
+    loaded = loaded or get_model()
+    with stage("score.encode", rows=len(transaction_data)):
+        transaction_data['Date'] = epoch_seconds(transaction_data['Date'])
+        return loaded.encoder.transform(transaction_data)
+
+
+def predict_fraud(transaction_data):
+    loaded = get_model()
+    features = encode_transactions(transaction_data, loaded)
+    # Large batches are spread over a process pool when one is configured
+    if SCORING_WORKERS > 1 and len(features) >= PARALLEL_MIN_ROWS:
+        with stage("score.predict_parallel", rows=len(features)):
+            return get_parallel_scorer().predict(features, loaded)
+    with stage("score.predict", rows=len(features)):
+        prediction = loaded.predict(features)
+    return prediction
+
+
+# An uploaded CSV, Parquet or Arrow file, told apart by its name. Columnar
+# files are read down to UPLOAD_COLUMNS; a CSV is read whole, as before.
+def read_upload(source, name):
+    fmt = file_format(name)
+    if fmt == "csv":
+        return pd.read_csv(source)
+    return read_columnar(source, fmt, UPLOAD_COLUMNS)
+
+
+# (total rows if known up front, iterator of UPLOAD_COLUMNS frames of
+# chunk_size rows). The chunks are the same on every read of the same file,
+# so skip_chunks resumes exactly where an earlier pass stopped; CSV rows
+# before that point are skipped without being parsed.
+def read_upload_chunks(source, name, chunk_size=STREAM_CHUNK_SIZE, skip_chunks=0):
+    fmt = file_format(name)
+    if fmt == "csv":
+        skip = range(1, skip_chunks * chunk_size + 1) if skip_chunks else None
+        return None, iter(pd.read_csv(source, usecols=UPLOAD_COLUMNS, chunksize=chunk_size, skiprows=skip))
+    total, chunks = iter_columnar(source, fmt, UPLOAD_COLUMNS, chunk_size)
+    return total, itertools.islice(chunks, skip_chunks, None)
+
+
+# Builds the frame predict_fraud expects from an uploaded file's columns
+def prepare_upload(df):
+    return pd.DataFrame({
+        "Date": pd.to_datetime(df['Date']),
+        "Transaction_Type": df['Transaction_Type'],
+        "Payment_Gateway": df['Payment_Gateway'],
+        "Transaction_State": df['Transaction_State'],
+        "Merchant_Category": df['Merchant_Category'],
+        "amount": df['amount']
+    })
+
+
+# -------------------- STREAMING UPLOADS --------------------
+# Running totals for a streamed upload. Only the preview and one entry per
+# day are kept, so memory does not grow with the number of rows.
+class UploadSummary:
+    def __init__(self, preview_rows=PREVIEW_ROWS, expected_rows=None):
+        self.preview_rows = preview_rows
+        # Known up front for columnar files only
+        self.expected_rows = expected_rows
+        self.rows = 0
+        self.chunks = 0
+        self.fraud_counts = {}
+        self.daily_amounts = pd.Series(dtype="float64")
+        self.preview = None
+
+    def add(self, scored, days):
+        self.rows += len(scored)
+        self.chunks += 1
+
+        for status, count in scored['fraud'].value_counts().items():
+            self.fraud_counts[status] = self.fraud_counts.get(status, 0) + int(count)
+
+        daily = scored['amount'].groupby(days).sum()
+        self.daily_amounts = self.daily_amounts.add(daily, fill_value=0)
+
+        if self.preview is None:
+            self.preview = scored.head(self.preview_rows)
+        elif len(self.preview) < self.preview_rows:
+            missing = self.preview_rows - len(self.preview)
+            self.preview = pd.concat([self.preview, scored.head(missing)], ignore_index=True)
+
+
+# Reads an upload in fixed-size chunks; each chunk is encoded, scored and
+# logged before the next one is read. Yields the running summary after
+# every chunk. Scored chunks are also written to `export` (a
+# columnar.ColumnarWriter) when one is given.
+def stream_scored_upload(source, user_email, chunk_size=STREAM_CHUNK_SIZE, preview_rows=PREVIEW_ROWS,
+                         name=None, export=None):
+    fmt = file_format(name)
+    expected_rows, reader = read_upload_chunks(source, name, chunk_size)
+    summary = UploadSummary(preview_rows, expected_rows)
+    while True:
+        with stage(f"upload.read_{fmt}") as span:
+            chunk = next(reader, None)
+            span.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        processed = prepare_upload(chunk)
+        # predict_fraud replaces Date with epoch seconds for the database
+        dates = processed['Date']
+        days = dates.dt.normalize()
+        processed['fraud'] = predict_fraud(processed)
+        log_transactions_to_db(user_email, processed)
+        if export is not None:
+            export.write(processed.assign(Date=dates))
+        summary.add(processed, days)
+        yield summary
@@ -0,0 +1,174 @@
+# Headless scoring service: the same predict_fraud as the Streamlit app,
+# without the script rerun and page render per request.
+#
+#   python scoring_server.py --host 127.0.0.1 --port 8600
+#
+#   GET  /health          model digest and feature count
+#   GET  /metrics/batching  micro-batching queue depth and batch sizes
+#   GET  /metrics         stage timings in Prometheus text format (see metrics.py)
+#   POST /predict         one transaction as a JSON object -> {"fraud": 0}
+#                         (coalesced with concurrent requests, see batching.py)
+#   POST /predict/batch   {"transactions": [...]} as JSON, or an Arrow IPC
+#                         stream (Content-Type: application/vnd.apache.arrow.stream)
+#                         -> {"fraud": [0, 1, ...]}
+import argparse
+import io
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from batching import MAX_BATCH_SIZE, MAX_WAIT_MS, MicroBatcher, get_batcher
+from metrics import render_prometheus, set_enabled
+from model_registry import get_model
+from scoring import UPLOAD_COLUMNS, predict_fraud
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+
+class BadRequest(Exception):
+    pass
+
+
+# -------------------- REQUEST DECODING --------------------
+def frame_from_records(records):
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise BadRequest("expected a list of transaction objects")
+    missing = [column for column in UPLOAD_COLUMNS if any(column not in record for record in records)]
+    if missing:
+        raise BadRequest(f"missing fields: {', '.join(sorted(set(missing)))}")
+    return pd.DataFrame({column: [record[column] for record in records] for column in UPLOAD_COLUMNS})
+
+
+def frame_from_arrow(body):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise BadRequest("Arrow bodies need pyarrow installed on the server")
+    try:
+        table = pa.ipc.open_stream(io.BytesIO(body)).read_all()
+    except pa.ArrowInvalid as exc:
+        raise BadRequest(f"invalid Arrow stream: {exc}")
+    missing = [column for column in UPLOAD_COLUMNS if column not in table.column_names]
+    if missing:
+        raise BadRequest(f"missing columns: {', '.join(missing)}")
+    return table.select(UPLOAD_COLUMNS).to_pandas()
+
+
+def score_frame(transaction_data, batcher=None):
+    try:
+        prediction = batcher.predict(transaction_data) if batcher else predict_fraud(transaction_data)
+    except (ValueError, TypeError) as exc:
+        raise BadRequest(str(exc))
+    return [int(value) for value in prediction]
+
+
+# -------------------- HTTP HANDLER --------------------
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    quiet = False
+    batcher = None
+
+    def do_GET(self):
+        if self.path == "/health":
+            loaded = get_model()
+            self.send_json(200, {"status": "ok", "model_sha256": loaded.digest, "features": len(loaded.feature_names)})
+        elif self.path == "/metrics/batching" and self.batcher is not None:
+            self.send_json(200, self.batcher.metrics())
+        elif self.path == "/metrics":
+            self.send_text(200, render_prometheus(), "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            body = self.read_body()
+            if self.path == "/predict":
+                record = self.parse_json(body)
+                fraud = score_frame(frame_from_records([record]), self.batcher)
+                self.send_json(200, {"fraud": fraud[0]})
+            elif self.path == "/predict/batch":
+                if self.headers.get("Content-Type", "").startswith(ARROW_STREAM):
+                    transaction_data = frame_from_arrow(body)
+                else:
+                    payload = self.parse_json(body)
+                    records = payload.get("transactions") if isinstance(payload, dict) else payload
+                    transaction_data = frame_from_records(records)
+                self.send_json(200, {"fraud": score_frame(transaction_data)})
+            else:
+                self.send_json(404, {"error": "not found"})
+        except BadRequest as exc:
+            self.send_json(400, {"error": str(exc)})
+
+    def read_body(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            raise BadRequest("invalid Content-Length")
+        if length < 0:
+            raise BadRequest("invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise BadRequest(f"body larger than {MAX_BODY_BYTES} bytes")
+        return self.rfile.read(length)
+
+    def parse_json(self, body):
+        try:
+            return json.loads(body)
+        except ValueError as exc:
+            raise BadRequest(f"invalid JSON: {exc}")
+
+    def send_json(self, status, payload):
+        self.send_text(status, json.dumps(payload), "application/json")
+
+    def send_text(self, status, text, content_type):
+        data = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+# Pass batching=False to score every /predict request on its own
+def make_server(host="127.0.0.1", port=8600, quiet=False, batching=True, batcher=None):
+    if batching and batcher is None:
+        batcher = get_batcher()
+    handler = type("Handler", (ScoringHandler,), {"quiet": quiet, "batcher": batcher if batching else None})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PayGuardAI scoring service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--quiet", action="store_true", help="don't log every request")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE, help="0 disables micro-batching")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--metrics", action="store_true", help="collect stage timings for GET /metrics")
+    args = parser.parse_args()
+
+    if args.metrics:
+        set_enabled(True)
+
+    # Load the model before accepting traffic
+    get_model()
+    batcher = MicroBatcher(args.max_batch_size, args.max_wait_ms) if args.max_batch_size > 0 else None
+    server = make_server(args.host, args.port, args.quiet, batching=batcher is not None, batcher=batcher)
+    print(f"Scoring service listening on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
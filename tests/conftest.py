@@ -0,0 +1,16 @@
+# The tests import the app's modules from the repository root, the same way
+# the benchmarks do
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+# The model and the data files are found relative to the working directory,
+# as when the app is started from the repository root
+@pytest.fixture(autouse=True)
+def in_root(monkeypatch):
+    monkeypatch.chdir(ROOT)
@@ -0,0 +1,70 @@
+# TransactionEncoder against the get_dummies + reindex encoding it replaced:
+# the same feature matrix, and so the same predictions, for whole files,
+# random slices and single rows. drop_first makes the encoding depend on
+# which categories a batch contains, so a single row has every one-hot
+# column at 0.
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from encoder import CATEGORICAL_COLUMNS
+from model_registry import ModelRegistry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def legacy_encode(transaction_data, feature_names):
+    transaction_data = pd.get_dummies(transaction_data, columns=CATEGORICAL_COLUMNS, drop_first=True)
+    return transaction_data.reindex(columns=feature_names, fill_value=0)
+
+
+@pytest.fixture(scope="module")
+def loaded():
+    return ModelRegistry(os.path.join(ROOT, "UPI_Fraud_model.pkl")).get()
+
+
+@pytest.fixture(scope="module")
+def batch():
+    df = pd.read_csv(os.path.join(ROOT, "upidata.csv"))
+    return pd.DataFrame({
+        "Date": pd.to_datetime(df['Date'], format="%d/%m/%y").astype("int64") / 10**9,
+        "Transaction_Type": df['Transaction_Type'],
+        "Payment_Gateway": df['Payment_Gateway'],
+        "Transaction_State": df['Transaction_State'],
+        "Merchant_Category": df['Merchant_Category'],
+        "amount": df['amount']
+    })
+
+
+def assert_parity(loaded, batch):
+    expected = legacy_encode(batch, loaded.feature_names)
+    actual = loaded.encoder.transform(batch)
+    np.testing.assert_array_equal(actual, expected.to_numpy(dtype=np.float32))
+    np.testing.assert_array_equal(loaded.model.predict(actual), loaded.model.predict(expected))
+
+
+def test_whole_file(loaded, batch):
+    assert_parity(loaded, batch)
+
+
+@pytest.mark.parametrize("size", [2, 5, 50, 300])
+def test_random_slices(loaded, batch, size):
+    rng = np.random.default_rng(size)
+    for _ in range(20):
+        rows = rng.choice(len(batch), size=size, replace=False)
+        assert_parity(loaded, batch.iloc[np.sort(rows)])
+
+
+def test_single_rows(loaded, batch):
+    one_hot = [i for i, name in enumerate(loaded.feature_names)
+               if any(name.startswith(column + "_") for column in CATEGORICAL_COLUMNS)]
+    for row in range(0, len(batch), 7):
+        single = batch.iloc[[row]]
+        assert_parity(loaded, single)
+        assert not loaded.encoder.transform(single)[:, one_hot].any()
+
+
+def test_empty_batch(loaded, batch):
+    assert loaded.encoder.transform(batch.iloc[:0]).shape == (0, len(loaded.feature_names))
@@ -0,0 +1,103 @@
+# PredictionCache against uncached predict_fraud: the same label and the
+# same logged frame on misses and hits, plus expiry, least recently used
+# eviction and invalidation when the model changes.
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import prediction_cache
+from prediction_cache import PredictionCache
+from scoring import predict_fraud
+from vocabulary import MERCHANT_CATEGORIES, PAYMENT_GATEWAYS, TRANSACTION_STATES, TRANSACTION_TYPES
+
+
+def random_check(rng):
+    return pd.DataFrame({
+        # A datetime.date, as st.date_input returns
+        "Date": [(pd.Timestamp("2024-01-01") + pd.Timedelta(days=int(rng.integers(0, 730)))).date()],
+        "Transaction_Type": [TRANSACTION_TYPES[rng.integers(len(TRANSACTION_TYPES))]],
+        "Payment_Gateway": [PAYMENT_GATEWAYS[rng.integers(len(PAYMENT_GATEWAYS))]],
+        "Transaction_State": [TRANSACTION_STATES[rng.integers(len(TRANSACTION_STATES))]],
+        "Merchant_Category": [MERCHANT_CATEGORIES[rng.integers(len(MERCHANT_CATEGORIES))]],
+        # Round and edge amounts as well as odd ones
+        "amount": [float(rng.choice([0.0, 0.01, 500000.0, rng.integers(1, 200) * 100.0,
+                                     round(rng.uniform(0, 20000), 2)]))],
+    })
+
+
+def assert_matches(cache, transaction_data):
+    expected_data = transaction_data.copy()
+    expected = predict_fraud(expected_data)
+    actual = cache.predict(transaction_data)
+    np.testing.assert_array_equal(actual, expected)
+    assert actual.dtype == expected.dtype
+    # The app logs the frame after scoring, Date included
+    pd.testing.assert_frame_equal(transaction_data, expected_data)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_hits_and_misses_match_predict_fraud():
+    rng = np.random.default_rng(0)
+    pool = [random_check(rng) for _ in range(300)]
+    cache = PredictionCache(max_entries=200)
+    for _ in range(1500):
+        assert_matches(cache, pool[rng.integers(len(pool))].copy())
+    stats = cache.metrics()
+    assert stats["hits"] and stats["misses"] and stats["evictions"]
+
+
+def test_batches_bypass_the_cache():
+    rng = np.random.default_rng(1)
+    cache = PredictionCache()
+    assert_matches(cache, pd.concat([random_check(rng) for _ in range(5)], ignore_index=True))
+    assert cache.metrics()["hits"] == cache.metrics()["misses"] == 0
+
+
+def test_entries_expire(clock):
+    check = random_check(np.random.default_rng(2))
+    cache = PredictionCache(ttl_seconds=60)
+    assert_matches(cache, check.copy())
+    clock[0] += 59
+    assert_matches(cache, check.copy())
+    assert cache.metrics()["hits"] == 1
+    clock[0] += 1
+    assert_matches(cache, check.copy())
+    stats = cache.metrics()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
+
+
+def test_least_recently_used_is_evicted():
+    rng = np.random.default_rng(3)
+    first, second, third = (random_check(rng) for _ in range(3))
+    cache = PredictionCache(max_entries=2)
+    assert_matches(cache, first.copy())
+    assert_matches(cache, second.copy())
+    assert_matches(cache, first.copy())
+    assert_matches(cache, third.copy())
+    assert cache.metrics()["evictions"] == 1
+
+    # first was used after second, so second is the one that went
+    hits = cache.metrics()["hits"]
+    assert_matches(cache, first.copy())
+    assert cache.metrics()["hits"] == hits + 1
+    assert_matches(cache, second.copy())
+    assert cache.metrics()["hits"] == hits + 1
+    assert cache.metrics()["entries"] == 2
+
+
+def test_model_change_empties_the_cache():
+    rng = np.random.default_rng(4)
+    cache = PredictionCache()
+    assert_matches(cache, random_check(rng))
+    cache._digest = "replaced"
+    assert_matches(cache, random_check(rng))
+    stats = cache.metrics()
+    assert stats["invalidations"] == 1 and stats["entries"] == 1
@@ -0,0 +1,183 @@
+# Pure-NumPy evaluation of the fraud model's trees.
+#
+#   python tree_predictor.py export     UPI_Fraud_model.pkl -> UPI_Fraud_model.trees.npz
+#   python tree_predictor.py check      compare with model.predict on upidata.csv
+#
+# The booster's trees are flattened into a handful of arrays (one entry per
+# node, all trees back to back) and evaluated for every row and every tree
+# at once: each step moves all (row, tree) cursors one level down, and
+# leaves have an infinite threshold and both children pointing back at
+# themselves, so cursors that are done stay put. For a few rows this skips
+# the DMatrix construction, validation and thread dispatch that dominate
+# XGBClassifier.predict; for larger batches xgboost's own predictor is
+# faster, see COMPILED_MAX_ROWS in model_registry.py.
+#
+# The result is bit-for-bit what xgboost computes: leaf values are added in
+# float32 in tree order onto the base margin, then squashed with the same
+# float32 sigmoid and thresholded at 0.5 like XGBClassifier.predict.
+#
+# The exported .npz holds only numeric and string arrays, so loading it
+# needs neither xgboost nor unpickling.
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from encoder import TransactionEncoder
+
+TREES_PATH = "UPI_Fraud_model.trees.npz"
+SUPPORTED_OBJECTIVES = ("binary:logistic",)
+
+
+class CompiledTrees:
+    def __init__(self, feature_names, roots, feature, threshold, children, default_left, value, base_margin, depth):
+        self.feature_names = [str(name) for name in feature_names]
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        # (left, right) of node i at 2i and 2i + 1
+        self.children = np.asarray(children, dtype=np.intp)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.base_margin = np.float32(base_margin)
+        self.depth = int(depth)
+        self.encoder = TransactionEncoder(self.feature_names)
+
+    # -------------------- EXPORT --------------------
+    @classmethod
+    def from_booster(cls, booster):
+        model = json.loads(booster.save_raw("json").decode())
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        gradient_booster = learner["gradient_booster"]
+        if objective not in SUPPORTED_OBJECTIVES or gradient_booster["name"] != "gbtree":
+            raise ValueError(f"only gbtree models with {', '.join(SUPPORTED_OBJECTIVES)} can be compiled, "
+                             f"not {gradient_booster['name']} with {objective}")
+
+        roots, feature, threshold, children, default_left, value = [], [], [], [], [], []
+        depth = 0
+        for tree in gradient_booster["model"]["trees"]:
+            if tree["categories_nodes"] or any(tree["split_type"]):
+                raise ValueError("trees with categorical splits can't be compiled")
+            offset = len(feature)
+            roots.append(offset)
+            tree_left = np.asarray(tree["left_children"])
+            tree_right = np.asarray(tree["right_children"])
+            leaf = tree_left == -1
+            own = np.arange(offset, offset + len(tree_left))
+            # A leaf's split condition holds its value
+            pairs = np.column_stack([np.where(leaf, own, tree_left + offset), np.where(leaf, own, tree_right + offset)])
+            children.extend(pairs.ravel().tolist())
+            feature.extend(np.where(leaf, 0, tree["split_indices"]).tolist())
+            threshold.extend(np.where(leaf, np.inf, tree["split_conditions"]).tolist())
+            value.extend(np.where(leaf, tree["split_conditions"], 0.0).tolist())
+            default_left.extend(tree["default_left"])
+            depth = max(depth, _tree_depth(tree_left, tree_right))
+
+        base_score = np.float32(float(learner["learner_model_param"]["base_score"]))
+        base_margin = np.log(base_score / (np.float32(1) - base_score))
+        return cls(booster.feature_names, roots, feature, threshold, children, default_left, value,
+                   base_margin, depth)
+
+    def save(self, path=TREES_PATH):
+        np.savez(
+            path, feature_names=np.array(self.feature_names), roots=self.roots, feature=self.feature,
+            threshold=self.threshold, children=self.children, default_left=self.default_left,
+            value=self.value, base_margin=np.array(self.base_margin), depth=np.array(self.depth),
+        )
+
+    @classmethod
+    def load(cls, path=TREES_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["feature_names"].tolist(), data["roots"], data["feature"], data["threshold"],
+                       data["children"], data["default_left"], data["value"],
+                       data["base_margin"][()], data["depth"][()])
+
+    # -------------------- PREDICTION --------------------
+    def leaf_values(self, features):
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        n_rows, n_features = features.shape
+        flat = features.ravel()
+        row_starts = (np.arange(n_rows) * n_features)[:, None]
+        has_missing = np.isnan(flat).any()
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+        for _ in range(self.depth):
+            x = flat[row_starts + self.feature[nodes]]
+            go_left = x < self.threshold[nodes]
+            if has_missing:
+                # NaN compares False; missing values go where default_left says
+                go_left |= np.isnan(x) & self.default_left[nodes]
+            nodes = self.children[2 * nodes + 1 - go_left]
+        return self.value[nodes]
+
+    def margin(self, features):
+        leaves = self.leaf_values(features)
+        # cumsum adds left to right, the order xgboost sums trees in
+        start = np.full((len(leaves), 1), self.base_margin, dtype=np.float32)
+        return np.cumsum(np.hstack([start, leaves]), axis=1, dtype=np.float32)[:, -1]
+
+    def predict_proba(self, features):
+        with np.errstate(over="ignore"):
+            return np.float32(1) / (np.exp(-self.margin(features)) + np.float32(1))
+
+    def predict(self, features):
+        return (self.predict_proba(features) > 0.5).astype(np.int64)
+
+
+def _tree_depth(left, right):
+    depth, level = 0, [0]
+    while level:
+        level = [child for node in level for child in (left[node], right[node]) if child != -1]
+        depth += 1
+    return depth - 1
+
+
+# -------------------- COMMAND LINE --------------------
+def export(model_path, out_path):
+    from model_registry import ModelRegistry
+
+    compiled = CompiledTrees.from_booster(ModelRegistry(model_path).get().booster)
+    compiled.save(out_path)
+    return compiled
+
+
+# Rows of sample_path where the compiled trees disagree with model.predict
+def check(model_path, sample_path):
+    import pandas as pd
+
+    from model_registry import ModelRegistry
+    from scoring import UPLOAD_COLUMNS, encode_transactions, prepare_upload
+
+    loaded = ModelRegistry(model_path).get()
+    compiled = CompiledTrees.from_booster(loaded.booster)
+    features = encode_transactions(prepare_upload(pd.read_csv(sample_path, usecols=UPLOAD_COLUMNS)), loaded)
+    expected = loaded.model.predict(features)
+    got = compiled.predict(features)
+    return np.flatnonzero(got != expected), len(features)
+
+
+def main():
+    from model_registry import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Export and check the compiled tree predictor")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--out", default=TREES_PATH)
+    parser.add_argument("--sample", default="upidata.csv")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        compiled = export(args.model, args.out)
+        print(f"wrote {len(compiled.roots)} trees ({len(compiled.feature)} nodes, depth {compiled.depth}) to {args.out}")
+        return
+
+    mismatches, rows = check(args.model, args.sample)
+    if len(mismatches):
+        print(f"{len(mismatches)} of {rows} rows differ from model.predict, first at row {mismatches[0]}")
+        sys.exit(1)
+    print(f"compiled trees match model.predict on all {rows} rows of {args.sample}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+# Streaming velocity features per customer and per device.
+#
+#   python velocity.py replay upidata.csv --snapshot velocity.npz
+#   python velocity.py lookup velocity.npz --customer <Customer_ID> [--device <Device_ID>]
+#
+# upidata.csv carries precomputed velocity columns (Transaction_Frequency,
+# Days_Since_Last_Transaction, ...). A VelocityStore keeps the same kind of
+# signal up to date as transactions arrive: per key, the transaction count
+# and amount over each window in WINDOWS, the lifetime count and amount,
+# and when the key was last seen.
+#
+# State lives in preallocated NumPy arrays indexed by a slot per key, so a
+# key costs a fixed 240 bytes and updates of a whole batch are a handful of
+# vectorized operations. Each window is a ring of BUCKETS_PER_WINDOW buckets
+# of window/BUCKETS_PER_WINDOW seconds, tagged with the bucket number they
+# hold; a bucket is reset when an event of a newer bucket lands on it. A
+# window therefore counts the current bucket and the BUCKETS_PER_WINDOW - 1
+# before it: the last 50 to 60 minutes for "1h" with 6 buckets. Lookups
+# read BUCKETS_PER_WINDOW entries per window whatever the key's history.
+#
+# Keys not seen for ttl_seconds are dropped as event time moves on, and
+# when max_keys are held the least recently seen eighth makes room, so
+# memory stays bounded. save() and load() snapshot the store to an .npz
+# holding only numeric and string arrays.
+import argparse
+import math
+
+import numpy as np
+
+# (name, seconds)
+WINDOWS = (("1h", 3600), ("24h", 86400), ("7d", 7 * 86400))
+BUCKETS_PER_WINDOW = 6
+TTL_SECONDS = 30 * 86400
+MAX_KEYS = 1000000
+# Expired keys are swept at most this often, in event time
+SWEEP_SECONDS = 600
+INITIAL_CAPACITY = 1024
+
+
+class VelocityStore:
+    def __init__(self, windows=WINDOWS, buckets=BUCKETS_PER_WINDOW, ttl_seconds=TTL_SECONDS,
+                 max_keys=MAX_KEYS, capacity=INITIAL_CAPACITY):
+        self.windows = tuple((str(name), int(seconds)) for name, seconds in windows)
+        self.buckets = int(buckets)
+        self.widths = np.array([seconds / self.buckets for _, seconds in self.windows])
+        self.ttl = float(ttl_seconds)
+        self.max_keys = int(max_keys)
+
+        self._index = {}  # key -> slot
+        self._keys = []  # slot -> key, None when free
+        self._free = []
+        self._last_sweep = -math.inf
+        self.evictions = 0
+        self.expirations = 0
+
+        n_windows = len(self.windows)
+        capacity = max(1, min(capacity, self.max_keys))
+        self.last_seen = np.full(capacity, -np.inf)
+        self.total_count = np.zeros(capacity, dtype=np.int64)
+        self.total_amount = np.zeros(capacity)
+        # (window, slot, bucket)
+        self.ring_bucket = np.full((n_windows, capacity, self.buckets), -1, dtype=np.int32)
+        self.ring_count = np.zeros((n_windows, capacity, self.buckets), dtype=np.int32)
+        self.ring_amount = np.zeros((n_windows, capacity, self.buckets), dtype=np.float32)
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def capacity(self):
+        return len(self.last_seen)
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.last_seen, self.total_count, self.total_amount,
+                                               self.ring_bucket, self.ring_count, self.ring_amount))
+
+    # -------------------- SLOTS --------------------
+    def _grow(self, capacity):
+        extra = capacity - self.capacity
+        self.last_seen = np.concatenate([self.last_seen, np.full(extra, -np.inf)])
+        self.total_count = np.concatenate([self.total_count, np.zeros(extra, dtype=np.int64)])
+        self.total_amount = np.concatenate([self.total_amount, np.zeros(extra)])
+        shape = (len(self.windows), extra, self.buckets)
+        self.ring_bucket = np.concatenate([self.ring_bucket, np.full(shape, -1, dtype=np.int32)], axis=1)
+        self.ring_count = np.concatenate([self.ring_count, np.zeros(shape, dtype=np.int32)], axis=1)
+        self.ring_amount = np.concatenate([self.ring_amount, np.zeros(shape, dtype=np.float32)], axis=1)
+
+    def _release(self, slots):
+        for slot in slots.tolist():
+            del self._index[self._keys[slot]]
+            self._keys[slot] = None
+        self._free.extend(slots.tolist())
+        self.last_seen[slots] = -np.inf
+        self.total_count[slots] = 0
+        self.total_amount[slots] = 0
+        self.ring_bucket[:, slots] = -1
+        self.ring_count[:, slots] = 0
+        self.ring_amount[:, slots] = 0
+
+    # Frees enough slots for `needed` new keys without touching `keep`
+    def _make_room(self, needed, keep):
+        room = len(self._free) + self.max_keys - len(self._keys)
+        if needed <= room:
+            return
+        candidates = np.flatnonzero(np.isfinite(self.last_seen))
+        candidates = candidates[~np.isin(candidates, keep)]
+        count = min(len(candidates), needed - room + self.max_keys // 8)
+        if count == 0:
+            return
+        oldest = candidates[np.argpartition(self.last_seen[candidates], count - 1)[:count]]
+        self.evictions += len(oldest)
+        self._release(oldest)
+
+    # Slot of every key, allocating slots for new ones
+    def _slots(self, keys):
+        get = self._index.get
+        slots = np.fromiter((get(key, -1) for key in keys), dtype=np.intp, count=len(keys))
+        missing = np.flatnonzero(slots < 0)
+        if len(missing) == 0:
+            return slots
+
+        new_keys = list(dict.fromkeys(keys[i] for i in missing.tolist()))
+        self._make_room(len(new_keys), slots[slots >= 0])
+        if len(new_keys) > len(self._free) + self.capacity - len(self._keys):
+            self._grow(min(self.max_keys, max(self.capacity * 2, len(self._keys) + len(new_keys))))
+        for key in new_keys:
+            if self._free:
+                slot = self._free.pop()
+                self._keys[slot] = key
+            else:
+                slot = len(self._keys)
+                self._keys.append(key)
+            self._index[key] = slot
+        for i in missing.tolist():
+            slots[i] = self._index[keys[i]]
+        return slots
+
+    # -------------------- UPDATES --------------------
+    # Adds a batch of transactions: keys, epoch-second timestamps, amounts.
+    # Order within the batch doesn't matter.
+    def update(self, keys, timestamps, amounts):
+        keys = keys.tolist() if hasattr(keys, "tolist") else list(keys)
+        if not keys:
+            return
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        # A batch's keys must fit in the store next to the ones it keeps
+        step = max(1, self.max_keys // 2)
+        if len(keys) > step:
+            for start in range(0, len(keys), step):
+                self.update(keys[start:start + step], timestamps[start:start + step], amounts[start:start + step])
+            return
+        slots = self._slots(keys)
+
+        np.maximum.at(self.last_seen, slots, timestamps)
+        np.add.at(self.total_count, slots, 1)
+        np.add.at(self.total_amount, slots, amounts)
+
+        for w, width in enumerate(self.widths):
+            bucket = np.floor(timestamps / width).astype(np.int32)
+            flat = slots * self.buckets + bucket % self.buckets
+            stamps = self.ring_bucket[w].reshape(-1)
+            counts = self.ring_count[w].reshape(-1)
+            sums = self.ring_amount[w].reshape(-1)
+            # Each ring position ends up holding the newest bucket that hit
+            # it; positions taken over by a newer bucket start from zero, and
+            # events of older buckets (a whole window back) are left out
+            before = stamps[flat]
+            np.maximum.at(stamps, flat, bucket)
+            after = stamps[flat]
+            reset = flat[after != before]
+            counts[reset] = 0
+            sums[reset] = 0
+            current = bucket == after
+            np.add.at(counts, flat[current], 1)
+            np.add.at(sums, flat[current], amounts[current])
+
+        newest = timestamps.max()
+        if newest - self._last_sweep >= SWEEP_SECONDS:
+            self.expire(newest)
+
+    # Drops keys not seen in ttl_seconds before `now`
+    def expire(self, now):
+        self._last_sweep = now
+        expired = np.flatnonzero(self.last_seen < now - self.ttl)
+        expired = expired[np.isfinite(self.last_seen[expired])]
+        if len(expired):
+            self.expirations += len(expired)
+            self._release(expired)
+
+    # -------------------- LOOKUPS --------------------
+    def feature_names(self):
+        names = []
+        for name, _ in self.windows:
+            names += [f"count_{name}", f"amount_{name}"]
+        return names + ["count_total", "amount_total", "seconds_since_last"]
+
+    # Features of every key as of `now` (a scalar or one time per key), as
+    # {feature name: array}. Unknown keys get zero counts and NaN for
+    # seconds_since_last.
+    def query(self, keys, now):
+        keys = keys.tolist() if hasattr(keys, "tolist") else list(keys)
+        get = self._index.get
+        slots = np.fromiter((get(key, -1) for key in keys), dtype=np.intp, count=len(keys))
+        known = slots >= 0
+        safe = np.where(known, slots, 0)
+        now = np.broadcast_to(np.asarray(now, dtype=np.float64), (len(keys),))
+
+        features = {}
+        for w, (name, _) in enumerate(self.windows):
+            current = np.floor(now / self.widths[w]).astype(np.int64)[:, None]
+            stamps = self.ring_bucket[w, safe]
+            live = (stamps > current - self.buckets) & (stamps <= current) & known[:, None]
+            features[f"count_{name}"] = np.where(live, self.ring_count[w, safe], 0).sum(axis=1)
+            features[f"amount_{name}"] = np.where(live, self.ring_amount[w, safe], 0).sum(axis=1, dtype=np.float64)
+        features["count_total"] = np.where(known, self.total_count[safe], 0)
+        features["amount_total"] = np.where(known, self.total_amount[safe], 0.0)
+        features["seconds_since_last"] = np.where(known, now - self.last_seen[safe], np.nan)
+        return features
+
+    # One key's features as a dict: a dict lookup plus a few buckets read in
+    # plain Python, cheaper than query() for a single key
+    def lookup(self, key, now):
+        slot = self._index.get(key)
+        features = {}
+        for w, (name, _) in enumerate(self.windows):
+            count, amount = 0, 0.0
+            if slot is not None:
+                current = int(now // self.widths[w])
+                for stamp, n, total in zip(self.ring_bucket[w, slot].tolist(), self.ring_count[w, slot].tolist(),
+                                           self.ring_amount[w, slot].tolist()):
+                    if current - self.buckets < stamp <= current:
+                        count += n
+                        amount += total
+            features[f"count_{name}"] = count
+            features[f"amount_{name}"] = amount
+        if slot is None:
+            features.update(count_total=0, amount_total=0.0, seconds_since_last=float("nan"))
+        else:
+            features.update(count_total=int(self.total_count[slot]), amount_total=float(self.total_amount[slot]),
+                            seconds_since_last=now - float(self.last_seen[slot]))
+        return features
+
+    # -------------------- SNAPSHOTS --------------------
+    # Only the keys in use, compacted into the first slots
+    def state(self):
+        slots = np.array(sorted(self._index.values()), dtype=np.intp)
+        return {
+            "window_names": np.array([name for name, _ in self.windows]),
+            "window_seconds": np.array([seconds for _, seconds in self.windows], dtype=np.int64),
+            "config": np.array([self.buckets, self.ttl, self.max_keys, self._last_sweep], dtype=np.float64),
+            "keys": np.array([self._keys[slot] for slot in slots.tolist()], dtype=str),
+            "last_seen": self.last_seen[slots],
+            "total_count": self.total_count[slots],
+            "total_amount": self.total_amount[slots],
+            "ring_bucket": self.ring_bucket[:, slots],
+            "ring_count": self.ring_count[:, slots],
+            "ring_amount": self.ring_amount[:, slots],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        buckets, ttl, max_keys, last_sweep = state["config"].tolist()
+        keys = state["keys"].tolist()
+        store = cls(zip(state["window_names"].tolist(), state["window_seconds"].tolist()), int(buckets), ttl,
+                    int(max_keys), capacity=max(len(keys), INITIAL_CAPACITY))
+        n = len(keys)
+        store._keys = keys
+        store._index = {key: slot for slot, key in enumerate(keys)}
+        store._last_sweep = last_sweep
+        store.last_seen[:n] = state["last_seen"]
+        store.total_count[:n] = state["total_count"]
+        store.total_amount[:n] = state["total_amount"]
+        store.ring_bucket[:, :n] = state["ring_bucket"]
+        store.ring_count[:, :n] = state["ring_count"]
+        store.ring_amount[:, :n] = state["ring_amount"]
+        return store
+
+    def save(self, path):
+        np.savez(path, **self.state())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls.from_state(dict(data))
+
+
+# -------------------- CUSTOMERS AND DEVICES --------------------
+# One store per entity, fed from transaction frames with Customer_ID,
+# Device_ID and amount columns plus their epoch-second timestamps.
+ENTITIES = {"customer": "Customer_ID", "device": "Device_ID"}
+
+
+class VelocityFeatures:
+    def __init__(self, stores=None, **store_options):
+        self.stores = stores or {entity: VelocityStore(**store_options) for entity in ENTITIES}
+
+    def observe(self, transactions, timestamps):
+        for entity, column in ENTITIES.items():
+            self.stores[entity].update(transactions[column].to_numpy(), timestamps, transactions["amount"].to_numpy())
+
+    # Feature columns (customer_count_1h, device_seconds_since_last, ...)
+    # for every row of `transactions` as of `now`
+    def features(self, transactions, now):
+        import pandas as pd
+
+        columns = {}
+        for entity, column in ENTITIES.items():
+            for name, values in self.stores[entity].query(transactions[column].to_numpy(), now).items():
+                columns[f"{entity}_{name}"] = values
+        return pd.DataFrame(columns, index=transactions.index)
+
+    def lookup(self, now, **keys):
+        return {f"{entity}_{name}": value
+                for entity, key in keys.items()
+                for name, value in self.stores[entity].lookup(key, now).items()}
+
+    def save(self, path):
+        arrays = {}
+        for entity, store in self.stores.items():
+            arrays.update({f"{entity}.{name}": array for name, array in store.state().items()})
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            states = {entity: {} for entity in ENTITIES}
+            for name in data.files:
+                entity, field = name.split(".", 1)
+                states[entity][field] = data[name]
+        return cls({entity: VelocityStore.from_state(state) for entity, state in states.items()})
+
+
+# Epoch seconds of upidata.csv-style Date (dd/mm/yy) and Time (h:mm:ss AM) columns
+def event_times(transactions):
+    import pandas as pd
+
+    stamps = pd.to_datetime(transactions["Date"] + " " + transactions["Time"], format="%d/%m/%y %I:%M:%S %p")
+    return stamps.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 10**9
+
+
+# -------------------- COMMAND LINE --------------------
+def main():
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Build and query the velocity feature store")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay = commands.add_parser("replay", help="feed a CSV of transactions through the store and snapshot it")
+    replay.add_argument("csv")
+    replay.add_argument("--snapshot", default="velocity.npz")
+    replay.add_argument("--ttl-days", type=float, default=TTL_SECONDS / 86400,
+                        help="forget keys idle this long (the sample spans more than a year)")
+    lookup = commands.add_parser("lookup", help="print one customer's and/or device's features")
+    lookup.add_argument("snapshot")
+    lookup.add_argument("--customer")
+    lookup.add_argument("--device")
+    lookup.add_argument("--now", type=float, help="epoch seconds (default: the latest event in the snapshot)")
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        transactions = pd.read_csv(args.csv, usecols=["Date", "Time", "amount", *ENTITIES.values()])
+        timestamps = event_times(transactions)
+        order = np.argsort(timestamps, kind="stable")
+        features = VelocityFeatures(ttl_seconds=args.ttl_days * 86400)
+        features.observe(transactions.iloc[order], timestamps[order])
+        features.save(args.snapshot)
+        sizes = ", ".join(f"{len(store):,} {entity}s" for entity, store in features.stores.items())
+        print(f"replayed {len(transactions):,} transactions ({sizes}) into {args.snapshot}")
+        return
+
+    features = VelocityFeatures.load(args.snapshot)
+    now = args.now if args.now is not None else max(store.last_seen.max() for store in features.stores.values())
+    keys = {entity: key for entity, key in (("customer", args.customer), ("device", args.device)) if key}
+    if not keys:
+        parser.error("give --customer and/or --device")
+    for name, value in features.lookup(now, **keys).items():
+        print(f"{name:>28} {value}")
+
+
+if __name__ == "__main__":
+    main()
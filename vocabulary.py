@@ -0,0 +1,13 @@
+# Category vocabularies offered by the app's selectboxes
+TRANSACTION_TYPES = ["Refund", "Bank Transfer", "Subscription", "Purchase", "Investment", "Other"]
+PAYMENT_GATEWAYS = ["SamplePay", "UPI Pay", "Dummy Bank", "Alpha Bank", "Other"]
+TRANSACTION_STATES = ["Maharashtra", "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa", "Gujarat", "Haryana", "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala", "Madhya Pradesh", "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura", "Uttar Pradesh", "Uttarakhand", "West Bengal", "Other"]
+MERCHANT_CATEGORIES = ["Brand Vouchers and OTT", "Home delivery", "Utilities", "Investment", "Travel bookings", "Purchases", "Other"]
+
+# upload column -> vocabulary
+VOCABULARIES = {
+    "Transaction_Type": TRANSACTION_TYPES,
+    "Payment_Gateway": PAYMENT_GATEWAYS,
+    "Transaction_State": TRANSACTION_STATES,
+    "Merchant_Category": MERCHANT_CATEGORIES,
+}